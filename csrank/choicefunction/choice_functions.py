@@ -4,12 +4,26 @@ import numpy as np
 
 from csrank.constants import CHOICE_FUNCTION
 from csrank.metrics_np import f1_measure
+from csrank.metrics_np import f1_measure_for_thresholds
+from csrank.metrics_np import instance_informedness
+from csrank.metrics_np import instance_informedness_for_thresholds
 from csrank.util import progress_bar
 
 __all__ = ["ChoiceFunctions"]
 
 
+# Maps the name of a metric to its vectorized evaluation for many thresholds
+# and to the metric itself
+threshold_metrics = {
+    "f1": (f1_measure_for_thresholds, f1_measure),
+    "informedness": (instance_informedness_for_thresholds, instance_informedness),
+}
+
+
 class ChoiceFunctions(metaclass=ABCMeta):
+    # Metric maximized on the validation set when tuning the threshold
+    threshold_metric = "f1"
+
     @property
     def learning_problem(self):
         return CHOICE_FUNCTION
@@ -49,21 +63,30 @@ class ChoiceFunctions(metaclass=ABCMeta):
     def _tune_threshold(self, X_val, Y_val, thin_thresholds=1, verbose=0):
         scores = self.predict_scores(X_val)
         probabilities = np.unique(scores)[::thin_thresholds]
-        threshold = 0.0
-        best = f1_measure(Y_val, scores > threshold)
+        thresholds = np.append(0.0, probabilities)
+        metric_for_thresholds, metric = threshold_metrics[self.threshold_metric]
+        performance = metric_for_thresholds(Y_val, scores, thresholds)
+        threshold, best = 0.0, metric(Y_val, scores > 0.0)
+        if np.all(np.isnan(performance)):
+            # E.g. the informedness is undefined if no instance contains chosen and not chosen objects
+            candidates = []
+        else:
+            # The accumulated metric is only exact up to rounding errors, so the
+            # best candidates are compared again using the metric itself.
+            candidates = np.flatnonzero(performance >= np.nanmax(performance) - 1e-9)
         try:
-            for i, p in enumerate(probabilities):
-                pred = scores > p
-                f1 = f1_measure(Y_val, pred)
-                if f1 > best:
-                    threshold = p
-                    best = f1
+            for count, i in enumerate(candidates):
+                value = metric(Y_val, scores > thresholds[i])
+                if value > best or np.isnan(best):
+                    threshold, best = thresholds[i], value
                 if verbose == 1:
-                    progress_bar(i, len(probabilities), status="Tuning threshold")
+                    progress_bar(count, len(candidates), status="Tuning threshold")
         except KeyboardInterrupt:
             self.logger.info("Keyboard interrupted")
         self.logger.info(
             "Tuned threshold, obtained {:.2f} which achieved"
-            " a micro F1-measure of {:.2f}".format(threshold, best)
+            " an instance-averaged {} of {:.2f}".format(
+                threshold, self.threshold_metric, best
+            )
         )
         return threshold
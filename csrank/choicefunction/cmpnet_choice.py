@@ -7,6 +7,7 @@ from sklearn.model_selection import train_test_split
 from csrank.choicefunction.choice_functions import ChoiceFunctions
 from csrank.choicefunction.util import generate_complete_pairwise_dataset
 from csrank.core.cmpnet_core import CmpNetCore
+from csrank.numpy_util import PAIR_BATCH_MEMORY
 
 
 class CmpNetChoiceFunction(CmpNetCore, ChoiceFunctions):
@@ -23,6 +24,7 @@ class CmpNetChoiceFunction(CmpNetCore, ChoiceFunctions):
         metrics=["binary_accuracy"],
         batch_size=256,
         random_state=None,
+        pair_batch_memory=PAIR_BATCH_MEMORY,
         **kwargs,
     ):
         """
@@ -68,6 +70,8 @@ class CmpNetChoiceFunction(CmpNetCore, ChoiceFunctions):
                 Batch size to use during training
             random_state : int, RandomState instance or None
                 Seed of the pseudorandom generator or a RandomState instance
+            pair_batch_memory : int
+                Maximum number of bytes of the pairs of objects gathered at once to predict the pairwise preferences
             **kwargs
                 Keyword arguments for the algorithms
 
@@ -88,6 +92,7 @@ class CmpNetChoiceFunction(CmpNetCore, ChoiceFunctions):
             metrics=metrics,
             batch_size=batch_size,
             random_state=random_state,
+            pair_batch_memory=pair_batch_memory,
             **kwargs,
         )
         self.logger = logging.getLogger(CmpNetChoiceFunction.__name__)
@@ -17,6 +17,7 @@ from sklearn.model_selection import train_test_split
 
 from csrank.core.feta_network import FETANetwork
 from csrank.layers import NormalizedDense
+from csrank.numpy_util import PAIR_BATCH_MEMORY
 from csrank.numpy_util import sigmoid
 from .choice_functions import ChoiceFunctions
 
@@ -38,6 +39,7 @@ class FETAChoiceFunction(FETANetwork, ChoiceFunctions):
         metrics=["binary_accuracy"],
         batch_size=256,
         random_state=None,
+        pair_batch_memory=PAIR_BATCH_MEMORY,
         **kwargs,
     ):
         """
@@ -87,6 +89,8 @@ class FETAChoiceFunction(FETANetwork, ChoiceFunctions):
                 Batch size to use for training
             random_state : int or object
                 Numpy random state
+            pair_batch_memory : int
+                Maximum number of bytes of the pairs of objects gathered at once to predict the pairwise preferences
             **kwargs
                 Keyword arguments for the hidden units
         """
@@ -105,6 +109,7 @@ class FETAChoiceFunction(FETANetwork, ChoiceFunctions):
             metrics=metrics,
             batch_size=batch_size,
             random_state=random_state,
+            pair_batch_memory=pair_batch_memory,
             **kwargs,
         )
         self.threshold = 0.5
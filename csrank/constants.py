@@ -48,6 +48,7 @@ RANKNET = "ranknet"
 FETA_RANKER = "feta_ranker"
 FATE_RANKER = "fate_ranker"
 LISTNET = "listnet"
+LAMBDARANK = "lambdarank"
 FATELINEAR_RANKER = "fatelinear_ranker"
 FETALINEAR_RANKER = "fetalinear_ranker"
 RANDOM_RANKER = "random_ranker"
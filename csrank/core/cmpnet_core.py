@@ -1,4 +1,3 @@
-from itertools import permutations
 import logging
 
 from keras import backend as K
@@ -9,13 +8,16 @@ from keras.layers import concatenate
 from keras.layers import Dense
 from keras.optimizers import SGD
 from keras.regularizers import l2
-import numpy as np
 from sklearn.utils import check_random_state
 import tensorflow as tf
 
 from csrank.constants import allowed_dense_kwargs
+from csrank.constants import OBJECT_RANKING
 from csrank.layers import NormalizedDense
 from csrank.learner import Learner
+from csrank.numpy_util import PAIR_BATCH_MEMORY
+from csrank.numpy_util import pairwise_borda_scores
+from csrank.sequences import make_pairwise_sequences
 from csrank.util import print_dictionary
 
 
@@ -33,6 +35,8 @@ class CmpNetCore(Learner):
         metrics=["binary_accuracy"],
         batch_size=256,
         random_state=None,
+        pair_sampling=None,
+        pair_batch_memory=PAIR_BATCH_MEMORY,
         **kwargs,
     ):
         self.logger = logging.getLogger("CmpNet")
@@ -58,7 +62,9 @@ class CmpNetCore(Learner):
                 del kwargs[key]
         self.kwargs = kwargs
         self.threshold_instances = int(1e10)
+        self.pair_batch_memory = pair_batch_memory
         self.random_state = random_state
+        self.pair_sampling = pair_sampling
         self.model = None
 
     def _construct_layers(self, **kwargs):
@@ -84,6 +90,24 @@ class CmpNetCore(Learner):
     def _convert_instances_(self, X, Y):
         raise NotImplementedError
 
+    def _pairwise_sequences_(self, X, Y, validation_split, output):
+        if self.learning_problem != OBJECT_RANKING:
+            raise ValueError(
+                "Pair sampling is only available for object ranking, not for {}".format(
+                    self.learning_problem
+                )
+            )
+        return make_pairwise_sequences(
+            X,
+            Y,
+            validation_split=validation_split,
+            n_pairs=self.threshold_instances,
+            random_state=self.random_state_,
+            batch_size=self.batch_size,
+            sampling=self.pair_sampling,
+            output=output,
+        )
+
     def construct_model(self):
         """
             Construct the CmpNet which is used to approximate the :math:`U_1(x_i,x_j)`. For each pair of objects in
@@ -151,9 +175,14 @@ class CmpNetCore(Learner):
         """
         self.random_state_ = check_random_state(self.random_state)
         _n_instances, self.n_objects_fit_, self.n_object_features_fit_ = X.shape
-        x1, x2, y_double = self._convert_instances_(X, Y)
-
-        self.logger.debug("Instances created {}".format(x1.shape[0]))
+        if self.pair_sampling is None:
+            x1, x2, y_double = self._convert_instances_(X, Y)
+            self.logger.debug("Instances created {}".format(x1.shape[0]))
+        else:
+            train, validation = self._pairwise_sequences_(
+                X, Y, validation_split, output="double"
+            )
+            self.logger.debug("Pairs sampled per epoch {}".format(train.n_pairs))
         self._construct_layers(
             kernel_regularizer=self.kernel_regularizer,
             kernel_initializer=self.kernel_initializer,
@@ -163,36 +192,38 @@ class CmpNetCore(Learner):
         self.model = self.construct_model()
 
         self.logger.debug("Finished Creating the model, now fitting started")
-        self.model.fit(
-            [x1, x2],
-            y_double,
-            batch_size=self.batch_size,
-            epochs=epochs,
-            callbacks=callbacks,
-            validation_split=validation_split,
-            verbose=verbose,
-            **kwd,
-        )
+        if self.pair_sampling is None:
+            self.model.fit(
+                [x1, x2],
+                y_double,
+                batch_size=self.batch_size,
+                epochs=epochs,
+                callbacks=callbacks,
+                validation_split=validation_split,
+                verbose=verbose,
+                **kwd,
+            )
+        else:
+            self.model.fit_generator(
+                train,
+                epochs=epochs,
+                callbacks=callbacks,
+                validation_data=validation,
+                verbose=verbose,
+                **kwd,
+            )
         self.logger.debug("Fitting Complete")
 
     def predict_pair(self, a, b, **kwargs):
         return self.model.predict([a, b], **kwargs)
 
     def _predict_scores_fixed(self, X, **kwargs):
-        n_instances, n_objects, n_features = X.shape
         self.logger.info(
             "Test Set instances {} objects {} features {}".format(*X.shape)
         )
-        n2 = n_objects * (n_objects - 1)
-        pairs = np.empty((n2, 2, n_features))
-        scores = np.empty((n_instances, n_objects))
-        for n in range(n_instances):
-            for k, (i, j) in enumerate(permutations(range(n_objects), 2)):
-                pairs[k] = (X[n, i], X[n, j])
-            result = self.predict_pair(pairs[:, 0], pairs[:, 1], **kwargs)[:, 0]
-            scores[n] = result.reshape(n_objects, n_objects - 1).mean(axis=1)
-            del result
-        del pairs
+        scores = pairwise_borda_scores(
+            self.predict_pair, X, max_memory=self.pair_batch_memory, **kwargs
+        )
         self.logger.info("Done predicting scores")
 
         return scores
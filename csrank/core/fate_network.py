@@ -4,6 +4,7 @@ from keras import optimizers
 import keras.backend as K
 from keras.layers import Dense
 from keras.layers import Input
+from keras.layers import Lambda
 from keras.layers.merge import concatenate
 from keras.models import Model
 from keras.optimizers import SGD
@@ -13,9 +14,12 @@ from sklearn.utils import check_random_state
 import tensorflow as tf
 
 from csrank.constants import allowed_dense_kwargs
+from csrank.layers import create_broadcast_lambda
 from csrank.layers import create_input_lambda
 from csrank.layers import DeepSet
 from csrank.learner import Learner
+from csrank.losses import check_padding_aware
+from csrank.sequences import make_padded_sequences
 from csrank.util import print_dictionary
 
 __all__ = ["FATENetwork", "FATENetworkCore"]
@@ -153,6 +157,38 @@ class FATENetworkCore(Learner):
 
         return scores
 
+    def join_padded_input_layers(self, input_layer, *layers, n_layers):
+        """
+            Accepts a padded input tensor and an arbitrary number of feature tensors of the query sets and applies
+            the joint layers to all objects at once. In contrast to :meth:`join_input_layers` the graph does not depend
+            on the number of objects.
+
+            Parameters
+            ----------
+            input_layer : input tensor (n_objects, n_features)
+                The number of objects may be unknown
+            layers : tensors
+                A number of tensors representing feature representations of the query sets
+            n_layers : int
+                Number of hidden set layers
+        """
+        self.logger.debug("Joining set representation and joint layers")
+        if n_layers >= 1:
+            joint = concatenate(
+                [
+                    input_layer,
+                    *[create_broadcast_lambda()([input_layer, x]) for x in layers],
+                ]
+            )
+        else:
+            joint = input_layer
+        for j in range(self.n_hidden_joint_layers):
+            joint = self.joint_layers[j](joint)
+        scores = self.scorer(joint)
+        scores = Lambda(lambda x: K.squeeze(x, axis=-1), name="final_scores")(scores)
+        self.logger.debug("Done")
+        return scores
+
     def set_tunable_parameters(
         self,
         n_hidden_joint_units=32,
@@ -186,7 +222,13 @@ class FATENetworkCore(Learner):
 
 
 class FATENetwork(FATENetworkCore):
-    def __init__(self, n_hidden_set_layers=1, n_hidden_set_units=1, **kwargs):
+    def __init__(
+        self,
+        n_hidden_set_layers=1,
+        n_hidden_set_units=1,
+        shape_polymorphic=False,
+        **kwargs,
+    ):
         """
             Create a FATE-network architecture.
             Training and prediction complexity is linear in the number of objects.
@@ -197,6 +239,13 @@ class FATENetwork(FATENetworkCore):
                 Number of hidden set layers.
             n_hidden_set_units : int
                 Number of hidden units in each set layer
+            shape_polymorphic : bool
+                If True, a single model with an unknown number of objects is constructed, which applies the layers to
+                all objects at once and computes the set representation as a masked mean. The model is used for all
+                query sizes, including sizes unseen during training. Otherwise, the layers are unrolled for each object
+                and one model is constructed per query size. Query sets of varying sizes are trained on padded batches,
+                which requires a loss function and metrics ignoring the padding objects (see
+                :func:`csrank.losses.masks_padding`), otherwise fitting raises a ValueError.
             **kwargs
                 Keyword arguments for the hidden set units
         """
@@ -205,6 +254,7 @@ class FATENetwork(FATENetworkCore):
 
         self.n_hidden_set_layers = n_hidden_set_layers
         self.n_hidden_set_units = n_hidden_set_units
+        self.shape_polymorphic = shape_polymorphic
         self.model = None
         self.set_layer = None
         self._create_set_layers(
@@ -273,25 +323,85 @@ class FATENetwork(FATENetworkCore):
             models[n_objects] = model
         return models
 
+    def _model_inputs(self, X):
+        """
+            Add the object mask expected by the shape polymorphic model to a query set tensor of a fixed size.
+
+            Parameters
+            ----------
+            X : numpy array
+                (n_instances, n_objects, n_features)
+
+            Returns
+            -------
+            inputs : numpy array or list
+                X if the model is not shape polymorphic, otherwise the list of X and a mask of ones with shape
+                (n_instances, n_objects)
+        """
+        if not self.shape_polymorphic:
+            return X
+        return [X, np.ones(X.shape[:2])]
+
     def get_weights(self, n_objects=None):
         if self.is_variadic:
-            if n_objects is not None:
-                weights = self.models_[n_objects].get_weights()
-            else:
-                weights = self.models_[n_objects].get_weights()
+            # The models of all query sizes share their weights
+            if n_objects is None:
+                n_objects = next(iter(self.models_))
+            weights = self.models_[n_objects].get_weights()
         else:
             weights = self.model.get_weights()
         return weights
 
     def set_weights(self, weights, n_objects=None):
         if self.is_variadic:
-            if n_objects is not None:
-                self.models_[n_objects].set_weights(weights)
-            else:
-                self.models_[0].set_weights(weights)
+            if n_objects is None:
+                n_objects = next(iter(self.models_))
+            self.models_[n_objects].set_weights(weights)
         else:
             self.model.set_weights(weights)
 
+    def _construct_meta_update(self, model):
+        """
+            Construct the operations of the meta gradient descent across the query sizes inside the graph. For each
+            weight :math:`w` of the model, the weights before training on the current bucket :math:`w_{before}` and
+            on the previous bucket :math:`w_{old}` are kept in variables, so that the update
+
+            .. math::
+
+                w \\leftarrow w_{before} + \\eta f_b (w - w_{before}) + \\gamma (w_{before} - w_{old})
+
+            with the learning rate :math:`\\eta`, the bucket frequency :math:`f_b` and the momentum :math:`\\gamma` does
+            not copy the weights to the host after every bucket.
+
+            Parameters
+            ----------
+            model : keras :class:`Model`
+                Model whose weights are shared by the models of all query sizes
+        """
+        self._meta_step_size = tf.placeholder("float32", shape=[], name="meta_step")
+        self._meta_momentum = tf.placeholder("float32", shape=[], name="meta_momentum")
+        start_ops, save_ops, update_ops = [], [], []
+        for weight in model.weights:
+            shape, dtype = K.int_shape(weight), K.dtype(weight)
+            w_before = K.zeros(shape, dtype=dtype)
+            w_old = K.zeros(shape, dtype=dtype)
+            start_ops.append(tf.assign(w_before, weight))
+            with tf.control_dependencies([tf.assign(w_old, w_before)]):
+                save_ops.append(tf.assign(w_before, weight))
+            step_size = K.cast(self._meta_step_size, dtype)
+            momentum = K.cast(self._meta_momentum, dtype)
+            update_ops.append(
+                tf.assign(
+                    weight,
+                    w_before
+                    + step_size * (weight - w_before)
+                    + momentum * (w_before - w_old),
+                )
+            )
+        self._meta_start = tf.group(*start_ops)
+        self._meta_save = tf.group(*save_ops)
+        self._meta_update = tf.group(*update_ops)
+
     def _fit(
         self,
         X=None,
@@ -350,7 +460,33 @@ class FATENetwork(FATENetworkCore):
         """
         if optimizer is not None:
             self.optimizer = optimizer
-        if isinstance(X, dict):
+        if isinstance(X, dict) and self.shape_polymorphic:
+            if generator is not None:
+                self.logger.error("Variadic training does not support generators yet.")
+                raise NotImplementedError
+            # A single model is trained on padded batches of all query sizes
+            check_padding_aware(self.loss_function, self.metrics)
+            self.is_variadic = False
+            if self.model is None or refit:
+                self.model = self.construct_model(self.n_object_features_fit_, None)
+            train, validation = make_padded_sequences(
+                X,
+                Y,
+                validation_split=validation_split,
+                random_state=self.random_state_,
+                batch_size=self.batch_size,
+            )
+            self.logger.info("Fitting started")
+            self.model.fit_generator(
+                generator=train,
+                callbacks=callbacks,
+                epochs=epochs,
+                validation_data=validation,
+                verbose=verbose,
+                **kwargs,
+            )
+            self.logger.info("Fitting complete")
+        elif isinstance(X, dict):
             if generator is not None:
                 self.logger.error("Variadic training does not support generators yet.")
                 raise NotImplementedError
@@ -365,6 +501,8 @@ class FATENetwork(FATENetworkCore):
             #  difference is the compute graph constructed for back propagation.
             if not hasattr(self, "models_") or refit:
                 self.models_ = self._construct_models(X)
+                self._construct_meta_update(next(iter(self.models_.values())))
+            session = K.get_session()
 
             #  Iterate training
             for epoch in range(epochs):
@@ -378,7 +516,7 @@ class FATENetwork(FATENetworkCore):
                 np.random.shuffle(bucket_ids)
                 self.curr_bucket_id = bucket_ids[0]
 
-                w_before = np.array(self.get_weights())
+                session.run(self._meta_start)
 
                 for bucket_id in bucket_ids:
                     self.curr_bucket_id = bucket_id
@@ -391,8 +529,7 @@ class FATENetwork(FATENetworkCore):
                     y = Y[bucket_id]
 
                     # Save weight vector for momentum:
-                    w_old = w_before
-                    w_before = np.array(self.get_weights())
+                    session.run(self._meta_save)
                     self.models_[bucket_id].fit(
                         x=x,
                         y=y,
@@ -402,11 +539,12 @@ class FATENetwork(FATENetworkCore):
                         verbose=verbose,
                         **kwargs,
                     )
-                    w_after = np.array(self.get_weights())
-                    self.set_weights(
-                        w_before
-                        + learning_rate * freq[bucket_id] * (w_after - w_before)
-                        + global_momentum * (w_before - w_old)
+                    session.run(
+                        self._meta_update,
+                        feed_dict={
+                            self._meta_step_size: learning_rate * freq[bucket_id],
+                            self._meta_momentum: global_momentum,
+                        },
                     )
                 learning_rate /= 1 + decay_rate * epoch
         else:
@@ -417,12 +555,14 @@ class FATENetwork(FATENetworkCore):
                     X, Y = next(iter(generator))
 
                 n_inst, n_objects, n_features = X.shape
+                if self.shape_polymorphic:
+                    n_objects = None
 
                 self.model = self.construct_model(n_features, n_objects)
             self.logger.info("Fitting started")
             if generator is None:
                 self.model.fit(
-                    x=X,
+                    x=self._model_inputs(X),
                     y=Y,
                     callbacks=callbacks,
                     epochs=epochs,
@@ -432,6 +572,10 @@ class FATENetwork(FATENetworkCore):
                     **kwargs,
                 )
             else:
+                if self.shape_polymorphic:
+                    generator = (
+                        (self._model_inputs(x), *batch) for x, *batch in generator
+                    )
                 self.model.fit_generator(
                     generator=generator,
                     callbacks=callbacks,
@@ -450,12 +594,17 @@ class FATENetwork(FATENetworkCore):
             So, for each object we share the weights in the joint network and the output of this network is used to
             learn the generalized latent utility score :math:`U (x, \\mu_{C(x)})` of each object :math:`x \\in Q`.
 
+            If the network is shape polymorphic, the joint layers are applied to all objects at once and the
+            context-representation is the masked mean of the :class:`DeepSet` mappings of the objects. The model then
+            takes the query sets of any size together with a mask of shape (n_instances, n_objects) as inputs.
+
             Parameters
             ----------
             n_features: int
                 Features of the objects for which the network is constructed
             n_objects: int
-                Size of the query sets for which the network is constructed
+                Size of the query sets for which the network is constructed, ignored if the network is shape
+                polymorphic
 
             Returns
             -------
@@ -463,6 +612,20 @@ class FATENetwork(FATENetworkCore):
                 Neural network to learn the FATE utility score
 
         """
+        if self.shape_polymorphic:
+            input_layer = Input(shape=(None, n_features), name="input_node")
+            mask_layer = Input(shape=(None,), name="mask_node")
+            layers = []
+            if self.n_hidden_set_layers >= 1:
+                layers.append(self.set_layer.masked_call(input_layer, mask_layer))
+            scores = self.join_padded_input_layers(
+                input_layer, *layers, n_layers=self.n_hidden_set_layers
+            )
+            model = Model(inputs=[input_layer, mask_layer], outputs=scores)
+            model.compile(
+                loss=self.loss_function, optimizer=self.optimizer, metrics=self.metrics
+            )
+            return model
         input_layer = Input(shape=(n_objects, n_features), name="input_node")
         set_repr = self.set_layer(input_layer)
         scores = self.join_input_layers(
@@ -500,7 +663,12 @@ class FATENetwork(FATENetworkCore):
             varying sizes in which case dictionaries are expected as input.
 
             For varying sizes a meta gradient descent is performed across the
-            different query sizes.
+            different query sizes. If the network is shape polymorphic, the
+            query sets are instead padded and all sizes are trained in one
+            call on batches bucketed by the query size (see
+            :class:`csrank.sequences.PaddedBatchSequence`). The loss function
+            then needs to ignore the padding objects, as the rank losses in
+            :mod:`csrank.losses` do.
 
             Parameters
             ----------
@@ -535,7 +703,11 @@ class FATENetwork(FATENetworkCore):
                 Keyword arguments for the fit function
         """
         self.random_state_ = check_random_state(self.random_state)
-        _n_instances, self.n_objects_fit_, self.n_object_features_fit_ = X.shape
+        if isinstance(X, dict):
+            self.n_objects_fit_ = max(X.keys())
+            self.n_object_features_fit_ = next(iter(X.values())).shape[-1]
+        else:
+            _n_instances, self.n_objects_fit_, self.n_object_features_fit_ = X.shape
         self._fit(
             X=X,
             Y=Y,
@@ -663,6 +835,10 @@ class FATENetwork(FATENetworkCore):
                 float (n_instances, n_objects)
 
         """
+        if self.shape_polymorphic:
+            scores = self.model.predict(self._model_inputs(X), **kwargs)
+            self.logger.info("Done predicting scores")
+            return scores
         # model = self._construct_scoring_model(n_objects)
         X = self._get_context_representation(X, kwargs)
         n_instances, n_objects, n_features = X.shape
@@ -7,7 +7,9 @@ from sklearn.utils import check_random_state
 import tensorflow as tf
 
 from csrank.learner import Learner
+from csrank.losses_np import get_loss_np
 from csrank.numpy_util import sigmoid
+from csrank.optimizers_np import get_solver_np
 from csrank.util import print_dictionary
 from csrank.util import progress_bar
 
@@ -20,6 +22,8 @@ class FETALinearCore(Learner):
         loss_function=binary_crossentropy,
         epochs_drop=50,
         drop=0.01,
+        backend="tensorflow",
+        solver="sgd",
         random_state=None,
         **kwargs,
     ):
@@ -29,6 +33,8 @@ class FETALinearCore(Learner):
         self.loss_function = loss_function
         self.epochs_drop = epochs_drop
         self.drop = drop
+        self.backend = backend
+        self.solver = solver
         self.current_lr = None
         self.weight1 = None
         self.bias1 = None
@@ -85,16 +91,14 @@ class FETALinearCore(Learner):
         scores = tf.sigmoid(self.W_out[0] * zero_outputs + self.W_out[1] * outputs)
         scores = tf.cast(scores, tf.float32)
         self.loss = self.loss_function(self.Y, scores)
-        self.optimizer = tf.train.GradientDescentOptimizer(self.learning_rate).minimize(
-            self.loss
-        )
+        # The learning rate is fed on every step, so the step decay schedule
+        # does not need to add new optimizer operations to the graph.
+        self.lr = tf.placeholder("float32", shape=[], name="learning_rate")
+        self.optimizer = tf.train.GradientDescentOptimizer(self.lr).minimize(self.loss)
 
     def step_decay(self, epoch):
         step = math.floor((1 + epoch) / self.epochs_drop)
         self.current_lr = self.learning_rate * math.pow(self.drop, step)
-        self.optimizer = tf.train.GradientDescentOptimizer(self.current_lr).minimize(
-            self.loss
-        )
 
     def fit(
         self, X, Y, epochs=10, callbacks=None, validation_split=0.1, verbose=0, **kwd
@@ -102,6 +106,21 @@ class FETALinearCore(Learner):
         self.random_state_ = check_random_state(self.random_state)
         # Global Variables Initializer
         n_instances, self.n_objects_fit_, self.n_object_features_fit_ = X.shape
+        if self.backend == "numpy":
+            self._fit_numpy_(X, Y, epochs, n_instances, verbose)
+            return
+        if self.backend != "tensorflow":
+            raise ValueError(
+                "Unknown backend {}, expected 'tensorflow' or 'numpy'".format(
+                    self.backend
+                )
+            )
+        if self.solver != "sgd":
+            raise ValueError(
+                "The solver {} is only available with backend='numpy', the tensorflow backend uses 'sgd'".format(
+                    self.solver
+                )
+            )
         self._construct_model_(self.n_objects_fit_)
         init = tf.global_variables_initializer()
 
@@ -121,13 +140,18 @@ class FETALinearCore(Learner):
             self.W_last = tf_session.run(self.W_out)
 
     def _fit_(self, X, Y, epochs, n_instances, tf_session, verbose):
+        self.current_lr = self.learning_rate
         try:
             for epoch in range(epochs):
                 for start in range(0, n_instances, self.batch_size):
                     end = np.min([start + self.batch_size, n_instances])
                     tf_session.run(
                         self.optimizer,
-                        feed_dict={self.X: X[start:end], self.Y: Y[start:end]},
+                        feed_dict={
+                            self.X: X[start:end],
+                            self.Y: Y[start:end],
+                            self.lr: self.current_lr,
+                        },
                     )
                     if verbose == 1:
                         progress_bar(end, n_instances, status="Fitting")
@@ -145,6 +169,90 @@ class FETALinearCore(Learner):
             c = tf_session.run(self.loss, feed_dict={self.X: X, self.Y: Y})
             self.logger.info("Epoch {}: cost {} ".format((epoch + 1), np.mean(c)))
 
+    def _initialize_weights_np(self):
+        # Same initialization (and order of random draws) as _construct_model_
+        std = 1 / np.sqrt(self.n_object_features_fit_)
+        self.bias1 = self.random_state_.normal(loc=0, scale=std, size=1)
+        self.weight1 = self.random_state_.normal(
+            loc=0, scale=std, size=2 * self.n_object_features_fit_
+        )
+        self.weight2 = self.random_state_.normal(
+            loc=0, scale=std, size=self.n_object_features_fit_
+        )
+        self.bias2 = self.random_state_.normal(loc=0, scale=std, size=1)
+        self.W_last = self.random_state_.normal(loc=0, scale=std, size=2)
+        return [self.weight1, self.bias1, self.weight2, self.bias2, self.W_last]
+
+    def _loss_and_gradients_np(self, X, Y, loss_np):
+        """
+            Evaluate the loss and its gradients with respect to the weights (in the order returned by
+            :meth:`_initialize_weights_np`) in closed form. Since the pairwise model is linear, the mean over all
+            pairs of an object reduces to a sum over the objects of the query.
+        """
+        n_objects, n_features = X.shape[1:]
+        w_first, w_second = self.weight1[:n_features], self.weight1[n_features:]
+        second = np.dot(X, w_second)
+        pairwise = (
+            np.dot(X, w_first)
+            + self.bias1
+            + (np.sum(second, axis=1, keepdims=True) - second) / (n_objects - 1)
+        )
+        zeroth = np.dot(X, self.weight2) + self.bias2
+        scores = sigmoid(self.W_last[0] * zeroth + self.W_last[1] * pairwise)
+        loss, grad = loss_np(Y, scores)
+        grad = grad * scores * (1 - scores)
+        grad_zeroth = grad * self.W_last[0]
+        grad_pairwise = grad * self.W_last[1]
+        grad_second = (np.sum(grad_pairwise, axis=1, keepdims=True) - grad_pairwise) / (
+            n_objects - 1
+        )
+        grads = [
+            np.concatenate(
+                (
+                    np.einsum("nif,ni->f", X, grad_pairwise),
+                    np.einsum("nif,ni->f", X, grad_second),
+                )
+            ),
+            np.atleast_1d(np.sum(grad_pairwise)),
+            np.einsum("nif,ni->f", X, grad_zeroth),
+            np.atleast_1d(np.sum(grad_zeroth)),
+            np.array([np.sum(grad * zeroth), np.sum(grad * pairwise)]),
+        ]
+        return loss, grads
+
+    def _fit_numpy_(self, X, Y, epochs, n_instances, verbose):
+        loss_np = get_loss_np(self.loss_function)
+        solver = get_solver_np(self.solver)
+        params = self._initialize_weights_np()
+        self.current_lr = self.learning_rate
+        try:
+            for epoch in range(epochs):
+                for start in range(0, n_instances, self.batch_size):
+                    end = np.min([start + self.batch_size, n_instances])
+                    _, grads = self._loss_and_gradients_np(
+                        X[start:end], Y[start:end], loss_np
+                    )
+                    solver.update(params, grads, self.current_lr)
+                    if verbose == 1:
+                        progress_bar(end, n_instances, status="Fitting")
+                if verbose == 1:
+                    c, _ = self._loss_and_gradients_np(X, Y, loss_np)
+                    print("Epoch {}: cost {} ".format((epoch + 1), np.mean(c)))
+                if (epoch + 1) % 100 == 0:
+                    c, _ = self._loss_and_gradients_np(X, Y, loss_np)
+                    self.logger.info(
+                        "Epoch {}: cost {} ".format((epoch + 1), np.mean(c))
+                    )
+                self.step_decay(epoch)
+        except KeyboardInterrupt:
+            self.logger.info("Interrupted")
+        training_cost, _ = self._loss_and_gradients_np(X, Y, loss_np)
+        self.logger.info(
+            "Fitting completed {} epochs done with loss {}".format(
+                epochs, training_cost.mean()
+            )
+        )
+
     def _predict_scores_fixed(self, X, **kwargs):
         n_instances, n_objects, n_features = X.shape
         assert n_features == self.n_object_features_fit_
@@ -1,5 +1,4 @@
 from itertools import combinations
-from itertools import permutations
 import logging
 
 from keras import backend as K
@@ -20,6 +19,8 @@ from csrank.constants import allowed_dense_kwargs
 from csrank.layers import NormalizedDense
 from csrank.learner import Learner
 from csrank.losses import hinged_rank_loss
+from csrank.numpy_util import PAIR_BATCH_MEMORY
+from csrank.numpy_util import pairwise_borda_scores
 from csrank.util import print_dictionary
 
 
@@ -40,6 +41,7 @@ class FETANetwork(Learner):
         metrics=None,
         batch_size=256,
         random_state=None,
+        pair_batch_memory=PAIR_BATCH_MEMORY,
         **kwargs,
     ):
         self.logger = logging.getLogger(FETANetwork.__name__)
@@ -53,6 +55,7 @@ class FETANetwork(Learner):
         self.max_number_of_objects = max_number_of_objects
         self.num_subsample = num_subsample
         self.batch_size = batch_size
+        self.pair_batch_memory = pair_batch_memory
         self.hash_file = None
         self.optimizer = optimizers.get(optimizer)
         self._optimizer_config = self.optimizer.get_config()
@@ -163,18 +166,13 @@ class FETANetwork(Learner):
 
     def _predict_scores_using_pairs(self, X, **kwd):
         n_instances, n_objects, n_features = X.shape
-        n2 = n_objects * (n_objects - 1)
-        pairs = np.empty((n2, 2, n_features))
-        scores = np.zeros((n_instances, n_objects))
-        for n in range(n_instances):
-            for k, (i, j) in enumerate(permutations(range(n_objects), 2)):
-                pairs[k] = (X[n, i], X[n, j])
-            result = self._predict_pair(
-                pairs[:, 0], pairs[:, 1], only_pairwise=True, **kwd
-            )[:, 0]
-            scores[n] += result.reshape(n_objects, n_objects - 1).mean(axis=1)
-            del result
-        del pairs
+        scores = pairwise_borda_scores(
+            self._predict_pair,
+            X,
+            max_memory=self.pair_batch_memory,
+            only_pairwise=True,
+            **kwd,
+        )
         if self._use_zeroth_model:
             scores_zero = self.zero_order_model.predict(X.reshape(-1, n_features))
             scores_zero = scores_zero.reshape(n_instances, n_objects)
@@ -13,8 +13,10 @@ from sklearn.utils import check_random_state
 import tensorflow as tf
 
 from csrank.constants import allowed_dense_kwargs
+from csrank.constants import OBJECT_RANKING
 from csrank.layers import NormalizedDense
 from csrank.learner import Learner
+from csrank.sequences import make_pairwise_sequences
 from csrank.util import print_dictionary
 
 
@@ -32,6 +34,7 @@ class RankNetCore(Learner):
         metrics=["binary_accuracy"],
         batch_size=256,
         random_state=None,
+        pair_sampling=None,
         **kwargs,
     ):
         self.logger = logging.getLogger(RankNetCore.__name__)
@@ -56,6 +59,7 @@ class RankNetCore(Learner):
         self.model = None
         self.hash_file = None
         self.random_state = random_state
+        self.pair_sampling = pair_sampling
 
     def _construct_layers(self, **kwargs):
         self.logger.info("n_hidden {}, n_units {}".format(self.n_hidden, self.n_units))
@@ -108,6 +112,24 @@ class RankNetCore(Learner):
     def _convert_instances_(self, X, Y):
         raise NotImplementedError
 
+    def _pairwise_sequences_(self, X, Y, validation_split, output):
+        if self.learning_problem != OBJECT_RANKING:
+            raise ValueError(
+                "Pair sampling is only available for object ranking, not for {}".format(
+                    self.learning_problem
+                )
+            )
+        return make_pairwise_sequences(
+            X,
+            Y,
+            validation_split=validation_split,
+            n_pairs=self.threshold_instances,
+            random_state=self.random_state_,
+            batch_size=self.batch_size,
+            sampling=self.pair_sampling,
+            output=output,
+        )
+
     def fit(
         self, X, Y, epochs=10, callbacks=None, validation_split=0.1, verbose=0, **kwd
     ):
@@ -142,9 +164,14 @@ class RankNetCore(Learner):
         """
         self.random_state_ = check_random_state(self.random_state)
         _n_instances, self.n_objects_fit_, self.n_object_features_fit_ = X.shape
-        X1, X2, Y_single = self._convert_instances_(X, Y)
-
-        self.logger.debug("Instances created {}".format(X1.shape[0]))
+        if self.pair_sampling is None:
+            X1, X2, Y_single = self._convert_instances_(X, Y)
+            self.logger.debug("Instances created {}".format(X1.shape[0]))
+        else:
+            train, validation = self._pairwise_sequences_(
+                X, Y, validation_split, output="single"
+            )
+            self.logger.debug("Pairs sampled per epoch {}".format(train.n_pairs))
         self.logger.debug("Creating the model")
 
         self._construct_layers(
@@ -158,16 +185,26 @@ class RankNetCore(Learner):
         self.model = self.construct_model()
         self.logger.debug("Finished Creating the model, now fitting started")
 
-        self.model.fit(
-            [X1, X2],
-            Y_single,
-            batch_size=self.batch_size,
-            epochs=epochs,
-            callbacks=callbacks,
-            validation_split=validation_split,
-            verbose=verbose,
-            **kwd,
-        )
+        if self.pair_sampling is None:
+            self.model.fit(
+                [X1, X2],
+                Y_single,
+                batch_size=self.batch_size,
+                epochs=epochs,
+                callbacks=callbacks,
+                validation_split=validation_split,
+                verbose=verbose,
+                **kwd,
+            )
+        else:
+            self.model.fit_generator(
+                train,
+                epochs=epochs,
+                callbacks=callbacks,
+                validation_data=validation,
+                verbose=verbose,
+                **kwd,
+            )
 
         self.logger.debug("Fitting Complete")
 
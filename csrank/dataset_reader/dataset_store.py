@@ -0,0 +1,199 @@
+"""Storage of datasets with query sets of varying sizes as buckets in HDF5 files.
+
+Every bucket contains the instances with the same number of objects. The
+arrays of a bucket are stored as the datasets ``"<name>_<n_objects>"`` and the
+sizes of all buckets as the dataset ``"lengths"``.
+"""
+import logging
+
+import numpy as np
+
+try:
+    import h5py
+except ImportError:
+    from csrank.util import MissingExtraError
+
+    raise MissingExtraError("h5py", "data")
+
+__all__ = ["write_buckets", "BucketStore", "BucketView", "concatenate_buckets"]
+
+DEFAULT_COMPRESSION = "lzf"
+# Upper bound (in bytes) for the size of one chunk of a bucket
+CHUNK_BYTES = 2 ** 20
+
+logger = logging.getLogger(__name__)
+
+
+def _row_chunks(shape, itemsize, chunk_bytes):
+    row_bytes = itemsize * int(np.prod(shape[1:], dtype=int))
+    rows = int(np.clip(chunk_bytes // max(row_bytes, 1), 1, max(shape[0], 1)))
+    return (rows,) + tuple(shape[1:])
+
+
+def write_buckets(
+    file_path,
+    buckets,
+    names,
+    compression=DEFAULT_COMPRESSION,
+    compression_opts=None,
+    chunk_bytes=CHUNK_BYTES,
+):
+    """
+        Write buckets of arrays to an HDF5 file. The arrays are split into chunks of complete instances (rows), so that
+        reading a slice of instances only decompresses the chunks containing them.
+
+        Parameters
+        ----------
+        file_path : string
+            Path of the HDF5 file, an existing file is overwritten
+        buckets : dict
+            Map from the number of objects to a tuple of arrays with one entry per instance
+        names : tuple of strings
+            Names of the arrays of each bucket
+        compression : string or None
+            Compression filter of h5py, e.g. "lzf" (fast), "gzip" (small) or None
+        compression_opts : int or None
+            Options of the compression filter, e.g. the level (0-9) of "gzip"
+        chunk_bytes : int
+            Upper bound (in bytes) for the size of one chunk
+    """
+    logger.info("Writing in hd5 {}".format(file_path))
+    options = dict(compression=compression, compression_opts=compression_opts)
+    if compression is None:
+        options = dict()
+    with h5py.File(file_path, "w") as h5f:
+        for key, arrays in buckets.items():
+            for name, array in zip(names, arrays):
+                array = np.asarray(array)
+                h5f.create_dataset(
+                    "{}_{}".format(name, key),
+                    data=array,
+                    chunks=_row_chunks(array.shape, array.dtype.itemsize, chunk_bytes),
+                    **options,
+                )
+        h5f.create_dataset("lengths", data=np.sort(np.array(list(buckets.keys()))))
+
+
+class BucketView(object):
+    def __init__(self, dataset, columns=None):
+        """
+            Lazy view of one array of a bucket, only the requested instances are read from the file.
+
+            Parameters
+            ----------
+            dataset : :class:`h5py.Dataset`
+                Array of the bucket in the HDF5 file
+            columns : numpy array or None
+                Indices of the features (last axis) which are part of the view, None for all features
+        """
+        self.dataset = dataset
+        self.columns = columns
+
+    @property
+    def shape(self):
+        shape = self.dataset.shape
+        if self.columns is None:
+            return shape
+        return shape[:-1] + (len(self.columns),)
+
+    @property
+    def dtype(self):
+        return self.dataset.dtype
+
+    @property
+    def block_size(self):
+        """Number of instances which are read at once when iterating over the whole view"""
+        if self.dataset.chunks is None:
+            return max(len(self), 1)
+        return self.dataset.chunks[0]
+
+    def __len__(self):
+        return self.dataset.shape[0]
+
+    def __getitem__(self, rows):
+        array = self.dataset[rows]
+        if self.columns is not None:
+            array = array[..., self.columns]
+        return array
+
+    def __array__(self, dtype=None):
+        array = self[()]
+        if dtype is not None:
+            array = array.astype(dtype)
+        return array
+
+
+class BucketStore(object):
+    def __init__(self, file_path):
+        """
+            Read access to the buckets of an HDF5 file written by :func:`write_buckets`. The file stays open until
+            :meth:`close` is called, the store can be used as a context manager.
+
+            Parameters
+            ----------
+            file_path : string
+                Path of the HDF5 file
+        """
+        self.file_path = file_path
+        self.file = h5py.File(file_path, "r")
+        self.lengths = np.array(self.file["lengths"])
+
+    def view(self, name, n_objects, columns=None):
+        """
+            Lazy view of an array of a bucket.
+
+            Parameters
+            ----------
+            name : string
+                Name of the array
+            n_objects : int
+                Number of objects of the bucket
+            columns : numpy array or None
+                Indices of the features (last axis) which are part of the view, None for all features
+
+            Returns
+            -------
+            view : :class:`BucketView`
+        """
+        return BucketView(self.file["{}_{}".format(name, n_objects)], columns=columns)
+
+    def views(self, name, columns=None):
+        """Lazy views of an array of all buckets as a map from the number of objects to the :class:`BucketView`"""
+        return {n: self.view(name, n, columns=columns) for n in self.lengths}
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def concatenate_buckets(views):
+    """
+        Concatenate arrays of a bucket, e.g. of several folds, into one preallocated array. The views are read in
+        blocks of their chunk size, so no temporary copy of a whole bucket is created.
+
+        Parameters
+        ----------
+        views : list of :class:`BucketView` or numpy arrays
+            Arrays with the same shape except for the first axis
+
+        Returns
+        -------
+        array : numpy array
+            The concatenated arrays
+    """
+    n_instances = sum(len(view) for view in views)
+    shape = (n_instances,) + tuple(views[0].shape[1:])
+    array = np.empty(shape, dtype=views[0].dtype)
+    offset = 0
+    for view in views:
+        block_size = getattr(view, "block_size", max(len(view), 1))
+        for start in range(0, len(view), block_size):
+            stop = min(start + block_size, len(view))
+            array[offset + start : offset + stop] = view[start:stop]
+        offset += len(view)
+    return array
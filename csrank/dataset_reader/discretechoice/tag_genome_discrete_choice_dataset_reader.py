@@ -4,7 +4,6 @@ from sklearn.utils import check_random_state
 from csrank.constants import DISCRETE_CHOICE
 from csrank.dataset_reader.discretechoice.util import convert_to_label_encoding
 from csrank.dataset_reader.tag_genome_reader import critique_dist
-from csrank.dataset_reader.util import get_key_for_indices
 from ..tag_genome_reader import TagGenomeDatasetReader
 
 
@@ -97,10 +96,7 @@ class TagGenomeDiscreteChoiceDatasetReader(TagGenomeDatasetReader):
                 if len(quartile_tags) < length:
                     quartile_tags = popular_tags
                 tag_ids = random_state.choice(quartile_tags, size=length)
-                distances = [
-                    self.similarity_matrix[get_key_for_indices(i, j)]
-                    for j in range(self.n_movies)
-                ]
+                distances = self.similarity_matrix[i, np.arange(self.n_movies)]
                 critique_d = critique_dist(
                     feature,
                     self.movie_features,
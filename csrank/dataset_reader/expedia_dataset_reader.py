@@ -8,16 +8,12 @@ from pandas.api.types import is_numeric_dtype
 from sklearn.model_selection import ShuffleSplit
 
 from csrank.dataset_reader.dataset_reader import DatasetReader
+from csrank.dataset_reader.dataset_store import BucketStore
+from csrank.dataset_reader.dataset_store import DEFAULT_COMPRESSION
+from csrank.dataset_reader.dataset_store import write_buckets
 from csrank.dataset_reader.util import standardize_features
 from csrank.util import print_dictionary
 
-try:
-    import h5py
-except ImportError:
-    from csrank.util import MissingExtraError
-
-    raise MissingExtraError("h5py", "data")
-
 try:
     import pandas as pd
 except ImportError:
@@ -27,11 +23,19 @@ except ImportError:
 
 
 class ExpediaDatasetReader(DatasetReader, metaclass=ABCMeta):
-    def __init__(self, fold_id=0, **kwargs):
+    def __init__(
+        self,
+        fold_id=0,
+        compression=DEFAULT_COMPRESSION,
+        compression_opts=None,
+        **kwargs
+    ):
         super(ExpediaDatasetReader, self).__init__(dataset_folder="expedia", **kwargs)
         self.RAW_DATASET_FILE = os.path.join(self.dirname, "train.csv")
         self.logger = logging.getLogger(ExpediaDatasetReader.__name__)
         self.fold_id = fold_id
+        self.compression = compression
+        self.compression_opts = compression_opts
         self.X_train = self.Y_train = self.X_test = self.Y_test = dict()
 
     def __load_dataset__(self):
@@ -41,38 +45,27 @@ class ExpediaDatasetReader(DatasetReader, metaclass=ABCMeta):
         self.logger.info("Done loading the dataset")
 
     def get_choices_dict(self):
-        file = h5py.File(self.hdf5file_path, "r")
-        lengths = file["lengths"]
         X = dict()
         Y = dict()
-        for ranking_length in np.array(lengths):
-            self.X = np.array(file["X_{}".format(ranking_length)])
-            self.Y = np.array(file["Y_{}".format(ranking_length)])
-            self.__check_dataset_validity__()
-            X[ranking_length], Y[ranking_length] = self.X, self.Y
-        file.close()
+        with BucketStore(self.hdf5file_path) as store:
+            for ranking_length in store.lengths:
+                self.X = store.view("X", ranking_length)[()]
+                self.Y = store.view("Y", ranking_length)[()]
+                self.__check_dataset_validity__()
+                X[ranking_length], Y[ranking_length] = self.X, self.Y
         return X, Y
 
     def create_choices_dataset(self):
-        self.logger.info("Writing in hd5 {}".format(self.hdf5file_path))
         X, scores = self._parse_dataset()
         result, freq = self._build_training_buckets(X, scores)
-        h5f = h5py.File(self.hdf5file_path, "w")
         self.logger.info("Frequencies of rankings: {}".format(print_dictionary(freq)))
-
-        for key, value in result.items():
-            x, s = value
-            h5f.create_dataset(
-                "X_" + str(key), data=x, compression="gzip", compression_opts=9
-            )
-            h5f.create_dataset(
-                "Y_" + str(key), data=s, compression="gzip", compression_opts=9
-            )
-        lengths = np.sort(np.array(list(result.keys())))
-        h5f.create_dataset(
-            "lengths", data=lengths, compression="gzip", compression_opts=9
+        write_buckets(
+            self.hdf5file_path,
+            result,
+            names=("X", "Y"),
+            compression=self.compression,
+            compression_opts=self.compression_opts,
         )
-        h5f.close()
 
     def _build_training_buckets(self, X, Y):
         """Separates object ranking data into buckets of the same ranking size."""
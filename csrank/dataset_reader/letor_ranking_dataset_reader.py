@@ -6,21 +6,28 @@ import os
 
 import numpy as np
 
+from csrank.dataset_reader.dataset_store import BucketStore
+from csrank.dataset_reader.dataset_store import concatenate_buckets
+from csrank.dataset_reader.dataset_store import DEFAULT_COMPRESSION
+from csrank.dataset_reader.dataset_store import write_buckets
+from csrank.dataset_reader.util import read_letor_files
 from csrank.dataset_reader.util import standardize_features
 from csrank.util import create_dir_recursively
 from csrank.util import print_dictionary
 from .dataset_reader import DatasetReader
 
-try:
-    import h5py
-except ImportError:
-    from csrank.util import MissingExtraError
-
-    raise MissingExtraError("h5py", "data")
-
 
 class LetorRankingDatasetReader(DatasetReader, metaclass=ABCMeta):
-    def __init__(self, year=2007, fold_id=0, exclude_qf=False, **kwargs):
+    def __init__(
+        self,
+        year=2007,
+        fold_id=0,
+        exclude_qf=False,
+        n_jobs=None,
+        compression=DEFAULT_COMPRESSION,
+        compression_opts=None,
+        **kwargs
+    ):
         super(LetorRankingDatasetReader, self).__init__(
             dataset_folder="letor", **kwargs
         )
@@ -32,6 +39,9 @@ class LetorRankingDatasetReader(DatasetReader, metaclass=ABCMeta):
             raise ValueError("year must be either 2007 or 2008")
         self.year = year
         self.exclude_qf = exclude_qf
+        self.n_jobs = n_jobs
+        self.compression = compression
+        self.compression_opts = compression_opts
         self.query_feature_indices = [4, 5, 6, 19, 20, 21, 34, 35, 36]
         self.query_document_feature_indices = np.delete(
             np.arange(0, 46), self.query_feature_indices
@@ -80,65 +90,52 @@ class LetorRankingDatasetReader(DatasetReader, metaclass=ABCMeta):
             for key, dataset in self.dataset_dictionaries.items():
                 hdf5file_path = self.file_format.format(key.split("S")[-1])
                 self.create_choices_dataset(dataset, hdf5file_path)
-        self.X_train = dict()
-        self.Y_train = dict()
-        for i in self.dataset_indices:
-            h5py_file_path = self.file_format.format(i + 1)
-            if i != self.fold_id:
-                X, Y = self.get_choices_dict(h5py_file_path)
-                self.merge_to_train(X, Y)
-            else:
-                self.X_test, self.Y_test = self.get_choices_dict(h5py_file_path)
+        train_file_paths = [
+            self.file_format.format(i + 1)
+            for i in self.dataset_indices
+            if i != self.fold_id
+        ]
+        self.X_train, self.Y_train = self.get_choices_dict(*train_file_paths)
+        self.X_test, self.Y_test = self.get_choices_dict(
+            self.file_format.format(self.fold_id + 1)
+        )
         self.logger.info("Done loading the dataset")
 
     def create_choices_dataset(self, dataset, hdf5file_path):
-        self.logger.info("Writing in hd5 {}".format(hdf5file_path))
         X, scores = self.create_instances(dataset)
         result, freq = self._build_training_buckets(X, scores)
-        h5f = h5py.File(hdf5file_path, "w")
         self.logger.info("Frequencies of rankings: {}".format(print_dictionary(freq)))
-
-        for key, value in result.items():
-            x, s = value
-            h5f.create_dataset(
-                "X_" + str(key), data=x, compression="gzip", compression_opts=9
-            )
-            h5f.create_dataset(
-                "score_" + str(key), data=s, compression="gzip", compression_opts=9
-            )
-        lengths = np.array(list(result.keys()))
-        h5f.create_dataset(
-            "lengths", data=lengths, compression="gzip", compression_opts=9
+        write_buckets(
+            hdf5file_path,
+            result,
+            names=("X", "score"),
+            compression=self.compression,
+            compression_opts=self.compression_opts,
         )
-        h5f.close()
 
-    def get_choices_dict(self, h5py_file_path):
-        file = h5py.File(h5py_file_path, "r")
-        lengths = file["lengths"]
+    def get_choices_dict(self, *h5py_file_paths):
+        """Read the buckets of one or several folds, the buckets of the same size are concatenated"""
+        stores = [BucketStore(file_path) for file_path in h5py_file_paths]
+        columns = self.query_document_feature_indices if self.exclude_qf else None
         X = dict()
         Y = dict()
-        for ranking_length in np.array(lengths):
-            self.X = np.array(file["X_{}".format(ranking_length)])
-            if self.exclude_qf:
-                self.X = self.X[:, :, self.query_document_feature_indices]
-            self.Y = np.array(file["score_{}".format(ranking_length)])
+        for ranking_length in np.unique(
+            np.concatenate([store.lengths for store in stores])
+        ):
+            buckets = [store for store in stores if ranking_length in store.lengths]
+            self.X = concatenate_buckets(
+                [store.view("X", ranking_length, columns=columns) for store in buckets]
+            )
+            self.Y = concatenate_buckets(
+                [store.view("score", ranking_length) for store in buckets]
+            )
             self.Y[self.Y == 2] = 1
             self.__check_dataset_validity__()
             X[ranking_length], Y[ranking_length] = self.X, self.Y
-        file.close()
+        for store in stores:
+            store.close()
         return X, Y
 
-    def merge_to_train(self, X, Y):
-        for key in X.keys():
-            x = X[key]
-            y = Y[key]
-            if key in self.X_train:
-                self.X_train[key] = np.append(self.X_train[key], x, axis=0)
-                self.Y_train[key] = np.append(self.Y_train[key], y, axis=0)
-            else:
-                self.X_train[key] = x
-                self.Y_train[key] = y
-
     def sub_sampling_from_dictionary(self, train_test="train"):
         X = []
         Y = []
@@ -167,14 +164,11 @@ class LetorRankingDatasetReader(DatasetReader, metaclass=ABCMeta):
         X = []
         rel_scores = []
         for k, v in dataset.items():
-            x = np.array(v)
-            s = x[:, -1]
-            f = x[:, 0:-1]
+            s = v[:, -1]
+            f = v[:, 0:-1]
             if not np.all(s == 0):
                 rel_scores.append(s)
                 X.append(f)
-        X = np.array(X)
-        rel_scores = np.array(rel_scores)
         return X, rel_scores
 
     def _build_training_buckets(self, X, scores):
@@ -201,25 +195,10 @@ class LetorRankingDatasetReader(DatasetReader, metaclass=ABCMeta):
 
     def create_dataset_dictionary(self, files):
         self.logger.info("Files {}".format(files))
-        dataset_dictionaries = dict()
-        for file in files:
-            dataset = dict()
-            key = os.path.basename(file).split(".txt")[0]
+        dataset_dictionaries = read_letor_files(files, n_jobs=self.n_jobs)
+        for key, dataset in dataset_dictionaries.items():
             self.logger.info("File name {}".format(key))
-            for line in open(file):
-                information = line.split("#")[0].split(" qid:")
-                rel_deg = int(information[0])
-                qid = information[1].split(" ")[0]
-                x = np.array(
-                    [float(l.split(":")[1]) for l in information[1].split(" ")[1:-1]]
-                )
-                x = np.insert(x, len(x), rel_deg)
-                if qid not in dataset:
-                    dataset[qid] = [x]
-                else:
-                    dataset[qid].append(x)
             array = np.array([len(i) for i in dataset.values()])
-            dataset_dictionaries[key] = dataset
             self.logger.info("Maximum length of ranking: {}".format(np.max(array)))
         return dataset_dictionaries
 
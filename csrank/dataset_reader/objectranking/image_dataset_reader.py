@@ -1,7 +1,5 @@
 import collections
 import glob
-from itertools import combinations
-from itertools import product
 import logging
 import os
 
@@ -12,9 +10,10 @@ from sklearn.utils import check_random_state
 from csrank.constants import OBJECT_RANKING
 from csrank.numpy_util import scores_to_rankings
 from ..dataset_reader import DatasetReader
+from ..util import CondensedSimilarityMatrix
 from ..util import distance_metric_multilabel
-from ..util import get_key_for_indices
 from ..util import get_similarity_matrix
+from ..util import similarity_matrix_exists
 
 try:
     import h5py
@@ -23,13 +22,6 @@ except ImportError:
 
     raise MissingExtraError("h5py", "data")
 
-try:
-    import pandas as pd
-except ImportError:
-    from csrank.util import MissingExtraError
-
-    raise MissingExtraError("pandas", "data")
-
 
 class ImageDatasetReader(DatasetReader):
     def __init__(
@@ -54,7 +46,7 @@ class ImageDatasetReader(DatasetReader):
 
         self.train_file = os.path.join(self.dirname, "train.hd5")
         self.similarity_matrix_train_file = os.path.join(
-            self.dirname, "train_similarity_matrix.csv"
+            self.dirname, "train_similarity_matrix.npy"
         )
         self.labels_train_files = glob.glob(
             os.path.join(self.dirname, TRAIN_LABEL, "*.txt")
@@ -63,7 +55,7 @@ class ImageDatasetReader(DatasetReader):
 
         self.test_file = os.path.join(self.dirname, "val.hd5")
         self.similarity_matrix_test_file = os.path.join(
-            self.dirname, "val_similarity_matrix.csv"
+            self.dirname, "val_similarity_matrix.npy"
         )
         self.labels_test_files = glob.glob(
             os.path.join(self.dirname, VAL_LABEL, "*.txt")
@@ -85,8 +77,8 @@ class ImageDatasetReader(DatasetReader):
         self.logger.info("Image Labels Names {}".format(self.label_names))
         self.random_state = check_random_state(random_state)
         if not (
-            os.path.isfile(self.similarity_matrix_test_file)
-            and os.path.isfile(self.similarity_matrix_train_file)
+            similarity_matrix_exists(self.similarity_matrix_test_file)
+            and similarity_matrix_exists(self.similarity_matrix_train_file)
         ):
             self.__load_dataset__()
 
@@ -143,21 +135,17 @@ class ImageDatasetReader(DatasetReader):
             n_instances = self.n_test_instances
             similarity_matrix_file = self.similarity_matrix_test_file
 
-        X = np.empty((n_instances, self.n_objects, self.n_features), dtype=float)
-        similarity_scores = np.empty((n_instances, self.n_objects), dtype=float)
-        similarity_matrix_lin_list = get_similarity_matrix(similarity_matrix_file)
+        subsets = np.empty((n_instances, self.n_objects), dtype=int)
+        queries = np.empty(n_instances, dtype=int)
+        similarity_matrix = get_similarity_matrix(similarity_matrix_file)
 
         for i in range(n_instances):
-            subset = random_state.choice(
+            subsets[i] = random_state.choice(
                 image_features.shape[0], size=self.n_objects, replace=False
             )
-            X[i] = image_features[subset]
-            query = random_state.choice(self.n_objects, size=1)
-            one_row = [
-                similarity_matrix_lin_list[get_key_for_indices(i, j)]
-                for i, j in product(subset[query], subset)
-            ]
-            similarity_scores[i] = np.array(one_row)
+            queries[i] = subsets[i, random_state.choice(self.n_objects, size=1)[0]]
+        X = np.array(image_features[subsets], dtype=float)
+        similarity_scores = similarity_matrix[queries[:, None], subsets].astype(float)
 
         Y = scores_to_rankings(similarity_scores)
         for i, x in enumerate(X):
@@ -204,25 +192,13 @@ class ImageDatasetReader(DatasetReader):
         image_features = StandardScaler().fit_transform(image_features)
 
         num_of_images = label_vectors.shape[0]
-        combinations_list = np.array(list(combinations(range(num_of_images), 2)))
-        similarity_matrix_lin_list = dict()
-
-        for i, j in combinations_list:
-            similarity_matrix_lin_list[
-                get_key_for_indices(i, j)
-            ] = distance_metric_multilabel(
+        similarity_matrix = CondensedSimilarityMatrix.from_pairs(
+            lambda i, j: distance_metric_multilabel(
                 label_vectors[i], label_vectors[j], image_features[i], image_features[j]
-            )
-        # self.logger.info("calculating similarity {},{},{}".format(i, j, sim))
-
-        for i in range(num_of_images):
-            similarity_matrix_lin_list[get_key_for_indices(i, i)] = 1.0
-
-        series = pd.Series(similarity_matrix_lin_list)
-        matrix_df = pd.DataFrame(
-            {"col_major_index": series.index, "similarity": series.values}
+            ),
+            num_of_images,
         )
-        matrix_df.to_csv(similarity_matrix_file)
+        similarity_matrix.save(similarity_matrix_file)
         self.logger.debug(
             "Done calculating the similarity matrix stored at: {}".format(
                 similarity_matrix_file
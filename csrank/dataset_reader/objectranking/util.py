@@ -1,39 +1,68 @@
-from itertools import combinations
+from functools import lru_cache
 import logging
 
 import numpy as np
 
+from csrank.numpy_util import PAIR_BATCH_MEMORY
 from csrank.numpy_util import ranking_ordering_conversion
 
 __all__ = [
     "generate_complete_pairwise_dataset",
+    "generate_pairwise_dataset_batches",
     "complete_linear_regression_dataset",
     "complete_linear_regression_dataset",
     "sub_sampling_rankings",
 ]
 
 
-def generate_pairwise_instances(features):
-    pairs = np.array(list(combinations(features, 2)))
-
-    n_pairs = len(pairs)
-    neg_indices = np.arange(0, n_pairs, 2)
-
-    a, b = np.copy(pairs[neg_indices, 0]), np.copy(pairs[neg_indices, 1])
-    pairs[neg_indices, 1] = a
-    pairs[neg_indices, 0] = b
+@lru_cache(maxsize=None)
+def _pairwise_preference_indices(n_objects):
+    """
+        Indices of the objects of all pairs of a query sorted by preference. The pairs :math:`(i, j)` with
+        :math:`i < j` are enumerated in lexicographic order and every second pair (starting with the first) is swapped
+        to :math:`(j, i)` with the label 0, such that both preference labels occur equally often.
+    """
+    first, second = np.triu_indices(n_objects, k=1)
+    swapped = np.arange(len(first)) % 2 == 0
+    first, second = np.where(swapped, second, first), np.where(swapped, first, second)
+    y_single = (~swapped).astype(int)
+    for array in (first, second, y_single):
+        array.setflags(write=False)
+    return first, second, y_single
 
-    X1 = pairs[:, 0]
-    X2 = pairs[:, 1]
-    Y_double = np.ones([n_pairs, 1]) * np.array([1, 0])
-    Y_single = np.repeat(1, n_pairs)
 
-    Y_double[neg_indices] = [0, 1]
-    Y_single[neg_indices] = 0
-    return X1, X2, Y_double, Y_single
+def _sort_by_rankings(X, Y):
+    try:
+        n_instances = X.shape[0]
+        Y = Y.astype(int)
+        Y -= np.min(Y)
+        orderings = ranking_ordering_conversion(Y)
+        x_sorted = X[np.arange(n_instances)[:, None], orderings]
+    except (ValueError, IndexError):
+        # TODO Add the code to change the rankings to orderings and sort X according to that
+        logger = logging.getLogger("generate_complete_pairwise_dataset")
+        logger.error("Value Error: {}, {} ".format(X[0], Y[0]))
+        x_sorted = X
+    return x_sorted
+
+
+def _pairwise_dataset_from_sorted(x_sorted, difference, pairs):
+    n_instances, n_objects, n_features = x_sorted.shape
+    first, second, y_single = _pairwise_preference_indices(n_objects)
+    x_train = x_train1 = x_train2 = None
+    if pairs:
+        x_train1 = x_sorted[:, first].reshape(-1, n_features)
+        x_train2 = x_sorted[:, second].reshape(-1, n_features)
+        if difference:
+            x_train = x_train1 - x_train2
+    elif difference:
+        x_train = (x_sorted[:, first] - x_sorted[:, second]).reshape(-1, n_features)
+    y_single = np.tile(y_single, n_instances)
+    y_double = np.column_stack((y_single, 1 - y_single)).astype(float)
+    return x_train, x_train1, x_train2, y_double, y_single
 
 
-def generate_complete_pairwise_dataset(X, Y):
+def generate_complete_pairwise_dataset(X, Y, difference=True, pairs=True):
     """
         Generates the pairiwse preference data from the given rankings.The ranking amongst the objects in a query set
         :math:`Q = \\{x_1, x_2, x_3\\}` is represented by :math:`\\pi = (2,1,3)`, such that :math:`\\pi(2)=1` is the position of the :math:`x_2`.
@@ -49,6 +78,10 @@ def generate_complete_pairwise_dataset(X, Y):
             Feature vectors of the objects
         Y : numpy array (n_instances, n_objects)
             Rankings of the given objects
+        difference : bool
+            Whether to compute ``x_train``, otherwise ``None`` is returned in its place
+        pairs : bool
+            Whether to compute ``x_train1`` and ``x_train2``, otherwise ``None`` is returned in their place
 
         Returns
         -------
@@ -68,40 +101,51 @@ def generate_complete_pairwise_dataset(X, Y):
             The preference :math:`x_2 \\succ x_1` between the objects :math:`x_2` and :math:`x_1`, i.e. (1,0)
             with n_samples=:math:`n_{instances} \\cdot (n_{objects} \\choose 2)`. :class:`CmpNet` uses it
             as input.
-        y_double: array-like, shape (n_samples)
+        y_single: array-like, shape (n_samples)
             The preference :math:`x_2 \\succ x_1` between the objects :math:`x_2` and :math:`x_1`, i.e. 1
             with n_samples=:math:`n_{instances} \\cdot (n_{objects} \\choose 2)`.:class:`RankNet` and :class:`RankSVM`
             uses it as output.
     """
-    try:
-        n_instances, n_objects, n_features = X.shape
-        Y = Y.astype(int)
-        Y -= np.min(Y)
-        orderings = ranking_ordering_conversion(Y)
-        x_sorted = [X[i, orderings[i], :] for i in range(n_instances)]
-        del orderings
-    except ValueError:
-        # TODO Add the code to change the rankings to orderings and sort X according to that
-        logger = logging.getLogger("generate_complete_pairwise_dataset")
-        logger.error("Value Error: {}, {} ".format(X[0], Y[0]))
-        x_sorted = X
-    del Y
-    y_double = []
-    x_train1 = []
-    x_train2 = []
-    y_single = []
-    for features in x_sorted:
-        x1, x2, y1, y2 = generate_pairwise_instances(features)
-        x_train1.extend(x1)
-        x_train2.extend(x2)
-        y_double.extend(y1)
-        y_single.extend(y2)
-    x_train1 = np.array(x_train1)
-    x_train2 = np.array(x_train2)
-    x_train = x_train1 - x_train2
-    y_double = np.array(y_double)
-    y_single = np.array(y_single)
-    return x_train, x_train1, x_train2, y_double, y_single
+    x_sorted = _sort_by_rankings(X, Y)
+    return _pairwise_dataset_from_sorted(x_sorted, difference, pairs)
+
+
+def generate_pairwise_dataset_batches(
+    X, Y, max_memory=PAIR_BATCH_MEMORY, difference=True, pairs=True
+):
+    """
+        Generate the pairwise preference data of :func:`generate_complete_pairwise_dataset` in batches of complete
+        query sets, such that the feature arrays of each batch occupy at most ``max_memory`` bytes (but contain at
+        least one query set). Concatenating all batches yields the complete pairwise dataset.
+
+        Parameters
+        ----------
+        X : numpy array (n_instances, n_objects, n_features)
+            Feature vectors of the objects
+        Y : numpy array (n_instances, n_objects)
+            Rankings of the given objects
+        max_memory : int
+            Maximum number of bytes of the feature arrays of one batch
+        difference : bool
+            Whether to compute ``x_train``, otherwise ``None`` is yielded in its place
+        pairs : bool
+            Whether to compute ``x_train1`` and ``x_train2``, otherwise ``None`` is yielded in their place
+
+        Yields
+        ------
+        (x_train, x_train1, x_train2, y_double, y_single) : tuple
+            The pairwise preferences of a batch of query sets, see :func:`generate_complete_pairwise_dataset`
+    """
+    n_instances, n_objects, n_features = X.shape
+    n_pairs = n_objects * (n_objects - 1) // 2
+    n_arrays = 2 * int(pairs) + int(difference)
+    bytes_per_instance = max(1, n_arrays * n_pairs * n_features * X.itemsize)
+    batch_size = max(1, int(max_memory // bytes_per_instance))
+    for start in range(0, n_instances, batch_size):
+        x_sorted = _sort_by_rankings(
+            X[start : start + batch_size], Y[start : start + batch_size]
+        )
+        yield _pairwise_dataset_from_sorted(x_sorted, difference, pairs)
 
 
 def complete_linear_regression_dataset(X, rankings):
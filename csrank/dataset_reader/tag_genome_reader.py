@@ -1,16 +1,19 @@
 from abc import ABCMeta
 from abc import abstractmethod
-from itertools import combinations
 import logging
 import os
 
+from joblib import delayed
+from joblib import Parallel
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.utils import check_random_state
 
 from csrank.dataset_reader.dataset_reader import DatasetReader
-from .util import get_key_for_indices
+from csrank.numpy_util import PAIR_BATCH_MEMORY
+from .util import CondensedSimilarityMatrix
 from .util import get_similarity_matrix
+from .util import similarity_matrix_exists
 from .util import standardize_features
 
 try:
@@ -36,6 +39,7 @@ class TagGenomeDatasetReader(DatasetReader, metaclass=ABCMeta):
         n_objects=5,
         random_state=None,
         standardize=True,
+        n_jobs=None,
         **kwargs,
     ):
         super(TagGenomeDatasetReader, self).__init__(
@@ -52,7 +56,7 @@ class TagGenomeDatasetReader(DatasetReader, metaclass=ABCMeta):
         genome_tags = pd.read_csv(self.tags_info_file)
         movies_df = pd.read_csv(self.movies_file)
         self.similarity_matrix_file = os.path.join(
-            self.dirname, "similarity_matrix.csv"
+            self.dirname, "similarity_matrix.npy"
         )
         self.standardize = standardize
         self.n_objects = n_objects
@@ -60,49 +64,34 @@ class TagGenomeDatasetReader(DatasetReader, metaclass=ABCMeta):
         self.n_test_instances = n_test_instances
         self.n_train_instances = n_train_instances
         self.random_state = check_random_state(random_state)
-        if not os.path.isfile(self.similarity_matrix_file):
+        self.n_jobs = n_jobs
+        if not similarity_matrix_exists(self.similarity_matrix_file):
             self.__load_dataset__(genome_scores, genome_tags, tags_applies, movies_df)
 
         self.logger.info("Loading similarity matrix")
         self.similarity_matrix = get_similarity_matrix(self.similarity_matrix_file)
         self.logger.info("Done loading similarity matrix")
-        self.weights = np.log(np.array(genome_tags[TAG_POPULARITY])) / np.log(
-            np.array(genome_tags[DOC_FREQUENCY])
-        )
         self.movies_df = pd.read_csv(self.movies_file)
         self.n_movies = len(self.movies_df)
         self.movie_features = self.movies_df.as_matrix()[:, 3:].astype(float)
         self.tags_info_df = pd.read_csv(self.tags_info_file)
+        self.weights = np.log(np.array(self.tags_info_df[TAG_POPULARITY])) / np.log(
+            np.array(self.tags_info_df[DOC_FREQUENCY])
+        )
         self.logger.info("Done creating the complete dataset")
 
     def __load_dataset__(self, genome_scores, genome_tags, tags_applies, movies_df):
-        tags_applies[TAG] = tags_applies[TAG].str.lower()
-        values_with_pop = []
-        for tid, t in genome_tags.as_matrix():
-            tags_a = tags_applies.loc[tags_applies[TAG] == t.lower()]
-            tags_total = np.array(tags_a[MOVIE_ID])
-            values_with_pop.append([tid, t, len(tags_total)])
-            self.logger.info(
-                "Tag popularity for tag {} is: {}".format(t, len(tags_total))
-            )
-            if len(tags_total) == 0:
-                self.logger.info((tid, t))
-                self.logger.info(
-                    "Tag popularity for tag {} is: {}".format(t, len(tags_total))
-                )
-                values_with_pop.append([tid, t, 2])
-        cols = list(genome_tags.columns)
-        cols.append(TAG_POPULARITY)
-        genome_tags = pd.DataFrame(values_with_pop, columns=cols)
-        doc_freq = []
-        for i, tag in enumerate(genome_tags.values):
-            df = genome_scores.loc[genome_scores["tagId"] == tag[0]]
-            freq = np.sum(np.array(df["relevance"]) > 0.5)
-            if freq == 0 or freq == 1:
-                freq = 2
-                self.logger.info("Document frequency for tag {} is: zero".format(tag))
-            doc_freq.append(freq)
-        genome_tags[DOC_FREQUENCY] = doc_freq
+        tag_counts = tags_applies.groupby(tags_applies[TAG].str.lower()).size()
+        popularity = genome_tags[TAG].str.lower().map(tag_counts).fillna(0)
+        for tid, t in genome_tags.loc[popularity == 0, [TAG_ID, TAG]].values:
+            self.logger.info("Tag popularity for tag {} is: zero".format((tid, t)))
+        genome_tags[TAG_POPULARITY] = popularity.replace(0, 2).astype(int)
+
+        relevant = (genome_scores[RELEVANCE] > 0.5).groupby(genome_scores[TAG_ID]).sum()
+        doc_freq = genome_tags[TAG_ID].map(relevant).fillna(0)
+        for tid, t in genome_tags.loc[doc_freq <= 1, [TAG_ID, TAG]].values:
+            self.logger.info("Document frequency for tag {} is: zero".format((tid, t)))
+        genome_tags[DOC_FREQUENCY] = doc_freq.where(doc_freq > 1, 2).astype(int)
         genome_tags.to_csv(self.tags_info_file, index=False)
         self.logger.info(
             "Done loading the tag popularity and doc frequency for the tags"
@@ -111,46 +100,23 @@ class TagGenomeDatasetReader(DatasetReader, metaclass=ABCMeta):
             np.array(genome_tags[DOC_FREQUENCY])
         )
 
-        objects = []
-        tags_rel = genome_scores.as_matrix()
+        # The scores are sorted by the movie and the tag id
         movie_ids = np.unique(np.array(genome_scores[MOVIE_ID]))
-        for i, movie_id in enumerate(movie_ids):
-            a = i * self.n_features
-            b = (i + 1) * self.n_features
-            objects.append(tags_rel[a:b, 2])
-        objects = np.array(objects)
-        movies_df = movies_df[movies_df[MOVIE_ID].isin(movie_ids)]
-
-        for i, tag in enumerate(genome_tags.values):
-            movies_df[tag[1]] = objects[:, i]
+        objects = np.array(genome_scores[RELEVANCE]).reshape(-1, self.n_features)
+        movies_df = movies_df[movies_df[MOVIE_ID].isin(movie_ids)].reset_index(
+            drop=True
+        )
+        movies_df = pd.concat(
+            [movies_df, pd.DataFrame(objects, columns=genome_tags[TAG])], axis=1
+        )
         movies_df.to_csv(self.movies_file, index=False)
 
         self.logger.info("Done loading the features for the movies")
 
-        num_of_movies = movie_ids.shape[0]
-        combinations_list = np.array(list(combinations(range(num_of_movies), 2)))
-        similarity_matrix = dict()
-
-        features = movies_df.as_matrix()[:, 3:]
-
-        for i, j in combinations_list:
-            similarity_matrix[get_key_for_indices(i, j)] = weighted_cosine_similarity(
-                self.weights
-            )(features[i], features[j])
-            self.logger.info(
-                "Calculating similarity {},{}, {}".format(
-                    i, j, similarity_matrix[get_key_for_indices(i, j)]
-                )
-            )
-
-        for i in range(num_of_movies):
-            similarity_matrix[get_key_for_indices(i, i)] = 1.0
-
-        series = pd.Series(similarity_matrix)
-        matrix_df = pd.DataFrame(
-            {"col_major_index": series.index, "similarity": series.values}
+        similarity_matrix = weighted_cosine_similarity_matrix(
+            objects, self.weights, n_jobs=self.n_jobs
         )
-        matrix_df.to_csv(self.similarity_matrix_file, index=False)
+        similarity_matrix.save(self.similarity_matrix_file)
         self.logger.info(
             "Done calculating the similarity matrix stored at: {}".format(
                 self.similarity_matrix_file
@@ -163,19 +129,17 @@ class TagGenomeDatasetReader(DatasetReader, metaclass=ABCMeta):
             "For instances {} objects {}, seed {}".format(n_instances, n_objects, seed)
         )
         random_state = check_random_state(seed)
-        X = np.empty((n_instances, n_objects, self.n_features), dtype=float)
-        scores = np.empty((n_instances, n_objects), dtype=float)
-        for i in range(n_instances):
-            subset = random_state.choice(self.n_movies, size=n_objects, replace=False)
-            X[i] = self.movie_features[subset]
-            D = np.ones((n_objects, n_objects), dtype=float)
-            for j, k in combinations(np.arange(n_objects), 2):
-                D[j, k] = D[k, j] = self.similarity_matrix[
-                    get_key_for_indices(subset[j], subset[k])
-                ]
-            sum_dist = D.mean(axis=0)
-            medoid = np.argmax(sum_dist)
-            scores[i] = D[medoid]
+        subsets = np.array(
+            [
+                random_state.choice(self.n_movies, size=n_objects, replace=False)
+                for _ in range(n_instances)
+            ]
+        )
+        X = self.movie_features[subsets]
+        # Similarities between the objects of each subset
+        D = self.similarity_matrix[subsets[:, :, None], subsets[:, None]].astype(float)
+        medoids = np.argmax(D.mean(axis=1), axis=1)
+        scores = D[np.arange(n_instances), medoids]
         return X, scores
 
     def get_genre_tag_id(self):
@@ -216,11 +180,7 @@ class TagGenomeDatasetReader(DatasetReader, metaclass=ABCMeta):
             if len(quartile_tags) < length:
                 quartile_tags = popular_tags
             tag_ids = random_state.choice(quartile_tags, size=length)
-            distances = [
-                self.similarity_matrix[get_key_for_indices(i, j)]
-                for j in range(self.n_movies)
-            ]
-            distances = np.array(distances)
+            distances = self.similarity_matrix[i, np.arange(self.n_movies)]
             critique_d = critique_dist(
                 feature, self.movie_features, tag_ids, direction=direction, relu=False
             )
@@ -321,6 +281,50 @@ def weighted_cosine_similarity(weights):
     return distance_function
 
 
+def _weighted_cosine_rows(features, weights, norms, start, stop):
+    # Similarities of the rows start, ..., stop - 1 to all later rows
+    gram = (features[start:stop] * weights) @ features[start:].T
+    gram /= norms[start:stop, None] * norms[None, start:]
+    rows = [gram[i, i + 1 :] for i in range(stop - start)]
+    return np.concatenate(rows).astype(np.float32)
+
+
+def weighted_cosine_similarity_matrix(
+    features, weights, max_memory=PAIR_BATCH_MEMORY, n_jobs=None
+):
+    """
+        Calculate the :func:`weighted_cosine_similarity` of all pairs of objects as blocks of the weighted Gram matrix
+        :math:`(X \\odot w) X^T` normalized by the weighted norms of the objects.
+
+        Parameters
+        ----------
+        features : numpy array (n_objects, n_features)
+            Feature vectors of the objects
+        weights : numpy array (n_features)
+            Weights of the features
+        max_memory : int
+            Upper bound (in bytes) for the size of one block of the Gram matrix
+        n_jobs : int or None
+            Number of processes used to calculate the blocks, see :class:`joblib.Parallel`
+
+        Returns
+        -------
+        matrix : :class:`CondensedSimilarityMatrix`
+            Similarities of all pairs of objects
+    """
+    features = np.asarray(features, dtype=float)
+    n_objects = features.shape[0]
+    norms = np.sqrt(np.sum(weights * features * features, axis=1))
+    block_size = int(max(1, max_memory // (8 * n_objects)))
+    blocks = Parallel(n_jobs=n_jobs)(
+        delayed(_weighted_cosine_rows)(
+            features, weights, norms, start, min(start + block_size, n_objects)
+        )
+        for start in range(0, n_objects, block_size)
+    )
+    return CondensedSimilarityMatrix(np.concatenate(blocks))
+
+
 def critique_dist(ic, irs, tag_ids, direction=-1, relu=True):
     distances = ((irs[:, tag_ids] - ic[tag_ids]) * direction).T
     if relu:
@@ -1,6 +1,11 @@
+from collections import OrderedDict
+import io
 import itertools as iter
+import os
 import sys
 
+from joblib import delayed
+from joblib import Parallel
 import numpy as np
 from sklearn.metrics import f1_score
 from sklearn.preprocessing import StandardScaler
@@ -97,12 +102,240 @@ def quicksort(arr, matrix):
         return quicksort(left, matrix) + [pivot] + quicksort(right, matrix)
 
 
+class CondensedSimilarityMatrix(object):
+    def __init__(self, condensed):
+        """
+            Symmetric similarity matrix with a unit diagonal, which only stores the upper triangle (without the
+            diagonal) in row-major order, i.e. in the order of ``itertools.combinations(range(n_objects), 2)``.
+
+            The similarities are looked up with vectorized index arithmetic, indexing works like for a numpy array of
+            shape (n_objects, n_objects) with integer arrays, e.g. ``matrix[subset[:, None], subset]`` returns the
+            block of similarities between the objects of a subset.
+
+            >>> matrix = CondensedSimilarityMatrix(np.array([0.1, 0.2, 0.3]))
+            >>> matrix.n_objects
+            3
+            >>> matrix[2, 1]
+            0.3
+            >>> subset = np.array([2, 0])
+            >>> matrix[subset[:, None], subset].tolist()
+            [[1.0, 0.2], [0.2, 1.0]]
+
+            Parameters
+            ----------
+            condensed : numpy array (n_objects * (n_objects - 1) / 2)
+                Similarities of all pairs of objects, can be a memory-mapped array
+        """
+        self.condensed = condensed
+        self.n_objects = int(round((1 + np.sqrt(1 + 8 * len(condensed))) / 2))
+
+    @classmethod
+    def from_pairs(cls, similarity, n_objects, dtype=np.float32):
+        """
+            Create the matrix from a function evaluated on every pair of objects.
+
+            Parameters
+            ----------
+            similarity : function
+                Function mapping the indices (i, j) with i < j to the similarity of the objects
+            n_objects : int
+                Number of objects
+            dtype : numpy dtype
+                Data type used to store the similarities
+
+            Returns
+            -------
+            matrix : :class:`CondensedSimilarityMatrix`
+        """
+        pairs = iter.combinations(range(n_objects), 2)
+        n_pairs = n_objects * (n_objects - 1) // 2
+        condensed = np.fromiter(
+            (similarity(i, j) for i, j in pairs), dtype=dtype, count=n_pairs
+        )
+        return cls(condensed)
+
+    @classmethod
+    def from_csv(cls, file_path, dtype=np.float32):
+        """
+            Read the matrix from a csv file with the columns "col_major_index" containing the keys created by
+            :func:`get_key_for_indices` and "similarity".
+        """
+        data_frame = pd.read_csv(file_path)
+        indices = data_frame["col_major_index"].str.extract(r"\((\d+), (\d+)\)")
+        i, j = np.array(indices, dtype=int).T
+        off_diagonal = i != j
+        n_objects = np.max(j) + 1
+        condensed = np.ones(n_objects * (n_objects - 1) // 2, dtype=dtype)
+        matrix = cls(condensed)
+        condensed[matrix.condensed_index(i[off_diagonal], j[off_diagonal])] = np.array(
+            data_frame["similarity"]
+        )[off_diagonal]
+        return matrix
+
+    def condensed_index(self, i, j):
+        """Position of the similarity of the objects i < j in the condensed array"""
+        return self.n_objects * i - i * (i + 1) // 2 + (j - i - 1)
+
+    def __getitem__(self, indices):
+        i, j = np.broadcast_arrays(*indices)
+        i, j = np.minimum(i, j), np.maximum(i, j)
+        result = np.ones(i.shape, dtype=self.condensed.dtype)
+        off_diagonal = i != j
+        result[off_diagonal] = self.condensed[
+            self.condensed_index(i[off_diagonal], j[off_diagonal])
+        ]
+        if result.ndim == 0:
+            return result.item()
+        return result
+
+    def save(self, file_path):
+        np.save(file_path, self.condensed)
+
+
 def get_similarity_matrix(file_path):
-    data_frame = pd.read_csv(file_path)
-    similarity_dictionary = data_frame.set_index("col_major_index")[
-        "similarity"
-    ].to_dict()
-    return similarity_dictionary
+    """
+        Load a :class:`CondensedSimilarityMatrix` stored as a ".npy" file as a memory-mapped array. If only a csv file
+        with the same name exists, it is converted to the binary format first.
+
+        Parameters
+        ----------
+        file_path : string
+            Path of the ".npy" file
+
+        Returns
+        -------
+        matrix : :class:`CondensedSimilarityMatrix`
+    """
+    if not os.path.isfile(file_path):
+        csv_file_path = os.path.splitext(file_path)[0] + ".csv"
+        CondensedSimilarityMatrix.from_csv(csv_file_path).save(file_path)
+    return CondensedSimilarityMatrix(np.load(file_path, mmap_mode="r"))
+
+
+def similarity_matrix_exists(file_path):
+    """Check if the binary similarity matrix or a csv file which can be converted exists"""
+    csv_file_path = os.path.splitext(file_path)[0] + ".csv"
+    return os.path.isfile(file_path) or os.path.isfile(csv_file_path)
+
+
+LETOR_BLOCK_SIZE = 2 ** 26
+
+
+def _strip_svmlight_prefixes(block):
+    # "<relevance> qid:<qid> 1:<value> 2:<value>" becomes "<relevance> <qid> 1 <value> 2 <value>"
+    return block.replace(b"qid:", b"").replace(b":", b" ")
+
+
+def _read_line_blocks(file, block_size):
+    remainder = b""
+    while True:
+        block = file.read(block_size)
+        if not block:
+            break
+        block = remainder + block
+        end = block.rfind(b"\n") + 1
+        if end == 0:
+            remainder = block
+            continue
+        remainder = block[end:]
+        yield block[:end]
+    if remainder.strip():
+        yield remainder
+
+
+def parse_letor_file(file_path, block_size=LETOR_BLOCK_SIZE):
+    """
+        Parse a dense LETOR (SVMlight) file with lines of the form ``<relevance> qid:<qid> 1:<value> ... # comment``,
+        as used by the MQ2007, MQ2008 and MSLR-WEB datasets.
+
+        The file is read in blocks of ``block_size`` bytes. The "qid:" and feature index prefixes of each block are
+        replaced by separators with plain byte replacements and the columns of the values are parsed by the C engine of
+        :func:`pandas.read_csv`.
+        The documents are grouped by their query in the order of the first occurrence of each query.
+
+        Parameters
+        ----------
+        file_path : string
+            Path of the text file
+        block_size : int
+            Number of bytes parsed at once
+
+        Returns
+        -------
+        query_ids : numpy array (n_queries)
+            Identifiers of the queries
+        data : numpy array (n_documents, n_features + 1)
+            Float32 feature vectors of the documents with the relevance degree as the last column, the documents of
+            one query are contiguous
+        offsets : numpy array (n_queries + 1)
+            The documents of query ``query_ids[i]`` are ``data[offsets[i]:offsets[i + 1]]``
+    """
+    with open(file_path, "rb") as file:
+        first_line = _strip_svmlight_prefixes(file.readline().split(b"#")[0])
+        n_features = (len(first_line.split()) - 2) // 2
+        file.seek(0)
+        # Skip the columns of the feature indices
+        columns = [0, 1] + list(range(3, 2 * n_features + 2, 2))
+        dtype = {column: np.float32 for column in columns}
+        dtype[1] = np.int64
+        blocks = [
+            pd.read_csv(
+                io.BytesIO(_strip_svmlight_prefixes(block)),
+                sep=r"\s+",
+                header=None,
+                comment="#",
+                usecols=columns,
+                dtype=dtype,
+            )
+            for block in _read_line_blocks(file, block_size)
+        ]
+    frame = pd.concat(blocks, ignore_index=True)
+    qids = frame[1].values
+    query_ids, first, inverse = np.unique(qids, return_index=True, return_inverse=True)
+    # Number the queries in the order of their first occurrence
+    occurrence = np.argsort(first, kind="stable")
+    group = np.empty_like(occurrence)
+    group[occurrence] = np.arange(len(occurrence))
+    group = group[inverse.ravel()]
+    order = np.argsort(group, kind="stable")
+    data = np.empty((len(frame), n_features + 1), dtype=np.float32)
+    data[:, :-1] = frame[columns[2:]].values[order]
+    data[:, -1] = frame[0].values[order]
+    offsets = np.zeros(len(query_ids) + 1, dtype=int)
+    offsets[1:] = np.cumsum(np.bincount(group))
+    return query_ids[occurrence], data, offsets
+
+
+def read_letor_files(files, n_jobs=None, block_size=LETOR_BLOCK_SIZE):
+    """
+        Parse several LETOR files (e.g. the folds of a dataset) with :func:`parse_letor_file` in parallel.
+
+        Parameters
+        ----------
+        files : list of strings
+            Paths of the text files
+        n_jobs : int or None
+            Number of processes parsing the files, see :class:`joblib.Parallel`
+        block_size : int
+            Number of bytes parsed at once
+
+        Returns
+        -------
+        datasets : dict
+            Map from the file name without the extension to an ordered map from the query identifiers to the
+            documents of the query (n_documents, n_features + 1), the relevance degree is the last column
+    """
+    parsed = Parallel(n_jobs=n_jobs)(
+        delayed(parse_letor_file)(file, block_size) for file in files
+    )
+    datasets = dict()
+    for file, (query_ids, data, offsets) in zip(files, parsed):
+        key = os.path.splitext(os.path.basename(file))[0]
+        datasets[key] = OrderedDict(
+            (qid, data[start:stop])
+            for qid, start, stop in zip(query_ids, offsets[:-1], offsets[1:])
+        )
+    return datasets
 
 
 def get_key_for_indices(idx1, idx2):
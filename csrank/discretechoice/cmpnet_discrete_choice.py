@@ -6,6 +6,7 @@ from keras.regularizers import l2
 from csrank.choicefunction.util import generate_complete_pairwise_dataset
 from csrank.core.cmpnet_core import CmpNetCore
 from csrank.discretechoice.discrete_choice import DiscreteObjectChooser
+from csrank.numpy_util import PAIR_BATCH_MEMORY
 
 
 class CmpNetDiscreteChoiceFunction(CmpNetCore, DiscreteObjectChooser):
@@ -22,6 +23,7 @@ class CmpNetDiscreteChoiceFunction(CmpNetCore, DiscreteObjectChooser):
         metrics=["binary_accuracy"],
         batch_size=256,
         random_state=None,
+        pair_batch_memory=PAIR_BATCH_MEMORY,
         **kwargs,
     ):
         """
@@ -67,6 +69,8 @@ class CmpNetDiscreteChoiceFunction(CmpNetCore, DiscreteObjectChooser):
                 Batch size to use during training
             random_state : int, RandomState instance or None
                 Seed of the pseudorandom generator or a RandomState instance
+            pair_batch_memory : int
+                Maximum number of bytes of the pairs of objects gathered at once to predict the pairwise preferences
             **kwargs
                 Keyword arguments for the algorithms
 
@@ -86,6 +90,7 @@ class CmpNetDiscreteChoiceFunction(CmpNetCore, DiscreteObjectChooser):
             metrics=metrics,
             batch_size=batch_size,
             random_state=random_state,
+            pair_batch_memory=pair_batch_memory,
             **kwargs,
         )
         self.logger = logging.getLogger(CmpNetDiscreteChoiceFunction.__name__)
@@ -1,5 +1,4 @@
 from itertools import combinations
-from itertools import permutations
 import logging
 
 from keras import backend as K
@@ -11,10 +10,11 @@ from keras.layers import Dense
 from keras.layers import Lambda
 from keras.optimizers import SGD
 from keras.regularizers import l2
-import numpy as np
 
 from csrank.core.feta_network import FETANetwork
 from csrank.layers import NormalizedDense
+from csrank.numpy_util import PAIR_BATCH_MEMORY
+from csrank.numpy_util import pairwise_borda_scores
 from csrank.numpy_util import sigmoid
 from .discrete_choice import DiscreteObjectChooser
 
@@ -36,6 +36,7 @@ class FETADiscreteChoiceFunction(FETANetwork, DiscreteObjectChooser):
         metrics=["categorical_accuracy"],
         batch_size=256,
         random_state=None,
+        pair_batch_memory=PAIR_BATCH_MEMORY,
         **kwargs,
     ):
         """
@@ -85,6 +86,8 @@ class FETADiscreteChoiceFunction(FETANetwork, DiscreteObjectChooser):
                 Batch size to use for training
             random_state : int or object
                 Numpy random state
+            pair_batch_memory : int
+                Maximum number of bytes of the pairs of objects gathered at once to predict the pairwise preferences
             **kwargs
                 Keyword arguments for the hidden units
         """
@@ -103,6 +106,7 @@ class FETADiscreteChoiceFunction(FETANetwork, DiscreteObjectChooser):
             metrics=metrics,
             batch_size=batch_size,
             random_state=random_state,
+            pair_batch_memory=pair_batch_memory,
             **kwargs,
         )
         self.logger = logging.getLogger(FETADiscreteChoiceFunction.__name__)
@@ -285,18 +289,13 @@ class FETADiscreteChoiceFunction(FETANetwork, DiscreteObjectChooser):
 
     def _predict_scores_using_pairs(self, X, **kwd):
         n_instances, n_objects, n_features = X.shape
-        n2 = n_objects * (n_objects - 1)
-        pairs = np.empty((n2, 2, n_features))
-        scores = np.zeros((n_instances, n_objects))
-        for n in range(n_instances):
-            for k, (i, j) in enumerate(permutations(range(n_objects), 2)):
-                pairs[k] = (X[n, i], X[n, j])
-            result = self._predict_pair(
-                pairs[:, 0], pairs[:, 1], only_pairwise=True, **kwd
-            )[:, 0]
-            scores[n] += result.reshape(n_objects, n_objects - 1).mean(axis=1)
-            del result
-        del pairs
+        scores = pairwise_borda_scores(
+            self._predict_pair,
+            X,
+            max_memory=self.pair_batch_memory,
+            only_pairwise=True,
+            **kwd,
+        )
         if self._use_zeroth_model:
             scores_zero = self.zero_order_model.predict(X.reshape(-1, n_features))
             scores_zero = scores_zero.reshape(n_instances, n_objects)
@@ -1,4 +1,3 @@
-from itertools import product
 import logging
 
 import numpy as np
@@ -13,6 +12,7 @@ from .likelihoods import create_weight_dictionary
 from .likelihoods import fit_pymc3_model
 from .likelihoods import likelihood_dict
 from .likelihoods import LogLikelihood
+from .likelihoods import posterior_means
 
 try:
     import pymc3 as pm
@@ -105,6 +105,7 @@ class GeneralizedNestedLogitModel(DiscreteObjectChooser, Learner):
         self.model = None
         self.trace = None
         self.trace_vi = None
+        self.posterior_means_ = None
         self.Xt = None
         self.Yt = None
         self.p = None
@@ -344,19 +345,10 @@ class GeneralizedNestedLogitModel(DiscreteObjectChooser, Learner):
         fit_pymc3_model(self, sampler, draws, tune, vi_params, **kwargs)
 
     def _predict_scores_fixed(self, X, **kwargs):
-        mean_trace = dict(pm.summary(self.trace)["mean"])
-        weights = np.array(
-            [
-                mean_trace["weights[{}]".format(i)]
-                for i in range(self.n_object_features_fit_)
-            ]
-        )
-        lambda_k = np.array(
-            [mean_trace["lambda_k[{}]".format(i)] for i in range(self.n_nests)]
-        )
-        weights_ik = np.zeros((self.n_object_features_fit_, self.n_nests))
-        for i, k in product(range(self.n_object_features_fit_), range(self.n_nests)):
-            weights_ik[i][k] = mean_trace["weights_ik[{},{}]".format(i, k)]
+        means = posterior_means(self)
+        weights = means["weights"]
+        lambda_k = means["lambda_k"]
+        weights_ik = means["weights_ik"]
         alpha_ik = np.dot(X, weights_ik)
         alpha_ik = npu.softmax(alpha_ik, axis=2)
         utility = np.dot(X, weights)
@@ -408,6 +400,7 @@ class GeneralizedNestedLogitModel(DiscreteObjectChooser, Learner):
         self.model = None
         self.trace = None
         self.trace_vi = None
+        self.posterior_means_ = None
         self.Xt = None
         self.Yt = None
         self.p = None
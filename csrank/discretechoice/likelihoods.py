@@ -1,5 +1,7 @@
 import copy
 
+import numpy as np
+
 from csrank.theano_util import normalize
 
 try:
@@ -103,6 +105,7 @@ def create_weight_dictionary(model_args, shapes):
 
 
 def fit_pymc3_model(self, sampler, draws, tune, vi_params, **kwargs):
+    self.posterior_means_ = None
     callbacks = vi_params.get("callbacks", [])
     for i, c in enumerate(callbacks):
         if isinstance(c, CheckParametersConvergence):
@@ -153,3 +156,27 @@ def fit_pymc3_model(self, sampler, draws, tune, vi_params, **kwargs):
             self.trace = pm.sample(
                 chains=2, cores=8, tune=tune, draws=draws, **kwargs, step=pm.NUTS()
             )
+
+
+def posterior_means(self, refresh=False):
+    """
+        Posterior mean of every variable in the trace of a fitted model.
+
+        The means are computed once from ``self.trace`` and cached on the learner as ``posterior_means_``, so that
+        predicting only needs plain NumPy arrays. The cache is cleared whenever the model is fitted again.
+
+        Parameters
+        ----------
+        refresh : bool
+            Recompute the means, e.g. after the trace was changed manually
+
+        Returns
+        -------
+        means : dict
+            Mapping from the variable name to the array of its posterior mean
+    """
+    if refresh or getattr(self, "posterior_means_", None) is None:
+        self.posterior_means_ = {
+            name: np.mean(self.trace[name], axis=0) for name in self.trace.varnames
+        }
+    return self.posterior_means_
@@ -1,4 +1,3 @@
-from itertools import product
 import logging
 
 import numpy as np
@@ -12,6 +11,7 @@ from .likelihoods import create_weight_dictionary
 from .likelihoods import fit_pymc3_model
 from .likelihoods import likelihood_dict
 from .likelihoods import LogLikelihood
+from .likelihoods import posterior_means
 
 try:
     import pymc3 as pm
@@ -84,6 +84,7 @@ class MixedLogitModel(DiscreteObjectChooser, Learner):
         self.model = None
         self.trace = None
         self.trace_vi = None
+        self.posterior_means_ = None
         self.Xt = None
         self.Yt = None
         self.p = None
@@ -222,10 +223,7 @@ class MixedLogitModel(DiscreteObjectChooser, Learner):
         fit_pymc3_model(self, sampler, draws, tune, vi_params, **kwargs)
 
     def _predict_scores_fixed(self, X, **kwargs):
-        summary = dict(pm.summary(self.trace)["mean"])
-        weights = np.zeros((self.n_object_features_fit_, self.n_mixtures))
-        for i, k in product(range(self.n_object_features_fit_), range(self.n_mixtures)):
-            weights[i][k] = summary["weights[{},{}]".format(i, k)]
+        weights = posterior_means(self)["weights"]
         utility = np.dot(X, weights)
         p = np.mean(npu.softmax(utility, axis=1), axis=2)
         return p
@@ -263,6 +261,7 @@ class MixedLogitModel(DiscreteObjectChooser, Learner):
         self.model = None
         self.trace = None
         self.trace_vi = None
+        self.posterior_means_ = None
         self.Xt = None
         self.Yt = None
         self.p = None
@@ -10,6 +10,7 @@ from .likelihoods import create_weight_dictionary
 from .likelihoods import fit_pymc3_model
 from .likelihoods import likelihood_dict
 from .likelihoods import LogLikelihood
+from .likelihoods import posterior_means
 
 try:
     import pymc3 as pm
@@ -75,6 +76,7 @@ class MultinomialLogitModel(DiscreteObjectChooser, Learner):
         self.model = None
         self.trace = None
         self.trace_vi = None
+        self.posterior_means_ = None
         self.Xt = None
         self.Yt = None
         self.p = None
@@ -221,14 +223,9 @@ class MultinomialLogitModel(DiscreteObjectChooser, Learner):
         fit_pymc3_model(self, sampler, draws, tune, vi_params, **kwargs)
 
     def _predict_scores_fixed(self, X, **kwargs):
-        d = dict(pm.summary(self.trace)["mean"])
-        intercept = 0.0
-        weights = np.array(
-            [d["weights[{}]".format(i)] for i in range(self.n_object_features_fit_)]
-        )
-        if "intercept" in d:
-            intercept = intercept + d["intercept"]
-        return np.dot(X, weights) + intercept
+        means = posterior_means(self)
+        intercept = means.get("intercept", 0.0)
+        return np.dot(X, means["weights"]) + intercept
 
     def predict(self, X, **kwargs):
         return super().predict(X, **kwargs)
@@ -262,6 +259,7 @@ class MultinomialLogitModel(DiscreteObjectChooser, Learner):
         self.model = None
         self.trace = None
         self.trace_vi = None
+        self.posterior_means_ = None
         self.Xt = None
         self.Yt = None
         self.p = None
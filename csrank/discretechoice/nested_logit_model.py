@@ -13,6 +13,7 @@ from csrank.util import print_dictionary
 from .discrete_choice import DiscreteObjectChooser
 from .likelihoods import likelihood_dict
 from .likelihoods import LogLikelihood
+from .likelihoods import posterior_means
 
 try:
     import pymc3 as pm
@@ -104,6 +105,7 @@ class NestedLogitModel(DiscreteObjectChooser, Learner):
         self.model = None
         self.trace = None
         self.trace_vi = None
+        self.posterior_means_ = None
         self.Xt = None
         self.Yt = None
         self.p = None
@@ -402,23 +404,10 @@ class NestedLogitModel(DiscreteObjectChooser, Learner):
 
     def _predict_scores_fixed(self, X, **kwargs):
         y_nests = self.create_nests(X)
-        mean_trace = dict(pm.summary(self.trace)["mean"])
-        weights = np.array(
-            [
-                mean_trace["weights[{}]".format(i)]
-                for i in range(self.n_object_features_fit_)
-            ]
-        )
-        weights_k = np.array(
-            [
-                mean_trace["weights_k[{}]".format(i)]
-                for i in range(self.n_object_features_fit_)
-            ]
-        )
-        lambda_k = np.array(
-            [mean_trace["lambda_k[{}]".format(i)] for i in range(self.n_nests)]
-        )
-        weights = weights / lambda_k[:, None]
+        means = posterior_means(self)
+        weights_k = means["weights_k"]
+        lambda_k = means["lambda_k"]
+        weights = means["weights"] / lambda_k[:, None]
         utility_k = np.dot(self.features_nests, weights_k)
         utility = self._eval_utility_np(X, y_nests, weights)
         scores = self._get_probabilities_np(y_nests, utility, lambda_k, utility_k)
@@ -470,6 +459,7 @@ class NestedLogitModel(DiscreteObjectChooser, Learner):
         self.model = None
         self.trace = None
         self.trace_vi = None
+        self.posterior_means_ = None
         self.Xt = None
         self.Yt = None
         self.p = None
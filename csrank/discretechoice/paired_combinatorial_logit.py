@@ -13,6 +13,7 @@ from .likelihoods import create_weight_dictionary
 from .likelihoods import fit_pymc3_model
 from .likelihoods import likelihood_dict
 from .likelihoods import LogLikelihood
+from .likelihoods import posterior_means
 
 try:
     import pymc3 as pm
@@ -102,6 +103,7 @@ class PairedCombinatorialLogit(DiscreteObjectChooser, Learner):
         self.model = None
         self.trace = None
         self.trace_vi = None
+        self.posterior_means_ = None
         self.Xt = None
         self.Yt = None
         self.p = None
@@ -333,16 +335,9 @@ class PairedCombinatorialLogit(DiscreteObjectChooser, Learner):
         fit_pymc3_model(self, sampler, draws, tune, vi_params, **kwargs)
 
     def _predict_scores_fixed(self, X, **kwargs):
-        mean_trace = dict(pm.summary(self.trace)["mean"])
-        weights = np.array(
-            [
-                mean_trace["weights[{}]".format(i)]
-                for i in range(self.n_object_features_fit_)
-            ]
-        )
-        lambda_k = np.array(
-            [mean_trace["lambda_k[{}]".format(i)] for i in range(self.n_nests)]
-        )
+        means = posterior_means(self)
+        weights = means["weights"]
+        lambda_k = means["lambda_k"]
         utility = np.dot(X, weights)
         p = self._get_probabilities_np(utility, lambda_k)
         return p
@@ -385,6 +380,7 @@ class PairedCombinatorialLogit(DiscreteObjectChooser, Learner):
         self.model = None
         self.trace = None
         self.trace_vi = None
+        self.posterior_means_ = None
         self.Xt = None
         self.Yt = None
         self.p = None
@@ -1,5 +1,6 @@
 import logging
 
+from keras import backend as K
 from keras.layers import Activation
 from keras.layers import BatchNormalization
 from keras.layers import Dense
@@ -8,7 +9,13 @@ from keras.layers import Lambda
 from keras.layers.merge import average
 from keras.models import Model
 
-__all__ = ["NormalizedDense", "DeepSet", "create_input_lambda"]
+__all__ = [
+    "NormalizedDense",
+    "DeepSet",
+    "create_input_lambda",
+    "create_masked_mean_lambda",
+    "create_broadcast_lambda",
+]
 
 
 class NormalizedDense(object):
@@ -145,6 +152,29 @@ class DeepSet(object):
             self._create_model(shape)
         return self.cached_models[n_objects](x)
 
+    def masked_call(self, x, mask):
+        """
+            Apply the set mapping layers to a padded tensor of shape (n_instances, n_objects, n_features) and average
+            the mapped objects selected by the mask. In contrast to calling the layer, the graph does not depend on
+            the number of objects, which may be unknown.
+
+            Parameters
+            ----------
+            x : tensor (n_instances, n_objects, n_features)
+                Padded query sets
+            mask : tensor (n_instances, n_objects)
+                One for the objects of the query set and zero for the padding
+
+            Returns
+            -------
+            set_repr : tensor (n_instances, units)
+                Representation of the query sets
+        """
+        curr = x
+        for layer in self.set_mapping_layers:
+            curr = layer(curr)
+        return create_masked_mean_lambda()([curr, mask])
+
     def get_weights(self):
         w_set = [x.get_weights() for x in self.set_mapping_layers]
         return w_set
@@ -157,3 +187,24 @@ class DeepSet(object):
 def create_input_lambda(i):
     """Extracts off an object tensor from an input tensor"""
     return Lambda(lambda x: x[:, i])
+
+
+def create_masked_mean_lambda():
+    """Averages an object tensor over the objects selected by a mask tensor"""
+
+    def masked_mean(inputs):
+        x, mask = inputs
+        mask = K.expand_dims(K.cast(mask, K.floatx()), axis=-1)
+        return K.sum(x * mask, axis=1) / K.maximum(K.sum(mask, axis=1), 1.0)
+
+    return Lambda(masked_mean)
+
+
+def create_broadcast_lambda():
+    """Repeats a tensor of the query set for each object of an object tensor"""
+
+    def broadcast(inputs):
+        x, set_repr = inputs
+        return K.tile(K.expand_dims(set_repr, axis=1), [1, K.shape(x)[1], 1])
+
+    return Lambda(broadcast)
@@ -1,4 +1,5 @@
 from keras import backend as K
+import numpy as np
 import tensorflow as tf
 
 from csrank.tensorflow_util import tensorify
@@ -8,51 +9,329 @@ __all__ = [
     "make_smooth_ndcg_loss",
     "smooth_rank_loss",
     "plackett_luce_loss",
+    "make_plackett_luce_loss",
+    "make_sampled_rank_loss",
+    "make_lambda_rank_loss",
 ]
 
 
+def object_mask(y_true):
+    """Mask of the objects, which is zero for the padding objects with a negative preference"""
+    return K.cast(K.greater_equal(y_true, 0), dtype="float32")
+
+
+def masks_padding(function):
+    """
+        Mark a loss or metric function, which ignores the padding objects with a negative preference. Only marked
+        functions can be used to train on padded query sets, see :func:`check_padding_aware`.
+    """
+    function.masks_padding = True
+    return function
+
+
+def check_padding_aware(loss_function, metrics=None):
+    """
+        Check that the loss function and the metrics ignore the padding objects, i.e. that they are marked by
+        :func:`masks_padding`.
+
+        Parameters
+        ----------
+        loss_function : function or string
+            Loss function of the model trained on padded query sets
+        metrics : list or None
+            Metrics of the model
+
+        Raises
+        ------
+        ValueError
+            If the loss function or one of the metrics does not ignore the padding objects
+    """
+    functions = [loss_function] + list(metrics or [])
+    unmasked = [f for f in functions if not getattr(f, "masks_padding", False)]
+    if len(unmasked) > 0:
+        raise ValueError(
+            "Training on padded query sets requires losses and metrics which ignore the padding objects, "
+            "but {} do not".format([getattr(f, "__name__", f) for f in unmasked])
+        )
+
+
+def ranked_pairs_mask(y_true):
+    """Mask of the pairs (i, j) of objects, where object i is ranked before object j and none is padding"""
+    valid = object_mask(y_true)
+    mask = K.cast(K.greater(y_true[:, None] - y_true[:, :, None], 0), dtype="float32")
+    return mask * valid[:, None] * valid[:, :, None]
+
+
 def identifiable(loss_function):
     def wrap_loss(y_true, y_pred):
         alpha = 1e-4
-        ss = tf.reduce_sum(tf.square(y_pred), axis=1)
+        valid = K.cast(object_mask(y_true), dtype=y_pred.dtype)
+        ss = tf.reduce_sum(tf.square(y_pred) * valid, axis=1)
         return alpha * ss + loss_function(y_true, y_pred)
 
     return wrap_loss
 
 
+@masks_padding
 @identifiable
 def hinged_rank_loss(y_true, y_pred):
     y_true, y_pred = tensorify(y_true), tensorify(y_pred)
-    mask = K.cast(K.greater(y_true[:, None] - y_true[:, :, None], 0), dtype="float32")
+    mask = ranked_pairs_mask(y_true)
     diff = y_pred[:, :, None] - y_pred[:, None]
     hinge = K.maximum(mask * (1 - diff), 0)
     n = K.sum(mask, axis=(1, 2))
     return K.sum(hinge, axis=(1, 2)) / n
 
 
+@masks_padding
 @identifiable
 def smooth_rank_loss(y_true, y_pred):
     y_true, y_pred = tensorify(y_true), tensorify(y_pred)
-    mask = K.cast(K.greater(y_true[:, None] - y_true[:, :, None], 0), dtype="float32")
+    mask = ranked_pairs_mask(y_true)
     exped = K.exp(y_pred[:, None] - y_pred[:, :, None])
     result = K.sum(exped * mask, axis=[1, 2])
     return result / K.sum(mask, axis=(1, 2))
 
 
-@identifiable
-def plackett_luce_loss(y_true, s_pred):
+def _smooth_pair_loss(s_better, s_worse):
+    return K.exp(s_worse - s_better)
+
+
+def _hinged_pair_loss(s_better, s_worse):
+    return K.maximum(1 - (s_better - s_worse), 0)
+
+
+# Loss of a pair of objects, where the first one is ranked before the second one
+_PAIR_LOSSES = {
+    smooth_rank_loss: _smooth_pair_loss,
+    hinged_rank_loss: _hinged_pair_loss,
+}
+
+
+def _sample_rank_pairs(n_objects, max_objects, n_pairs, sampling):
+    # Sample pairs of ranks (better, worse) of every instance and the importance weights, such that the weighted
+    # mean over the pairs is an unbiased estimate of the mean over all pairs
+    shape = tf.stack([tf.shape(n_objects)[0], n_pairs])
+    if sampling == "uniform":
+        first = tf.floor(tf.random_uniform(shape) * n_objects)
+        second = tf.floor(tf.random_uniform(shape) * (n_objects - 1))
+        second += K.cast(second >= first, "float32")
+        better, worse = tf.minimum(first, second), tf.maximum(first, second)
+        return better, worse, tf.ones_like(better)
+    # There are n_objects - d pairs with a rank distance of d
+    distances = K.cast(tf.range(1, max_objects), "float32")[None]
+    logits = K.log(K.maximum(distances * (n_objects - distances), 0))
+    logits = tf.where(
+        tf.tile(n_objects >= 2, [1, max_objects - 1]), logits, tf.zeros_like(logits)
+    )
+    distance = K.cast(tf.multinomial(logits, n_pairs), "float32") + 1
+    better = tf.floor(tf.random_uniform(shape) * K.maximum(n_objects - distance, 0))
+    # The probability of a pair is proportional to its rank distance, the sum of all distances is n(n^2-1)/6
+    weights = (n_objects + 1) / (3 * distance)
+    return better, better + distance, weights
+
+
+def make_sampled_rank_loss(rank_loss=smooth_rank_loss, n_pairs=32, sampling="uniform"):
+    """
+        Create a stochastic version of a pairwise rank loss, which evaluates a fixed number of randomly sampled pairs
+        of objects per instance instead of all pairs. The cost per step is linear in the number of objects and the
+        sampled loss is an unbiased estimate of the loss of all pairs. Like the losses of all pairs it ignores the
+        padding objects, the true rankings of the other objects are assumed to have no ties.
+
+        Parameters
+        ----------
+        rank_loss : function
+            Pairwise loss to estimate, :func:`smooth_rank_loss` or :func:`hinged_rank_loss`
+        n_pairs : int
+            Number of pairs sampled per instance in every step
+        sampling : {'uniform', 'rank_distance'}
+            How the pairs of objects are sampled:
+
+                * **uniform** : All pairs of objects are equally likely
+                * **rank_distance** : The probability of a pair is proportional to the distance of the ranks of the
+                  two objects, the pairs are reweighted accordingly
+
+        Returns
+        -------
+        loss : function
+            Loss function, which can be passed as ``loss_function`` to the learners
+    """
+    if rank_loss not in _PAIR_LOSSES:
+        raise ValueError(
+            "Unknown rank loss {}, expected one of {}".format(
+                getattr(rank_loss, "__name__", rank_loss),
+                [loss.__name__ for loss in _PAIR_LOSSES],
+            )
+        )
+    if sampling not in {"uniform", "rank_distance"}:
+        raise ValueError(
+            "Unknown sampling {}, expected 'uniform' or 'rank_distance'".format(
+                sampling
+            )
+        )
+    pair_loss = _PAIR_LOSSES[rank_loss]
+
+    @masks_padding
+    @identifiable
+    def sampled_rank_loss(y_true, y_pred):
+        y_true, y_pred = tensorify(y_true), tensorify(y_pred)
+        valid = object_mask(y_true)
+        n_objects = K.sum(valid, axis=1, keepdims=True)
+        n_instances, max_objects = tf.shape(y_true)[0], tf.shape(y_true)[1]
+        # Position r holds the object with rank r, followed by the padding objects
+        keys = K.cast(y_true, "float32") + (1 - valid) * 2 * K.cast(
+            max_objects, "float32"
+        )
+        _, orderings = tf.nn.top_k(-keys, k=max_objects)
+
+        better, worse, weights = _sample_rank_pairs(
+            n_objects, max_objects, n_pairs, sampling
+        )
+        rows = tf.tile(tf.range(n_instances)[:, None], [1, n_pairs])
+
+        def scores_at(ranks):
+            # Instances with less than two objects sample invalid ranks, which are replaced by a valid one
+            ranks = K.cast(tf.maximum(tf.minimum(ranks, n_objects - 1), 0), "int32")
+            objects = tf.gather_nd(orderings, tf.stack([rows, ranks], axis=-1))
+            return tf.gather_nd(y_pred, tf.stack([rows, objects], axis=-1))
+
+        loss = K.mean(weights * pair_loss(scores_at(better), scores_at(worse)), axis=1)
+        # Instances with less than two objects have no pairs
+        return tf.where(n_objects[:, 0] >= 2, loss, tf.zeros_like(loss))
+
+    return sampled_rank_loss
+
+
+def make_lambda_rank_loss(k=None, sigma=1.0):
+    """
+        Create the LambdaRank loss [1], whose gradients with respect to the scores are the lambdas of LambdaRank: The
+        gradients of the RankNet loss of every pair of objects, weighted by the change of the nDCG@k when swapping the
+        two objects in the predicted ranking. The relevance of an object is derived from its rank like in
+        :func:`csrank.metrics.make_ndcg_at_k_loss`, using the largest rank of each instance.
+
+        Swapping two objects below the top k does not change the nDCG@k, so only the pairs with the first object in
+        the predicted top k are evaluated. This takes :math:`O(k \\cdot m)` memory per instance after sorting the
+        scores. Padding objects (negative preferences) are ignored.
+
+        Parameters
+        ----------
+        k : int or None
+            Number of top positions of the nDCG, None for all positions
+        sigma : float
+            Steepness of the sigmoid of the RankNet preference probabilities
+
+        Returns
+        -------
+        loss : function
+            Loss function, which can be passed as ``loss_function`` to the learners
+
+        References
+        ----------
+            [1] Burges, C. J. (2010). "From ranknet to lambdarank to lambdamart: An overview.", Learning, 11(23-581).
+    """
+
+    @masks_padding
+    def lambda_rank_loss(y_true, y_pred):
+        y_true = K.cast(tensorify(y_true), "float32")
+        y_pred = K.cast(tensorify(y_pred), "float32")
+        valid = object_mask(y_true)
+        n_instances, max_objects = tf.shape(y_pred)[0], tf.shape(y_pred)[1]
+        n_top = max_objects if k is None else tf.minimum(k, max_objects)
+
+        max_rank = K.maximum(K.max(y_true, axis=1, keepdims=True), 1)
+        gains = (K.pow(2.0, (max_rank - y_true) / max_rank) - 1.0) * valid
+
+        def discount(positions):
+            positions = K.cast(positions, "float32")
+            in_top = K.cast(positions < K.cast(n_top, "float32"), "float32")
+            return in_top * K.log(2.0) / K.log(positions + 2.0)
+
+        # Positions of the objects in the predicted ranking, the padding objects are last
+        padding = tf.fill(tf.shape(y_pred), -np.inf)
+        _, orderings = tf.nn.top_k(tf.where(valid > 0, y_pred, padding), k=max_objects)
+        _, positions = tf.nn.top_k(-orderings, k=max_objects)
+        discounts = discount(positions)
+        ideal_gains, _ = tf.nn.top_k(gains, k=max_objects)
+        idcg = K.sum(ideal_gains * discount(tf.range(max_objects))[None], axis=1)
+        idcg = tf.where(idcg > 0, idcg, tf.ones_like(idcg))
+
+        # Pairs (a, j) of the objects a in the predicted top k and all objects j ranked after them
+        rows = tf.tile(tf.range(n_instances)[:, None], [1, n_top])
+        top = tf.stack([rows, orderings[:, :n_top]], axis=-1)
+        gains_top = tf.gather_nd(gains, top)
+        discounts_top = tf.gather_nd(discounts, top)
+        delta_ndcg = K.abs(
+            (gains_top[:, :, None] - gains[:, None])
+            * (discounts_top[:, :, None] - discounts[:, None])
+        )
+        delta_ndcg = tf.stop_gradient(delta_ndcg / idcg[:, None, None])
+        after = K.cast(
+            positions[:, None] > tf.gather_nd(positions, top)[:, :, None], "float32"
+        )
+        mask = after * tf.gather_nd(valid, top)[:, :, None] * valid[:, None]
+        # Positive if object a is preferred to object j, zero for ties
+        preference = K.sign(y_true[:, None] - tf.gather_nd(y_true, top)[:, :, None])
+        diff = tf.gather_nd(y_pred, top)[:, :, None] - y_pred[:, None]
+        pair_losses = K.softplus(-sigma * preference * diff) * K.abs(preference)
+        return K.sum(delta_ndcg * pair_losses * mask, axis=(1, 2))
+
+    return lambda_rank_loss
+
+
+def plackett_luce_nll(y_true, s_pred, k=None):
+    """
+        Negative log-likelihood of the rankings under the Plackett-Luce model with the utilities ``exp(s_pred)``,
+        truncated to the top ``k`` ranks. The scores are ordered by the true rankings, so the log-normalizers of all
+        ranks are a reverse cumulative log-sum-exp along the objects, which takes :math:`O(m \\log m)` time and linear
+        memory per instance. For numerical stability every suffix is shifted by its own maximum, so the normalizers
+        of the last ranks do not underflow if the scores span a large range.
+    """
     y_true = tf.cast(y_true, dtype="int32")
     s_pred = tf.cast(s_pred, dtype="float32")
-    m = tf.shape(y_true)[1]
-    raw_max = tf.reduce_max(s_pred, axis=1, keepdims=True)
-    max_elem = tf.stop_gradient(
-        tf.where(tf.is_finite(raw_max), raw_max, tf.zeros_like(raw_max))
+    n_instances, m = tf.shape(y_true)[0], tf.shape(y_true)[1]
+    # Position r holds the score of the object with rank r
+    _, orderings = tf.nn.top_k(-y_true, k=m)
+    rows = tf.tile(tf.range(n_instances)[:, None], [1, m])
+    s_sorted = tf.gather_nd(s_pred, tf.stack([rows, orderings], axis=-1))
+
+    def log_add_exp(suffix_lse, score):
+        max_elem = tf.stop_gradient(tf.maximum(suffix_lse, score))
+        max_elem = tf.where(tf.is_finite(max_elem), max_elem, tf.zeros_like(max_elem))
+        return max_elem + tf.log(
+            tf.exp(suffix_lse - max_elem) + tf.exp(score - max_elem)
+        )
+
+    # The log-normalizer of rank r sums over the objects with the ranks r, ..., m - 1
+    lse = tf.scan(
+        log_add_exp,
+        tf.transpose(s_sorted),
+        initializer=tf.fill([n_instances], -np.inf),
+        reverse=True,
     )
-    exped = tf.exp(tf.subtract(s_pred, max_elem))
-    masks = tf.greater_equal(y_true, tf.range(m)[:, None, None])
-    tri = exped * tf.cast(masks, tf.float32)
-    lse = tf.reduce_sum(tf.log(tf.reduce_sum(tri, axis=2)), axis=0)
-    return lse - tf.reduce_sum(s_pred, axis=1)
+    lse = tf.transpose(lse)
+    if k is not None:
+        lse, s_sorted = lse[:, :k], s_sorted[:, :k]
+    return tf.reduce_sum(lse, axis=1) - tf.reduce_sum(s_sorted, axis=1)
+
+
+@identifiable
+def plackett_luce_loss(y_true, s_pred):
+    return plackett_luce_nll(y_true, s_pred)
+
+
+def make_plackett_luce_loss(k=None):
+    """
+        Create the Plackett-Luce loss of the top ``k`` ranks, i.e. the negative log-likelihood of the objects chosen
+        first, second, ... and k-th from all remaining objects. For ``k=None`` this is :func:`plackett_luce_loss`.
+    """
+    if k is None:
+        return plackett_luce_loss
+
+    @identifiable
+    def plackett_luce_loss_at_k(y_true, s_pred):
+        return plackett_luce_nll(y_true, s_pred, k=k)
+
+    return plackett_luce_loss_at_k
 
 
 def make_smooth_ndcg_loss(y_true, y_pred):
@@ -0,0 +1,132 @@
+"""NumPy counterparts of the loss functions used by the linear learners.
+
+Each function returns the loss for every instance together with the gradient
+of the summed loss with respect to the predicted scores. This allows training
+small models with hand-derived gradients without building a TensorFlow graph.
+"""
+from keras.losses import binary_crossentropy
+from keras.losses import categorical_hinge
+import numpy as np
+
+from csrank.losses import hinged_rank_loss
+from csrank.losses import smooth_rank_loss
+
+__all__ = [
+    "binary_crossentropy_np",
+    "categorical_hinge_np",
+    "hinged_rank_loss_np",
+    "smooth_rank_loss_np",
+    "get_loss_np",
+]
+
+# Must match the fuzz factor keras uses for clipping the predictions
+EPSILON = 1e-7
+# Must match the weight of the penalty added by `csrank.losses.identifiable`
+IDENTIFIABLE_ALPHA = 1e-4
+
+
+def identifiable_np(loss_function):
+    def wrap_loss(y_true, y_pred):
+        loss, grad = loss_function(y_true, y_pred)
+        valid = y_true >= 0
+        loss = loss + IDENTIFIABLE_ALPHA * np.sum(np.square(y_pred) * valid, axis=1)
+        grad = grad + 2 * IDENTIFIABLE_ALPHA * y_pred * valid
+        return loss, grad
+
+    return wrap_loss
+
+
+def binary_crossentropy_np(y_true, y_pred):
+    n_objects = y_pred.shape[1]
+    inside = (y_pred > EPSILON) & (y_pred < 1 - EPSILON)
+    p = np.clip(y_pred, EPSILON, 1 - EPSILON)
+    loss = -np.mean(y_true * np.log(p) + (1 - y_true) * np.log(1 - p), axis=1)
+    grad = (p - y_true) / (p * (1 - p) * n_objects)
+    grad = np.where(inside, grad, 0.0)
+    return loss, grad
+
+
+def categorical_hinge_np(y_true, y_pred):
+    n_instances = y_pred.shape[0]
+    pos = np.sum(y_true * y_pred, axis=1)
+    negatives = (1 - y_true) * y_pred
+    neg_idx = np.argmax(negatives, axis=1)
+    neg = negatives[np.arange(n_instances), neg_idx]
+    margin = neg - pos + 1
+    loss = np.maximum(margin, 0)
+    active = (margin > 0).astype(y_pred.dtype)
+    grad = -y_true * active[:, None]
+    grad[np.arange(n_instances), neg_idx] += active * (
+        1 - y_true[np.arange(n_instances), neg_idx]
+    )
+    return loss, grad
+
+
+def _ranked_pairs_mask(y_true):
+    # mask[n, i, j] is one iff object i is ranked before object j and none of them is padding
+    valid = y_true >= 0
+    mask = np.greater(y_true[:, None] - y_true[:, :, None], 0)
+    return mask & valid[:, None] & valid[:, :, None]
+
+
+@identifiable_np
+def hinged_rank_loss_np(y_true, y_pred):
+    mask = _ranked_pairs_mask(y_true)
+    n = np.sum(mask, axis=(1, 2))
+    diff = y_pred[:, :, None] - y_pred[:, None]
+    active = mask & (diff < 1)
+    loss = np.sum(np.where(active, 1 - diff, 0.0), axis=(1, 2)) / n
+    weights = active / n[:, None, None]
+    grad = np.sum(weights, axis=1) - np.sum(weights, axis=2)
+    return loss, grad
+
+
+@identifiable_np
+def smooth_rank_loss_np(y_true, y_pred):
+    mask = _ranked_pairs_mask(y_true)
+    n = np.sum(mask, axis=(1, 2))
+    exped = np.exp(y_pred[:, None] - y_pred[:, :, None]) * mask
+    loss = np.sum(exped, axis=(1, 2)) / n
+    weights = exped / n[:, None, None]
+    grad = np.sum(weights, axis=1) - np.sum(weights, axis=2)
+    return loss, grad
+
+
+_LOSSES_NP = {
+    binary_crossentropy: binary_crossentropy_np,
+    categorical_hinge: categorical_hinge_np,
+    hinged_rank_loss: hinged_rank_loss_np,
+    smooth_rank_loss: smooth_rank_loss_np,
+    "binary_crossentropy": binary_crossentropy_np,
+    "categorical_hinge": categorical_hinge_np,
+}
+
+
+def get_loss_np(loss_function):
+    """
+        Get the NumPy counterpart of a loss function.
+
+        Parameters
+        ----------
+        loss_function : function or string
+            Loss function as passed to the learners
+
+        Returns
+        -------
+        loss_np : function
+            Function mapping (y_true, y_pred) to the per instance losses and the gradient of their sum with respect
+            to y_pred
+
+        Raises
+        ------
+        ValueError
+            If no NumPy implementation of the loss function is available
+    """
+    try:
+        return _LOSSES_NP[loss_function]
+    except (KeyError, TypeError):
+        raise ValueError(
+            "No NumPy implementation available for the loss function {}".format(
+                getattr(loss_function, "__name__", loss_function)
+            )
+        )
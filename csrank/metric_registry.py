@@ -0,0 +1,83 @@
+"""Registry of the NumPy counterparts of the TensorFlow metrics.
+
+The metrics of `csrank.metrics` register their counterparts of
+`csrank.metrics_np` when they are defined. The registry itself imports
+neither of them, so the NumPy metrics can look up the counterparts without
+depending on TensorFlow.
+"""
+from functools import partial
+
+__all__ = ["register_metric_np", "get_metric_np"]
+
+_METRICS_NP = dict()
+# Metrics which are created by a factory with parameters, e.g. the k of nDCG@k
+_METRIC_FACTORIES_NP = dict()
+
+
+def register_metric_np(metric, metric_np, factory=False):
+    """
+        Register the NumPy counterpart of a metric.
+
+        Parameters
+        ----------
+        metric : function
+            Metric evaluating tensors, or a factory creating such metrics
+        metric_np : function
+            The NumPy counterpart with the same signature, or the factory creating them from the same parameters
+        factory : bool
+            Whether the functions are factories
+    """
+    registry = _METRIC_FACTORIES_NP if factory else _METRICS_NP
+    registry[metric] = metric_np
+
+
+def get_metric_np(metric):
+    """
+        Get the NumPy counterpart of a metric of `csrank.metrics`, which evaluates NumPy arrays without adding
+        operations to the TensorFlow graph.
+
+        Metrics created by a factory (e.g. ``make_ndcg_at_k_loss(k=3)``) are mapped to the NumPy factory called with
+        the same parameters. Partial functions of metrics, like the losses created by
+        :func:`csrank.util.convert_to_loss`, are mapped to the same partial function of the NumPy counterparts.
+
+        >>> from csrank.metrics import zero_one_rank_loss
+        >>> get_metric_np(zero_one_rank_loss).__name__
+        'zero_one_rank_loss_np'
+
+        Parameters
+        ----------
+        metric : function
+            Metric of `csrank.metrics`
+
+        Returns
+        -------
+        metric_np : function
+            The NumPy counterpart with the same signature
+
+        Raises
+        ------
+        ValueError
+            If no NumPy implementation of the metric is available
+    """
+    try:
+        return _METRICS_NP[metric]
+    except (KeyError, TypeError):
+        pass
+    factory = getattr(metric, "factory", None)
+    if isinstance(factory, partial) and factory.func in _METRIC_FACTORIES_NP:
+        return _METRIC_FACTORIES_NP[factory.func](*factory.args, **factory.keywords)
+    if isinstance(metric, partial):
+        if metric.func in _METRICS_NP:
+            metric_np = partial(
+                _METRICS_NP[metric.func], *metric.args, **metric.keywords
+            )
+        else:
+            args = [get_metric_np(arg) if callable(arg) else arg for arg in metric.args]
+            metric_np = partial(metric.func, *args, **metric.keywords)
+        metric_np.__name__ = getattr(metric, "__name__", "loss")
+        return metric_np
+    raise ValueError(
+        "No NumPy implementation available for the metric {}".format(
+            getattr(metric, "__name__", metric)
+        )
+    )
@@ -46,9 +46,23 @@ expected reciprocal rank instead:
 from functools import partial
 
 from keras import backend as K
+from keras.metrics import categorical_accuracy
 import numpy as np
 import tensorflow as tf
 
+from csrank.losses import masks_padding
+from csrank.losses import object_mask
+from csrank.metric_registry import register_metric_np
+from csrank.metrics_np import categorical_accuracy_np
+from csrank.metrics_np import err_np
+from csrank.metrics_np import kendalls_tau_for_scores_np
+from csrank.metrics_np import make_ndcg_at_k_loss_np
+from csrank.metrics_np import topk_categorical_accuracy_np
+from csrank.metrics_np import zero_one_accuracy_for_scores_np
+from csrank.metrics_np import zero_one_accuracy_np
+from csrank.metrics_np import zero_one_rank_loss_for_scores_np
+from csrank.metrics_np import zero_one_rank_loss_for_scores_ties_np
+from csrank.metrics_np import zero_one_rank_loss_np
 from csrank.tensorflow_util import get_instances_objects
 from csrank.tensorflow_util import scores_to_rankings
 from csrank.tensorflow_util import tensorify
@@ -95,23 +109,26 @@ def zero_one_accuracy(y_true, y_pred):
     return zero_one_loss
 
 
+@masks_padding
 def zero_one_rank_loss_for_scores(y_true, s_pred):
     return zero_one_rank_loss_for_scores_ties(y_true, s_pred)
 
 
+@masks_padding
 def zero_one_rank_loss_for_scores_ties(y_true, s_pred):
     y_true, s_pred = tensorify(y_true), tensorify(s_pred)
-    n_objects = K.cast(K.max(y_true) + 1, dtype="float32")
+    # The padding objects with a negative preference are ignored
+    valid = object_mask(y_true)
+    pairs = valid[:, None] * valid[:, :, None]
+    n_objects = K.sum(valid, axis=1)
     mask = K.greater(y_true[:, None] - y_true[:, :, None], 0)
     mask2 = K.greater(s_pred[:, None] - s_pred[:, :, None], 0)
-    mask3 = K.equal(s_pred[:, None] - s_pred[:, :, None], 0)
+    mask3 = K.cast(K.equal(s_pred[:, None] - s_pred[:, :, None], 0), dtype="float32")
 
     # Calculate Transpositions
-    transpositions = tf.logical_and(mask, mask2)
-    transpositions = K.sum(K.cast(transpositions, dtype="float32"), axis=[1, 2])
-    transpositions += (
-        K.sum(K.cast(mask3, dtype="float32"), axis=[1, 2]) - n_objects
-    ) / 4.0
+    transpositions = K.cast(tf.logical_and(mask, mask2), dtype="float32")
+    transpositions = K.sum(transpositions * pairs, axis=[1, 2])
+    transpositions += (K.sum(mask3 * pairs, axis=[1, 2]) - n_objects) / 4.0
 
     denominator = n_objects * (n_objects - 1.0) / 2.0
     result = transpositions / denominator
@@ -214,6 +231,8 @@ def make_ndcg_at_k_loss(k=5):
         gain = dcg / idcg
         return gain
 
+    # Allows to look up the NumPy counterpart, see `csrank.metric_registry.get_metric_np`
+    ndcg.factory = partial(make_ndcg_at_k_loss, k=k)
     return ndcg
 
 
@@ -259,6 +278,7 @@ def topk_categorical_accuracy(k=5):
         acc = K.cast(acc, dtype="float32")
         return acc
 
+    topk_acc.factory = partial(topk_categorical_accuracy, k=k)
     return topk_acc
 
 
@@ -429,3 +449,21 @@ def err(y_true, y_pred, utility_function=None, probability_mapping=None):
     results = tf.reduce_sum(discounted_document_values, axis=1)
 
     return K.mean(results)
+
+
+# spearman_correlation_for_scores has no NumPy counterpart, as spearman_correlation_for_scores_np skips the
+# predictions with ties instead of breaking the ties by the index of the objects
+register_metric_np(zero_one_rank_loss, zero_one_rank_loss_np)
+register_metric_np(zero_one_rank_loss_for_scores, zero_one_rank_loss_for_scores_np)
+register_metric_np(
+    zero_one_rank_loss_for_scores_ties, zero_one_rank_loss_for_scores_ties_np
+)
+register_metric_np(zero_one_accuracy, zero_one_accuracy_np)
+register_metric_np(zero_one_accuracy_for_scores, zero_one_accuracy_for_scores_np)
+register_metric_np(kendalls_tau_for_scores, kendalls_tau_for_scores_np)
+register_metric_np(err, err_np)
+register_metric_np(categorical_accuracy, categorical_accuracy_np)
+register_metric_np(make_ndcg_at_k_loss, make_ndcg_at_k_loss_np, factory=True)
+register_metric_np(
+    topk_categorical_accuracy, topk_categorical_accuracy_np, factory=True
+)
@@ -10,6 +10,7 @@ from sklearn.metrics import recall_score
 from sklearn.metrics import roc_auc_score
 from sklearn.metrics import zero_one_loss
 
+from csrank.metric_registry import get_metric_np
 from csrank.numpy_util import scores_to_rankings
 
 __all__ = [
@@ -18,10 +19,13 @@ __all__ = [
     "zero_one_accuracy_for_scores_np",
     "zero_one_rank_loss_for_scores_ties_np",
     "zero_one_accuracy_np",
+    "zero_one_rank_loss_np",
     "zero_one_rank_loss_for_scores_np",
     "auc_score",
     "instance_informedness",
+    "instance_informedness_for_thresholds",
     "f1_measure",
+    "f1_measure_for_thresholds",
     "recall",
     "hamming",
     "average_precision",
@@ -31,22 +35,59 @@ __all__ = [
     "topk_categorical_accuracy_np",
     "categorical_accuracy_np",
     "make_ndcg_at_k_loss_np",
+    "err_np",
+    "MetricAccumulator",
 ]
 
+# Query sets with at least this many objects are compared by sorting instead of comparing all pairs of objects
+SORTED_PAIRS_MIN_OBJECTS = 32
 
-def spearman_correlation_for_scores_np(y_true, s_pred):
+
+def _instance_values(function, chunk_size, *arrays):
+    # Evaluate a metric per instance on chunks of at most chunk_size instances to bound the temporary memory
+    if chunk_size is None:
+        return function(*arrays)
+    n_instances = len(arrays[0])
+    return np.concatenate(
+        [
+            function(*(array[start : start + chunk_size] for array in arrays))
+            for start in range(0, n_instances, chunk_size)
+        ]
+    )
+
+
+def _instance_mean(instance_values, skip_undefined=False, depends_on_max_rank=False):
+    """
+        Mark a metric as the mean of ``instance_values(y_true, y_pred)``, the metric of every instance, so it can be
+        accumulated over chunks of instances by :class:`MetricAccumulator`. The instances with an undefined (NaN)
+        metric are skipped if ``skip_undefined`` is True, otherwise they make the mean undefined. Metrics which
+        depend on the highest true rank of all instances are marked by ``depends_on_max_rank``.
+    """
+
+    def mark(metric):
+        metric.instance_values = instance_values
+        metric.skip_undefined = skip_undefined
+        metric.depends_on_max_rank = depends_on_max_rank
+        return metric
+
+    return mark
+
+
+def _spearman_correlations(y_true, s_pred):
     y_pred = scores_to_rankings(s_pred)
-    rho = []
     n_objects = y_true.shape[1]
     denominator = n_objects * (n_objects ** 2 - 1)
+    rho = 1 - (6 * np.sum((y_true - y_pred) ** 2, axis=1) / denominator)
+    # The correlation is not defined for predictions with ties
+    sorted_scores = np.sort(s_pred, axis=1)
+    ties = np.any(sorted_scores[:, 1:] == sorted_scores[:, :-1], axis=1)
+    return np.where(ties, np.nan, rho)
 
-    for r1, r2 in zip(y_true, y_pred):
-        if len(np.unique(r2)) == len(r2):
-            s = 1 - (6 * np.sum((r1 - r2) ** 2) / denominator)
-            rho.append(s)
-        else:
-            rho.append(np.nan)
-    return np.nanmean(np.array(rho))
+
+@_instance_mean(_spearman_correlations, skip_undefined=True)
+def spearman_correlation_for_scores_np(y_true, s_pred, chunk_size=None):
+    rho = _instance_values(_spearman_correlations, chunk_size, y_true, s_pred)
+    return np.nanmean(rho)
 
 
 def spearman_correlation_for_scores_scipy(y_true, s_pred):
@@ -58,65 +99,200 @@ def spearman_correlation_for_scores_scipy(y_true, s_pred):
     return np.nanmean(np.array(rho))
 
 
+def _kendalls_taus(y_true, s_pred):
+    return 1.0 - 2.0 * _zero_one_rank_losses_for_scores(y_true, s_pred)
+
+
+@_instance_mean(_kendalls_taus)
 def kendalls_tau_for_scores_np(y_true, s_pred):
-    return 1.0 - 2.0 * zero_one_rank_loss_for_scores_ties_np(y_true, s_pred)
+    return np.mean(_kendalls_taus(y_true, s_pred))
+
+
+def _equal_rankings(y_true, y_pred):
+    return np.all(np.equal(y_true, y_pred), axis=1)
+
+
+def _equal_rankings_for_scores(y_true, s_pred):
+    return _equal_rankings(y_true, scores_to_rankings(s_pred))
 
 
+@_instance_mean(_equal_rankings_for_scores)
 def zero_one_accuracy_for_scores_np(y_true, s_pred):
     y_pred = scores_to_rankings(s_pred)
-    acc = np.sum(np.all(np.equal(y_true, y_pred), axis=1)) / y_pred.shape[0]
+    acc = np.sum(_equal_rankings(y_true, y_pred)) / y_pred.shape[0]
     return acc
 
 
+@_instance_mean(_equal_rankings)
 def zero_one_accuracy_np(y_true, y_pred):
-    acc = np.sum(np.all(np.equal(y_true, y_pred), axis=1)) / y_pred.shape[0]
+    acc = np.sum(_equal_rankings(y_true, y_pred)) / y_pred.shape[0]
     return acc
 
 
 def make_ndcg_at_k_loss_np(k=5):
+    """NumPy version of `csrank.metrics.make_ndcg_at_k_loss`, see the documentation of that function for details."""
+
     def ndcg(y_true, y_pred):
         n_instances, n_objects = y_true.shape
-        relevance = np.power(2.0, ((n_objects - y_true) * 60) / n_objects) - 1.0
-        relevance_pred = np.power(2.0, ((n_objects - y_pred) * 60) / n_objects) - 1.0
+        max_rank = np.max(y_true)
+        relevance_true = np.power(2.0, (max_rank - y_true) / max_rank) - 1.0
+        relevance_pred = np.power(2.0, (max_rank - y_pred) / max_rank) - 1.0
+        log2_term = np.log2(np.arange(min(k, n_objects)) + 2.0)
+
+        # Calculate ideal dcg, ties are broken by the index like `tf.math.top_k`:
+        top_idx = np.argsort(-relevance_true, axis=1, kind="stable")[:, :k]
+        rows = np.arange(n_instances)[:, None]
+        idcg = np.sum(relevance_true[rows, top_idx] / log2_term, axis=-1, keepdims=True)
+
+        # Calculate actual dcg of the truly most relevant objects:
+        dcg = np.sum(relevance_pred[rows, top_idx] / log2_term, axis=-1, keepdims=True)
+        gain = dcg / idcg
+        return gain
 
-        log_term = np.log(np.arange(k, dtype="float32") + 2.0) / np.log(2.0)
+    def ndcg_values(y_true, y_pred):
+        return ndcg(y_true, y_pred)[:, 0]
 
-        # Calculate ideal dcg:
-        top_t = np.argsort(relevance, axis=1)[:, ::-1][:, :k]
-        toprel = relevance[np.arange(n_instances)[:, None], top_t]
-        idcg = np.sum(toprel / log_term, axis=-1, keepdims=True)
+    return _instance_mean(ndcg_values, skip_undefined=True, depends_on_max_rank=True)(
+        ndcg
+    )
 
-        # Calculate actual dcg:
-        top_p = np.argsort(relevance_pred, axis=1)[:, ::-1][:, :k]
-        pred_rel = relevance[np.arange(n_instances)[:, None], top_p]
-        pred_rel = np.sum(pred_rel / log_term, axis=-1, keepdims=True)
-        gain = pred_rel / idcg
-        return gain
 
-    return ndcg
+def _discordant_pairs(y_true, s_pred):
+    """
+        Count the pairs of objects which are ordered by the true rankings and ordered the other way round by the
+        scores, i.e. :math:`y_i < y_j` and :math:`s_i < s_j`, and the pairs of objects with equal scores.
+
+        Query sets with at least ``SORTED_PAIRS_MIN_OBJECTS`` objects are counted in :math:`O(m \\log m)` time and
+        :math:`O(m)` memory per instance, smaller ones by comparing all pairs of objects at once. The pairs with a
+        padding object (with a negative true rank) are not counted.
+
+        Parameters
+        ----------
+        y_true : numpy array (n_instances, n_objects)
+            True rankings of the objects, negative for the padding objects
+        s_pred : numpy array (n_instances, n_objects)
+            Predicted scores of the objects
+
+        Returns
+        -------
+        discordant : numpy array (n_instances,)
+            Number of discordant pairs of every instance
+        ties : numpy array (n_instances,)
+            Number of pairs with equal scores of every instance
+    """
+    padding = y_true < 0
+    n_padding = np.sum(padding, axis=1)
+    if np.any(padding):
+        # The padding objects are ranked last with the lowest score, so they are only tied with each other
+        y_true = np.where(padding, np.max(y_true) + 1, y_true)
+        s_pred = np.where(padding, -np.inf, s_pred)
+    if s_pred.shape[1] >= SORTED_PAIRS_MIN_OBJECTS:
+        discordant, ties = _discordant_pairs_sorted(y_true, s_pred)
+    else:
+        discordant, ties = _discordant_pairs_dense(y_true, s_pred)
+    return discordant, ties - n_padding * (n_padding - 1) // 2
+
+
+def _discordant_pairs_dense(y_true, s_pred):
+    mask = np.greater(y_true[:, None] - y_true[:, :, None], 0)
+    mask2 = np.greater(s_pred[:, None], s_pred[:, :, None])
+    mask3 = np.equal(s_pred[:, None], s_pred[:, :, None])
+    discordant = np.sum(mask & mask2, axis=(1, 2))
+    ties = (np.sum(mask3, axis=(1, 2)) - y_true.shape[1]) // 2
+    return discordant, ties
+
+
+def _discordant_pairs_sorted(y_true, s_pred):
+    # Knight's algorithm: Order the objects by the true ranking (ties broken by decreasing scores), then the
+    # discordant pairs are the pairs of objects whose scores are strictly increasing in that order. These are
+    # all pairs minus the inversions and the ties of the scores, the inversions are counted by a bottom-up merge
+    # sort which processes all instances at once.
+    n_instances, n_objects = s_pred.shape
+    positions = np.arange(n_objects)
+    order = np.lexsort((-s_pred, y_true), axis=-1)
+    s_pred = np.take_along_axis(s_pred, order, axis=1)
+
+    # Replace the scores by their (minimal) ranks, which are small integers
+    order = np.argsort(s_pred, axis=1, kind="stable")
+    sorted_scores = np.take_along_axis(s_pred, order, axis=1)
+    new_value = np.ones_like(sorted_scores, dtype=bool)
+    new_value[:, 1:] = sorted_scores[:, 1:] != sorted_scores[:, :-1]
+    first = np.maximum.accumulate(np.where(new_value, positions, 0), axis=1)
+    ties = np.sum(positions - first, axis=1)
+    values = np.empty_like(order)
+    np.put_along_axis(values, order, first, axis=1)
+
+    inversions = np.zeros(n_instances, dtype=np.int64)
+    width = 1
+    while width < n_objects:
+        block = positions // (2 * width)
+        is_left = (positions // width) % 2 == 0
+        # Merge the sorted runs of two neighbouring blocks, equal values of the left block stay first
+        order = np.argsort(block * n_objects + values, axis=1, kind="stable")
+        values = np.take_along_axis(values, order, axis=1)
+        left = is_left[order]
+        lefts_before = np.cumsum(left, axis=1) - left - block * width
+        lefts_in_block = np.clip(n_objects - block * 2 * width, 0, width)
+        greater = np.where(left, 0, lefts_in_block - lefts_before)
+        inversions += np.sum(greater, axis=1)
+        width *= 2
+    discordant = n_objects * (n_objects - 1) // 2 - inversions - ties
+    return discordant, ties
+
+
+def _zero_one_rank_losses(y_true, y_pred):
+    n_objects = np.max(y_true) + 1
+    # A lower predicted rank corresponds to a higher score
+    discordant, ties = _discordant_pairs(y_true, -y_pred)
 
+    # Calculate Transpositions
+    transpositions = discordant + (2.0 * ties + y_true.shape[1] - n_objects) / 4.0
+    denominator = n_objects * (n_objects - 1.0) / 2.0
+    return transpositions / denominator
 
-def zero_one_rank_loss_for_scores_ties_np(y_true, s_pred):
-    n_objects = y_true.shape[1]
-    mask = np.greater(y_true[:, None] - y_true[:, :, None], 0).astype(float)
-    mask2 = np.greater(s_pred[:, None] - s_pred[:, :, None], 0).astype(float)
-    mask3 = np.equal(s_pred[:, None] - s_pred[:, :, None], 0).astype(float)
 
-    # Calculate Transpositions
-    transpositions = np.logical_and(mask, mask2)
-    x = (np.sum(mask3, axis=(1, 2)) - n_objects).astype(float) / 4.0
-    transpositions = np.sum(transpositions, axis=(1, 2)).astype(float)
-    transpositions += x
+@_instance_mean(_zero_one_rank_losses, depends_on_max_rank=True)
+def zero_one_rank_loss_np(y_true, y_pred):
+    """NumPy version of `csrank.metrics.zero_one_rank_loss` for predicted rankings."""
+    return np.mean(_zero_one_rank_losses(y_true, y_pred))
+
+
+def _zero_one_rank_losses_for_scores(y_true, s_pred):
+    # The padding objects with a negative true rank are ignored
+    n_objects = np.sum(y_true >= 0, axis=1)
+    discordant, ties = _discordant_pairs(y_true, s_pred)
 
+    # Calculate Transpositions, every tie counts as half a transposition
+    transpositions = discordant + ties / 2.0
     denominator = n_objects * (n_objects - 1.0) / 2.0
-    result = transpositions / denominator
-    return np.mean(result)
+    return transpositions / denominator
+
+
+@_instance_mean(_zero_one_rank_losses_for_scores)
+def zero_one_rank_loss_for_scores_ties_np(y_true, s_pred):
+    return np.mean(_zero_one_rank_losses_for_scores(y_true, s_pred))
 
 
+@_instance_mean(_zero_one_rank_losses_for_scores)
 def zero_one_rank_loss_for_scores_np(y_true, s_pred):
     return zero_one_rank_loss_for_scores_ties_np(y_true, s_pred)
 
 
+def _auc_scores(y_true, s_pred):
+    # The AUC of an instance is the normalized Mann-Whitney U statistic of the ranks of the positive objects, it is
+    # undefined for less than two positive or negative objects
+    n_objects = y_true.shape[1]
+    n_true = np.sum(y_true, axis=1)
+    defined = (n_true > 1) & (n_true < n_objects - 1)
+    # Ascending ranks starting at 1, tied objects get the average of their ranks
+    ranks = n_objects - scores_to_rankings(s_pred)
+    u_statistic = np.sum(ranks * y_true, axis=1) - n_true * (n_true + 1) / 2.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        auc = u_statistic / (n_true * (n_objects - n_true))
+    return np.where(defined, auc, np.nan)
+
+
+@_instance_mean(_auc_scores, skip_undefined=True)
 def auc_score(y_true, s_pred):
     idx = np.where(
         (y_true.sum(axis=1) != y_true.shape[-1] - 1)
@@ -133,55 +309,207 @@ def auc_score(y_true, s_pred):
     return auc
 
 
+def _average_precisions(y_true, s_pred):
+    # The precision at the lowest score of each group of tied objects, weighted by the positive objects of the
+    # group. Instances without positive objects have an average precision of zero.
+    n_instances, n_objects = s_pred.shape
+    positions = np.arange(n_objects)
+    order = np.argsort(-s_pred, axis=1, kind="stable")
+    sorted_scores = np.take_along_axis(s_pred, order, axis=1)
+    sorted_true = np.take_along_axis(np.asarray(y_true, dtype=bool), order, axis=1)
+    true_positives = np.cumsum(sorted_true, axis=1)
+    group_end = np.ones_like(sorted_true)
+    group_end[:, :-1] = sorted_scores[:, 1:] != sorted_scores[:, :-1]
+    last = np.where(group_end, positions, n_objects)[:, ::-1]
+    last = np.minimum.accumulate(last, axis=1)[:, ::-1]
+    precisions = np.take_along_axis(true_positives, last, axis=1) / (last + 1.0)
+    n_true = true_positives[:, -1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = np.sum(precisions * sorted_true, axis=1) / n_true
+    return np.where(n_true > 0, result, 0.0)
+
+
+@_instance_mean(_average_precisions)
 def average_precision(y_true, s_pred):
     return average_precision_score(y_true, s_pred, average="samples")
 
 
-def instance_informedness(y_true, y_pred):
+def _informedness(y_true, y_pred):
     tp = np.logical_and(y_true, y_pred).sum(axis=1)
     tn = np.logical_and(np.logical_not(y_true), np.logical_not(y_pred)).sum(axis=1)
     cp = y_true.sum(axis=1)
     cn = np.logical_not(y_true).sum(axis=1)
-    return np.nanmean(tp / cp + tn / cn - 1)
+    return tp / cp + tn / cn - 1
 
 
+@_instance_mean(_informedness, skip_undefined=True)
+def instance_informedness(y_true, y_pred):
+    return np.nanmean(_informedness(y_true, y_pred))
+
+
+def _choice_counts(y_true, y_pred):
+    # The true positives, predicted positives and true positives plus false negatives of every instance
+    y_true, y_pred = np.asarray(y_true, dtype=bool), np.asarray(y_pred, dtype=bool)
+    true_positives = np.sum(y_true & y_pred, axis=1)
+    return true_positives, np.sum(y_pred, axis=1), np.sum(y_true, axis=1)
+
+
+def _f1_measures(y_true, y_pred):
+    true_positives, n_predicted, n_true = _choice_counts(y_true, y_pred)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return _f1_for_counts(true_positives, n_predicted, n_true, y_true.shape[1])
+
+
+@_instance_mean(_f1_measures)
 def f1_measure(y_true, y_pred):
     return f1_score(y_true, y_pred, average="samples")
 
 
+def _instance_metric_for_thresholds(y_true, scores, thresholds, instance_metric):
+    """
+        Evaluate an instance-averaged metric of the predictions ``scores > t`` for every threshold ``t`` at once.
+
+        The metric of an instance only depends on its number of true positives and predicted positives, which only
+        change at the scores of that instance. Therefore the scores of each instance are sorted once and the changes
+        of the instance metric are accumulated over all (globally sorted) scores. This takes
+        :math:`O(N M \\log(N M))` time instead of evaluating the metric separately for each threshold.
+
+        Parameters
+        ----------
+        y_true : array-like, shape (n_instances, n_objects)
+            Binary choice vectors
+        scores : array-like, shape (n_instances, n_objects)
+            Predicted scores
+        thresholds : array-like, shape (n_thresholds,)
+            Thresholds for which the metric is evaluated
+        instance_metric : function
+            Maps the true positives, predicted positives, true positives plus false negatives and the number of
+            objects to the metric of each instance. Instances with a non-finite metric when nothing is predicted
+            are ignored (as with ``np.nanmean``).
+
+        Returns
+        -------
+        values : array-like, shape (n_thresholds,)
+            Instance-averaged metric for each threshold
+    """
+    scores = np.asarray(scores)
+    n_instances, n_objects = scores.shape
+    rows = np.arange(n_instances)[:, None]
+    order = np.argsort(-scores, axis=1, kind="stable")
+    sorted_scores = scores[rows, order]
+    y_true = np.asarray(y_true, dtype=bool)
+    n_true = np.sum(y_true, axis=1)[:, None]
+    true_positives = np.cumsum(y_true[rows, order], axis=1)
+    n_predicted = np.arange(1, n_objects + 1)[None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        initial = instance_metric(0, 0, n_true, n_objects).astype(float)
+        values = instance_metric(true_positives, n_predicted, n_true, n_objects)
+    valid = np.isfinite(initial[:, 0])
+    initial[~valid] = 0.0
+    values[~valid] = 0.0
+    changes = np.diff(np.hstack((initial, values)), axis=1).ravel()
+
+    sorted_scores = sorted_scores.ravel()
+    ascending = np.argsort(sorted_scores, kind="stable")
+    cumulative = np.concatenate(([0.0], np.cumsum(changes[ascending])))
+    n_below = np.searchsorted(sorted_scores[ascending], thresholds, side="right")
+    # Only the scores strictly greater than the threshold are predicted positive
+    total = np.sum(initial) + cumulative[-1] - cumulative[n_below]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return total / np.sum(valid)
+
+
+def _f1_for_counts(true_positives, n_predicted, n_true, n_objects):
+    denominator = n_true + n_predicted
+    return np.where(denominator > 0, 2 * true_positives / denominator, 0.0)
+
+
+def _informedness_for_counts(true_positives, n_predicted, n_true, n_objects):
+    n_false = n_objects - n_true
+    true_negatives = n_false - (n_predicted - true_positives)
+    return true_positives / n_true + true_negatives / n_false - 1
+
+
+def f1_measure_for_thresholds(y_true, scores, thresholds):
+    """
+        Instance-averaged F1-measure (see :func:`f1_measure`) of the choices ``scores > t`` for every threshold
+        ``t`` in ``thresholds``.
+    """
+    return _instance_metric_for_thresholds(y_true, scores, thresholds, _f1_for_counts)
+
+
+def instance_informedness_for_thresholds(y_true, scores, thresholds):
+    """
+        Instance-averaged informedness (see :func:`instance_informedness`) of the choices ``scores > t`` for every
+        threshold ``t`` in ``thresholds``.
+    """
+    return _instance_metric_for_thresholds(
+        y_true, scores, thresholds, _informedness_for_counts
+    )
+
+
+def _precisions(y_true, y_pred):
+    true_positives, n_predicted, _ = _choice_counts(y_true, y_pred)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(n_predicted > 0, true_positives / n_predicted, 0.0)
+
+
+def _recalls(y_true, y_pred):
+    true_positives, _, n_true = _choice_counts(y_true, y_pred)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(n_true > 0, true_positives / n_true, 0.0)
+
+
+@_instance_mean(_precisions)
 def precision(y_true, y_pred):
     return precision_score(y_true, y_pred, average="samples")
 
 
+@_instance_mean(_recalls)
 def recall(y_true, y_pred):
     return recall_score(y_true, y_pred, average="samples")
 
 
+def _subset_01_losses(y_true, y_pred):
+    return np.any(np.not_equal(y_true, y_pred), axis=1)
+
+
+@_instance_mean(_subset_01_losses)
 def subset_01_loss(y_true, y_pred):
     return zero_one_loss(y_true, y_pred)
 
 
+def _hamming_losses(y_true, y_pred):
+    return np.mean(np.not_equal(y_true, y_pred), axis=1)
+
+
+@_instance_mean(_hamming_losses)
 def hamming(y_true, y_pred):
     return hamming_loss(y_true, y_pred)
 
 
-def topk_categorical_accuracy_np(k=5):
-    def topk_acc(y_true, y_pred):
-        topK = y_pred.argsort(axis=1)[:, -k:][:, ::-1]
-        accuracies = np.zeros_like(y_true, dtype=bool)
+def topk_categorical_accuracy_np(k=5, chunk_size=None):
+    def topk_hits(y_true, y_pred):
+        n_objects = y_pred.shape[1]
+        kth = n_objects - min(k, n_objects)
+        top_k = np.argpartition(y_pred, kth, axis=1)[:, kth:]
         y_true = np.argmax(y_true, axis=1)
-        for i, top in enumerate(topK):
-            accuracies[i] = y_true[i] in top
-        return np.mean(accuracies)
+        return np.any(top_k == y_true[:, None], axis=1)
+
+    @_instance_mean(topk_hits)
+    def topk_acc(y_true, y_pred):
+        return np.mean(_instance_values(topk_hits, chunk_size, y_true, y_pred))
 
     return topk_acc
 
 
+def _categorical_hits(y_true, y_pred):
+    return np.equal(np.argmax(y_true, axis=1), np.argmax(y_pred, axis=1))
+
+
+@_instance_mean(_categorical_hits)
 def categorical_accuracy_np(y_true, y_pred):
-    y_true = np.argmax(y_true, axis=1)
-    choices = np.argmax(y_pred, axis=1)
-    accuracies = np.equal(y_true, choices)
-    return np.mean(accuracies)
+    return np.mean(_categorical_hits(y_true, y_pred))
 
 
 def relevance_gain_np(grading, max_grade):
@@ -191,10 +519,10 @@ def relevance_gain_np(grading, max_grade):
     return (2 ** inverse_grading - 1) / (2 ** max_grade)
 
 
-def err_np(y_true, y_pred, utility_function=None, probability_mapping=None):
-    """Plain python version of `err`, see the documentation of that
-    function for details.
-    """
+def _expected_reciprocal_ranks(
+    y_true, y_pred, utility_function=None, probability_mapping=None, chunk_size=None
+):
+    y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
     if probability_mapping is None:
         # assume y_true is a ranking, use relevance gain
         max_grade = np.max(y_true)
@@ -206,33 +534,153 @@ def err_np(y_true, y_pred, utility_function=None, probability_mapping=None):
 
         utility_function = reciprocal_rank
 
-    ninstances, nobjects = np.shape(y_pred)
-
-    satisfied_probs = np.reshape(
-        list(map(probability_mapping, y_true.flatten())), np.shape(y_true)
-    )
+    nobjects = np.shape(y_pred)[1]
+    utilities = utility_function(np.arange(1, nobjects + 1))
 
-    # sort satisfied probabilities according to the predicted ranking
-    # black magic invocation to reorder each row
-    row_indices = np.arange(ninstances).reshape(-1, 1)
-    satisfied_at_rank = satisfied_probs[row_indices, y_pred]
+    def reciprocal_ranks(y_true, y_pred):
+        satisfied_probs = probability_mapping(y_true)
 
-    # still not satisfied after having examined the first r ranks
-    not_yet_satisfied_at_rank = np.cumprod(1 - satisfied_at_rank, axis=1)
+        # sort satisfied probabilities according to the predicted ranking
+        satisfied_at_rank = np.take_along_axis(satisfied_probs, y_pred, axis=1)
 
-    # append a column of 1s and drop the last column, since the
-    # probability the need has not been satisfied at the 0th rank is 1
-    not_yet_satisfied_at_rank = np.hstack(
-        (
-            np.ones(np.shape(not_yet_satisfied_at_rank)[0]).reshape(-1, 1),
-            not_yet_satisfied_at_rank,
+        # the probability the need has not been satisfied before rank r,
+        # which is 1 at the 0th rank
+        not_yet_satisfied_at_rank = np.ones_like(satisfied_at_rank, dtype=float)
+        np.cumprod(
+            1 - satisfied_at_rank[:, :-1], axis=1, out=not_yet_satisfied_at_rank[:, 1:]
         )
-    )[:, :-1]
 
-    # map over flattened array, then restore shape
-    utilities = list(map(utility_function, range(1, nobjects + 1)))
+        discount_at_rank = not_yet_satisfied_at_rank * utilities
+        discounted_document_values = satisfied_at_rank * discount_at_rank
+        return np.sum(discounted_document_values, axis=1)
+
+    return _instance_values(reciprocal_ranks, chunk_size, y_true, y_pred)
+
 
-    discount_at_rank = not_yet_satisfied_at_rank * utilities
-    discounted_document_values = satisfied_at_rank * discount_at_rank
-    results = np.sum(discounted_document_values, axis=1)
+@_instance_mean(_expected_reciprocal_ranks, depends_on_max_rank=True)
+def err_np(
+    y_true, y_pred, utility_function=None, probability_mapping=None, chunk_size=None
+):
+    """NumPy version of `err`, see the documentation of that function
+    for details. Like `err`, the probability mapping and the
+    utility function are applied to whole arrays. With a `chunk_size`
+    at most that many instances are evaluated at once.
+    """
+    results = _expected_reciprocal_ranks(
+        y_true, y_pred, utility_function, probability_mapping, chunk_size
+    )
     return np.average(results)
+
+
+class MetricAccumulator(object):
+    def __init__(self, metric):
+        """
+            Evaluate a metric incrementally on chunks of predictions, e.g. while they are predicted in batches, so
+            the whole test set never has to be in memory. The result is the same as evaluating all predictions at once
+            with :func:`csrank.tensorflow_util.get_mean_loss`: The mean of the metric over the instances of every
+            bucket (number of objects), weighted by the number of instances of the buckets. Buckets with an undefined
+            (NaN or infinite) metric are skipped.
+
+            Metrics of `csrank.metrics` are evaluated by their NumPy counterparts, see
+            :func:`csrank.metric_registry.get_metric_np`. The metric of every instance is accumulated, so the result is
+            exact for the ranking, choice and discrete choice metrics of this module. Metrics which depend on the
+            highest true rank of all instances (``zero_one_rank_loss_np``, ``err_np`` and the nDCG) require the same
+            highest rank in all chunks of a bucket, as for complete rankings.
+
+            >>> accumulator = MetricAccumulator(zero_one_accuracy_np)
+            >>> accumulator.update(np.array([[0, 1], [1, 0]]), np.array([[0, 1], [0, 1]]))
+            >>> accumulator.update(np.array([[0, 1]]), np.array([[0, 1]]))
+            >>> accumulator.result()
+            0.6666666666666666
+
+            Parameters
+            ----------
+            metric : function
+                Metric of `csrank.metrics_np`, or of `csrank.metrics` with a NumPy counterpart
+
+            Raises
+            ------
+            ValueError
+                If the metric cannot be evaluated per instance, e.g. the losses created by
+                :func:`csrank.util.convert_to_loss`
+        """
+        try:
+            metric = get_metric_np(metric)
+        except ValueError:
+            pass
+        if getattr(metric, "instance_values", None) is None:
+            raise ValueError(
+                "The metric {} cannot be accumulated over chunks of instances".format(
+                    getattr(metric, "__name__", metric)
+                )
+            )
+        self.metric = metric
+        self.reset()
+
+    def reset(self):
+        """Forget all chunks seen so far"""
+        # Map from the bucket to the sum of the defined values, their number, the number of instances and the highest
+        # true rank
+        self.sums = dict()
+
+    def update(self, y_true, y_pred):
+        """
+            Add a chunk of predictions.
+
+            Parameters
+            ----------
+            y_true : numpy array or dict
+                True preferences of the chunk or a map from the number of objects to the true preferences
+            y_pred : numpy array or dict
+                Predictions of the chunk or a map from the number of objects to the predictions
+
+            Raises
+            ------
+            ValueError
+                If the metric depends on the highest true rank, which differs from the previous chunks of the bucket
+        """
+        if isinstance(y_pred, dict) and isinstance(y_true, dict):
+            for n in y_pred.keys():
+                self._update(n, y_true[n], y_pred[n])
+        else:
+            self._update(None, y_true, y_pred)
+
+    def _update(self, bucket, y_true, y_pred):
+        n_instances = len(y_pred)
+        if n_instances == 0:
+            return
+        y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+        sums = self.sums.setdefault(bucket, [0.0, 0, 0, None])
+        if self.metric.depends_on_max_rank:
+            max_rank = np.max(y_true)
+            if sums[3] is not None and sums[3] != max_rank:
+                raise ValueError(
+                    "The metric {} depends on the highest true rank, which differs between the chunks".format(
+                        self.metric.__name__
+                    )
+                )
+            sums[3] = max_rank
+        values = np.asarray(self.metric.instance_values(y_true, y_pred), dtype=float)
+        if self.metric.skip_undefined:
+            values = values[~np.isnan(values)]
+        # Undefined values of the other metrics make the mean of the bucket undefined
+        sums[0] += np.sum(values)
+        sums[1] += len(values)
+        sums[2] += n_instances
+
+    def result(self):
+        """
+            Returns
+            -------
+            mean_loss : float
+                The instance weighted mean of the metric over all chunks, NaN if it is undefined for all of them
+        """
+        losses, total_instances = 0.0, 0
+        for total, n_defined, n_instances, _ in self.sums.values():
+            mean = total / n_defined if n_defined > 0 else np.nan
+            if np.isfinite(mean):
+                losses += mean * n_instances
+                total_instances += n_instances
+        if total_instances == 0:
+            return np.nan
+        return float(losses / total_instances)
@@ -1,5 +1,13 @@
+from functools import lru_cache
+
 import numpy as np
-from scipy.stats import rankdata
+
+# Upper bound (in bytes) for the pair tensors materialized at once by
+# :func:`pairwise_borda_scores`.
+PAIR_BATCH_MEMORY = 2 ** 28
+# Preference assigned to the padding objects by :func:`pad_query_sets`. The
+# padding-aware losses in :mod:`csrank.losses` ignore objects with this value.
+PADDING_PREFERENCE = -1
 
 
 def replace_inf_np(x):
@@ -49,19 +57,123 @@ def normalize(x, axis=1):
 
 
 def scores_to_rankings(score_matrix):
-    mask3 = np.equal(score_matrix[:, None] - score_matrix[:, :, None], 0)
+    """Convert scores to rankings, the object with the highest score gets rank 0.
+
+    Objects with equal scores get the average of their ranks, like the
+    "average" method of :func:`scipy.stats.rankdata`. The scores of all rows
+    are sorted at once and the ties are found as runs of equal neighbours in
+    the sorted scores.
+
+    >>> scores_to_rankings(np.array([[0.1, 0.9, 0.5], [0.3, 0.7, 0.3]]))
+    array([[2. , 0. , 1. ],
+           [1.5, 0. , 1.5]])
+
+    Parameters
+    ----------
+    score_matrix : array of shape (n_instances, n_objects)
+        Scores of the objects
+
+    Returns
+    -------
+    rankings : array of shape (n_instances, n_objects)
+        Rankings of the objects, integral if there are no ties and of the
+        dtype of the scores otherwise
+    """
     n_objects = score_matrix.shape[1]
-    ties = np.sum(np.sum(mask3, axis=(1, 2)) - n_objects)
+    positions = np.arange(n_objects)
+    orderings = np.argsort(score_matrix, axis=1, kind="stable")
+    sorted_scores = np.take_along_axis(score_matrix, orderings, axis=1)
+    tied = sorted_scores[:, 1:] == sorted_scores[:, :-1]
+    if not np.any(tied):
+        rankings = np.empty_like(orderings)
+        np.put_along_axis(rankings, orderings, n_objects - 1 - positions, axis=1)
+        return rankings
+    # First and last position of the run of equal scores of every object
+    starts = np.where(np.insert(tied, 0, False, axis=1), 0, positions)
+    starts = np.maximum.accumulate(starts, axis=1)
+    ends = np.where(
+        np.append(tied, np.zeros_like(tied[:, :1]), axis=1), n_objects - 1, positions
+    )
+    ends = np.minimum.accumulate(ends[:, ::-1], axis=1)[:, ::-1]
     rankings = np.empty_like(score_matrix)
-    if ties > 0:
-        for i, s in enumerate(score_matrix):
-            rankings[i] = len(s) - rankdata(s)
-    else:
-        orderings = np.argsort(score_matrix, axis=1)[:, ::-1]
-        rankings = np.argsort(orderings, axis=1)
+    np.put_along_axis(rankings, orderings, n_objects - 1 - (starts + ends) / 2, axis=1)
     return rankings
 
 
+@lru_cache(maxsize=None)
+def pairwise_permutation_indices(n_objects):
+    """Index arrays of all ordered pairs of distinct objects.
+
+    The pairs are enumerated in the same order as
+    ``itertools.permutations(range(n_objects), 2)``, i.e. grouped by the first
+    object. The arrays are cached per ``n_objects`` and are read-only.
+
+    >>> first, second = pairwise_permutation_indices(3)
+    >>> list(zip(first.tolist(), second.tolist()))
+    [(0, 1), (0, 2), (1, 0), (1, 2), (2, 0), (2, 1)]
+
+    Parameters
+    ----------
+    n_objects : int
+        Number of objects in the query set
+
+    Returns
+    -------
+    first, second : (array, array) of shape (n_objects * (n_objects - 1),)
+        Indices of the first and second object of every pair
+    """
+    first, second = np.nonzero(~np.eye(n_objects, dtype=bool))
+    first.setflags(write=False)
+    second.setflags(write=False)
+    return first, second
+
+
+def pairwise_borda_scores(predict_pair, X, max_memory=PAIR_BATCH_MEMORY, **kwargs):
+    """Compute Borda-style scores from a pairwise preference predicate.
+
+    All ordered pairs of objects of several instances are gathered at once and
+    evaluated with a single call of ``predict_pair`` per chunk. The number of
+    instances per chunk is chosen such that the two gathered pair arrays do
+    not exceed ``max_memory`` bytes. The score of an object is the mean of
+    :math:`U(x_i, x_j)` over all other objects :math:`x_j` in the query set.
+
+    Parameters
+    ----------
+    predict_pair : callable
+        Function mapping two arrays of shape (n_pairs, n_features) to an array
+        of shape (n_pairs, k) whose first column is :math:`U(x_i, x_j)`
+    X : numpy array
+        (n_instances, n_objects, n_features)
+        Feature vectors of the objects
+    max_memory : int
+        Maximum number of bytes used for the gathered pairs of one chunk
+    **kwargs :
+        Keyword arguments passed to ``predict_pair``
+
+    Returns
+    -------
+    scores : numpy array
+        (n_instances, n_objects)
+        Mean pairwise preference of each object
+    """
+    n_instances, n_objects, n_features = X.shape
+    first, second = pairwise_permutation_indices(n_objects)
+    n_pairs = len(first)
+    scores = np.empty((n_instances, n_objects))
+    bytes_per_instance = max(1, 2 * n_pairs * n_features * X.itemsize)
+    chunk_size = max(1, int(max_memory // bytes_per_instance))
+    for start in range(0, n_instances, chunk_size):
+        x = X[start : start + chunk_size]
+        a = x[:, first].reshape(-1, n_features)
+        b = x[:, second].reshape(-1, n_features)
+        result = predict_pair(a, b, **kwargs)[:, 0]
+        scores[start : start + len(x)] = result.reshape(
+            len(x), n_objects, n_objects - 1
+        ).mean(axis=2)
+        del a, b, result
+    return scores
+
+
 def ranking_ordering_conversion(input):
     """Converts a ranking to an ordering.
 
@@ -90,3 +202,58 @@ def ranking_ordering_conversion(input):
     """
     output = np.argsort(input, axis=1)
     return output
+
+
+def pad_query_sets(X, Y=None, fill_value=PADDING_PREFERENCE):
+    """
+        Convert query sets of varying sizes into a dense tensor padded to the largest query size, together with a
+        boolean mask of the objects.
+
+        Examples
+        --------
+        >>> X = {1: np.ones((2, 1, 1)), 2: np.ones((1, 2, 1))}
+        >>> Y = {1: np.zeros((2, 1)), 2: np.array([[1, 0]])}
+        >>> X_padded, Y_padded, mask = pad_query_sets(X, Y)
+        >>> X_padded.shape
+        (3, 2, 1)
+        >>> Y_padded.tolist()
+        [[0.0, -1.0], [0.0, -1.0], [1.0, 0.0]]
+        >>> mask.tolist()
+        [[True, False], [True, False], [True, True]]
+
+        Parameters
+        ----------
+        X : dict
+            Map from the number of objects to the feature vectors of the objects (n_instances, n_objects, n_features)
+        Y : dict
+            Map from the number of objects to the preferences of the objects (n_instances, n_objects)
+        fill_value : float
+            Preference of the padding objects
+
+        Returns
+        -------
+        X_padded : numpy array (n_instances, max_objects, n_features)
+            Feature vectors of all query sets ordered by increasing query size, padded with zeros
+        Y_padded : numpy array (n_instances, max_objects)
+            Preferences of the objects padded with the fill value, None if Y is None
+        mask : numpy array (n_instances, max_objects)
+            True for the objects of the query sets and False for the padding
+    """
+    sizes = sorted(X.keys())
+    n_instances = sum(X[n_objects].shape[0] for n_objects in sizes)
+    max_objects = max(sizes)
+    n_features = X[sizes[0]].shape[-1]
+    X_padded = np.zeros((n_instances, max_objects, n_features), dtype=X[sizes[0]].dtype)
+    Y_padded = None
+    if Y is not None:
+        Y_padded = np.full((n_instances, max_objects), fill_value, dtype=float)
+    mask = np.zeros((n_instances, max_objects), dtype=bool)
+    start = 0
+    for n_objects in sizes:
+        stop = start + X[n_objects].shape[0]
+        X_padded[start:stop, :n_objects] = X[n_objects]
+        if Y is not None:
+            Y_padded[start:stop, :n_objects] = Y[n_objects]
+        mask[start:stop, :n_objects] = True
+        start = stop
+    return X_padded, Y_padded, mask
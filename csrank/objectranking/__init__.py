@@ -5,6 +5,7 @@ from .fate_object_ranker import FATEObjectRanker
 from .fatelinear_object_ranker import FATELinearObjectRanker
 from .feta_object_ranker import FETAObjectRanker
 from .fetalinear_object_ranker import FETALinearObjectRanker
+from .lambda_rank import LambdaRank
 from .list_net import ListNet
 from .rank_net import RankNet
 from .rank_svm import RankSVM
@@ -16,6 +17,7 @@ __all__ = [
     "FATELinearObjectRanker",
     "FETAObjectRanker",
     "FETALinearObjectRanker",
+    "LambdaRank",
     "ListNet",
     "RankNet",
     "RankSVM",
@@ -5,6 +5,7 @@ from keras.regularizers import l2
 
 from csrank.core.cmpnet_core import CmpNetCore
 from csrank.dataset_reader.objectranking.util import generate_complete_pairwise_dataset
+from csrank.numpy_util import PAIR_BATCH_MEMORY
 from csrank.objectranking.object_ranker import ObjectRanker
 
 __all__ = ["CmpNet"]
@@ -24,6 +25,8 @@ class CmpNet(CmpNetCore, ObjectRanker):
         metrics=["binary_accuracy"],
         batch_size=256,
         random_state=None,
+        pair_sampling=None,
+        pair_batch_memory=PAIR_BATCH_MEMORY,
         **kwargs,
     ):
         """
@@ -71,6 +74,12 @@ class CmpNet(CmpNetCore, ObjectRanker):
                Batch size to use during training
            random_state : int, RandomState instance or None
                Seed of the pseudorandom generator or a RandomState instance
+           pair_sampling : {None, 'uniform', 'rank_distance'}
+               If None, all pairwise preferences are created before training. Otherwise the pairs are sampled
+               lazily for each batch by a :class:`csrank.sequences.PairwiseRankingSequence` using the given
+               sampling scheme, which keeps the memory linear in the number of objects
+           pair_batch_memory : int
+               Maximum number of bytes of the pairs of objects gathered at once to predict the pairwise preferences
            **kwargs
                Keyword arguments for the algorithms
 
@@ -91,6 +100,8 @@ class CmpNet(CmpNetCore, ObjectRanker):
             metrics=metrics,
             batch_size=batch_size,
             random_state=random_state,
+            pair_sampling=pair_sampling,
+            pair_batch_memory=pair_batch_memory,
             **kwargs,
         )
         self.logger = logging.getLogger(CmpNet.__name__)
@@ -98,7 +109,9 @@ class CmpNet(CmpNetCore, ObjectRanker):
 
     def _convert_instances_(self, X, Y):
         self.logger.debug("Creating the Dataset")
-        garbage, x1, x2, y_double, garbage = generate_complete_pairwise_dataset(X, Y)
+        garbage, x1, x2, y_double, garbage = generate_complete_pairwise_dataset(
+            X, Y, difference=False
+        )
         del garbage
         if x1.shape[0] > self.threshold_instances:
             indices = self.random_state_.choice(
@@ -5,6 +5,7 @@ from keras.regularizers import l2
 
 from csrank.core.feta_network import FETANetwork
 from csrank.losses import hinged_rank_loss
+from csrank.numpy_util import PAIR_BATCH_MEMORY
 from .object_ranker import ObjectRanker
 
 __all__ = ["FETAObjectRanker"]
@@ -27,6 +28,7 @@ class FETAObjectRanker(FETANetwork, ObjectRanker):
         metrics=None,
         batch_size=256,
         random_state=None,
+        pair_batch_memory=PAIR_BATCH_MEMORY,
         **kwargs,
     ):
         """
@@ -75,6 +77,8 @@ class FETAObjectRanker(FETANetwork, ObjectRanker):
                 Batch size to use for training
             random_state : int or object
                 Numpy random state
+            pair_batch_memory : int
+                Maximum number of bytes of the pairs of objects gathered at once to predict the pairwise preferences
             **kwargs
                 Keyword arguments for the hidden units
         """
@@ -93,6 +97,7 @@ class FETAObjectRanker(FETANetwork, ObjectRanker):
             metrics=metrics,
             batch_size=batch_size,
             random_state=random_state,
+            pair_batch_memory=pair_batch_memory,
             **kwargs,
         )
         self.logger = logging.getLogger(FETAObjectRanker.__name__)
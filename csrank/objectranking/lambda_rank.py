@@ -0,0 +1,257 @@
+import logging
+
+from keras import backend as K
+from keras import Input
+from keras import Model
+from keras.layers import Lambda
+from keras.layers import multiply
+from keras.optimizers import SGD
+from keras.regularizers import l2
+from sklearn.utils import check_random_state
+
+from csrank.core.ranknet_core import RankNetCore
+from csrank.losses import check_padding_aware
+from csrank.losses import make_lambda_rank_loss
+from csrank.objectranking.object_ranker import ObjectRanker
+from csrank.sequences import make_padded_sequences
+
+__all__ = ["LambdaRank"]
+
+
+class LambdaRank(RankNetCore, ObjectRanker):
+    def __init__(
+        self,
+        n_hidden=2,
+        n_units=8,
+        k=None,
+        sigma=1.0,
+        batch_normalization=False,
+        kernel_regularizer=l2(1e-4),
+        kernel_initializer="lecun_normal",
+        activation="relu",
+        optimizer=SGD(lr=1e-4, nesterov=True, momentum=0.9),
+        metrics=None,
+        batch_size=256,
+        random_state=None,
+        **kwargs,
+    ):
+        """ Create an instance of the LambdaRank architecture for learning a object ranking function. It uses the
+            scoring network of :class:`RankNet` to learn a latent utility score for each object in the given query set
+            :math:`Q = \\{x_1, \\ldots ,x_n\\}` using the equation :math:`U(x) = F(x, w)` where :math:`w` is the weight
+            vector. Instead of the independent pairwise preferences, the network is trained on complete query sets:
+            The RankNet loss of each pair of objects :math:`x_i \\succ x_j` is weighted by :math:`|\\Delta NDCG@k_{ij}|`,
+            the change of the nDCG@k when swapping the two objects in the currently predicted ranking (see
+            :func:`csrank.losses.make_lambda_rank_loss`). The ranking for the given query set :math:`Q` is defined as:
+
+            .. math::
+
+                ρ(Q)  = \\operatorname{argsort}_{x \\in Q}  \\; U(x)
+
+            Parameters
+            ----------
+            n_hidden : int
+                Number of hidden layers used in the scoring network
+            n_units : int
+                Number of hidden units in each layer of the scoring network
+            k : int or None
+                Number of top positions of the optimized nDCG@k, None for all positions
+            sigma : float
+                Steepness of the sigmoid of the pairwise preference probabilities
+            batch_normalization : bool
+                Whether to use batch normalization in each hidden layer. Only supported for query sets of a fixed size,
+                as the batch statistics of padded query sets would include the padding objects.
+            kernel_regularizer : function
+                Regularizer function applied to all the hidden weight matrices.
+            kernel_initializer : function or string
+                Initialization function for the weights of each hidden layer
+            activation : function or string
+                Type of activation function to use in each hidden layer
+            optimizer : function or string
+                Optimizer to use during stochastic gradient descent
+            metrics : list
+                List of metrics to evaluate during training (can be non-differentiable)
+            batch_size : int
+                Number of query sets in one batch
+            random_state : int, RandomState instance or None
+                Seed of the pseudo-random generator or a RandomState instance
+            **kwargs
+                Keyword arguments for the algorithms
+
+            References
+            ----------
+                [1] Burges, C. J., Ragno, R., & Le, Q. V. (2007). "Learning to rank with nonsmooth cost functions.", In Advances in neural information processing systems (pp. 193-200).
+
+                [2] Burges, C. J. (2010). "From ranknet to lambdarank to lambdamart: An overview.", Learning, 11(23-581).
+        """
+        super().__init__(
+            n_hidden=n_hidden,
+            n_units=n_units,
+            loss_function=make_lambda_rank_loss(k=k, sigma=sigma),
+            batch_normalization=batch_normalization,
+            kernel_regularizer=kernel_regularizer,
+            kernel_initializer=kernel_initializer,
+            activation=activation,
+            optimizer=optimizer,
+            metrics=metrics,
+            batch_size=batch_size,
+            random_state=random_state,
+            **kwargs,
+        )
+        self.k = k
+        self.sigma = sigma
+        self.logger = logging.getLogger(LambdaRank.__name__)
+        self.logger.info("Initializing network")
+
+    def construct_model(self):
+        """
+            Construct the scoring network for query sets of any size. It takes the feature vectors of the objects
+            together with a mask of shape (n_instances, n_objects) as inputs, which is zero for the padding objects.
+
+            Returns
+            -------
+            model: keras :class:`Model`
+                Neural network predicting the scores of all objects of the query sets
+        """
+        x = Input(shape=(None, self.n_object_features_fit_))
+        mask = Input(shape=(None,))
+        scores = x
+        for hidden_layer in self.hidden_layers:
+            scores = hidden_layer(scores)
+        scores = self.output_layer_score(scores)
+        scores = Lambda(lambda s: K.squeeze(s, axis=-1))(scores)
+        scores = multiply([scores, mask])
+        model = Model(inputs=[x, mask], outputs=scores)
+        model.compile(
+            loss=self.loss_function, optimizer=self.optimizer, metrics=self.metrics
+        )
+        return model
+
+    def fit(
+        self, X, Y, epochs=10, callbacks=None, validation_split=0.1, verbose=0, **kwd
+    ):
+        """
+            Fit a LambdaRank model on a provided set of queries. The provided queries can be of a fixed size (numpy
+            arrays) or of varying sizes (dictionaries). The query sets of varying sizes are padded and trained in
+            batches of similar sizes, see :class:`csrank.sequences.PaddedBatchSequence`.
+
+            Parameters
+            ----------
+            X : numpy array (n_instances, n_objects, n_features) or dict
+                Feature vectors of the objects, or a map from the number of objects to them
+            Y : numpy array (n_instances, n_objects) or dict
+                Rankings of the given objects, or a map from the number of objects to them
+            epochs : int
+                Number of epochs to run
+            callbacks : list
+                List of callbacks to be called during optimization
+            validation_split : float (range : [0,1])
+                Percentage of instances to split off to validate on
+            verbose : bool
+                Print verbose information
+            **kwd
+                Keyword arguments for the fit function
+
+            Raises
+            ------
+            ValueError
+                If query sets of varying sizes are trained with batch normalization, or with metrics which do not
+                ignore the padding objects
+        """
+        self.random_state_ = check_random_state(self.random_state)
+        if not isinstance(X, dict):
+            X, Y = {X.shape[1]: X}, {Y.shape[1]: Y}
+        if len(X) > 1:
+            if self.batch_normalization:
+                raise ValueError(
+                    "Batch normalization is not supported for query sets of varying sizes, as the batch statistics "
+                    "would include the padding objects"
+                )
+            check_padding_aware(self.loss_function, self.metrics)
+        self.n_object_features_fit_ = next(iter(X.values())).shape[-1]
+        self.logger.debug("Creating the model")
+        self._construct_layers(
+            kernel_regularizer=self.kernel_regularizer,
+            kernel_initializer=self.kernel_initializer,
+            activation=self.activation,
+            **self.kwargs,
+        )
+        self.model = self.construct_model()
+        self._scoring_model = None
+        train, validation = make_padded_sequences(
+            X,
+            Y,
+            validation_split=validation_split,
+            random_state=self.random_state_,
+            batch_size=self.batch_size,
+        )
+        self.logger.debug("Finished Creating the model, now fitting started")
+        self.model.fit_generator(
+            train,
+            epochs=epochs,
+            callbacks=callbacks,
+            validation_data=validation,
+            verbose=verbose,
+            **kwd,
+        )
+        self.logger.debug("Fitting Complete")
+
+    @property
+    def scoring_model(self):
+        """
+            Creates a scoring model for the trained LambdaRank, which predicts the utility scores for given query
+            sets of objects. The hidden layers were built for inputs of shape (n_instances, n_objects, n_features),
+            which the batch normalization layers expect.
+
+            Returns
+            -------
+             model: keras :class:`Model`
+                Neural network to learn the non-linear utility score
+        """
+        if self._scoring_model is None:
+            self.logger.info("creating scoring model")
+            inp = Input(shape=(None, self.n_object_features_fit_))
+            x = inp
+            for hidden_layer in self.hidden_layers:
+                x = hidden_layer(x)
+            output_score = self.output_layer_score(x)
+            output_score = Lambda(lambda s: K.squeeze(s, axis=-1))(output_score)
+            self._scoring_model = Model(inputs=[inp], outputs=output_score)
+        return self._scoring_model
+
+    def _predict_scores_fixed(self, X, **kwargs):
+        self.logger.info(
+            "Test Set instances {} objects {} features {}".format(*X.shape)
+        )
+        scores = self.scoring_model.predict(X, **kwargs)
+        self.logger.info("Done predicting scores")
+        return scores
+
+    def predict_scores(self, X, **kwargs):
+        return super().predict_scores(X, **kwargs)
+
+    def predict_for_scores(self, scores, **kwargs):
+        return ObjectRanker.predict_for_scores(self, scores, **kwargs)
+
+    def predict(self, X, **kwargs):
+        return super().predict(X, **kwargs)
+
+    def clear_memory(self, **kwargs):
+        super().clear_memory(**kwargs)
+
+    def set_tunable_parameters(
+        self,
+        n_hidden=32,
+        n_units=2,
+        reg_strength=1e-4,
+        learning_rate=1e-3,
+        batch_size=128,
+        **point,
+    ):
+        super().set_tunable_parameters(
+            n_hidden=n_hidden,
+            n_units=n_units,
+            reg_strength=reg_strength,
+            learning_rate=learning_rate,
+            batch_size=batch_size,
+            **point,
+        )
@@ -24,6 +24,7 @@ class RankNet(RankNetCore, ObjectRanker):
         metrics=["binary_accuracy"],
         batch_size=256,
         random_state=None,
+        pair_sampling=None,
         **kwargs,
     ):
         """ Create an instance of the :class:`RankNetCore` architecture for learning a object ranking function.
@@ -62,6 +63,10 @@ class RankNet(RankNetCore, ObjectRanker):
                 Batch size to use during training
             random_state : int, RandomState instance or None
                 Seed of the pseudo-random generator or a RandomState instance
+            pair_sampling : {None, 'uniform', 'rank_distance'}
+                If None, all pairwise preferences are created before training. Otherwise the pairs are sampled
+                lazily for each batch by a :class:`csrank.sequences.PairwiseRankingSequence` using the given
+                sampling scheme, which keeps the memory linear in the number of objects
             **kwargs
                 Keyword arguments for the algorithms
 
@@ -84,6 +89,7 @@ class RankNet(RankNetCore, ObjectRanker):
             metrics=metrics,
             batch_size=batch_size,
             random_state=random_state,
+            pair_sampling=pair_sampling,
             **kwargs,
         )
         self.logger = logging.getLogger(RankNet.__name__)
@@ -94,7 +100,9 @@ class RankNet(RankNetCore, ObjectRanker):
 
     def _convert_instances_(self, X, Y):
         self.logger.debug("Creating the Dataset")
-        garbage, x1, x2, garbage, y_single = generate_complete_pairwise_dataset(X, Y)
+        garbage, x1, x2, garbage, y_single = generate_complete_pairwise_dataset(
+            X, Y, difference=False
+        )
         del garbage
         if x1.shape[0] > self.threshold_instances:
             indices = self.random_state.choice(
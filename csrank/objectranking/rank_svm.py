@@ -69,7 +69,7 @@ class RankSVM(ObjectRanker, PairwiseSVM):
             garbage,
             garbage,
             y_single,
-        ) = generate_complete_pairwise_dataset(X, Y)
+        ) = generate_complete_pairwise_dataset(X, Y, pairs=False)
         del garbage
         assert x_train.shape[1] == self.n_object_features_fit_
         self.logger.debug(
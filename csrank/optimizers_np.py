@@ -0,0 +1,60 @@
+"""Minimal NumPy gradient descent solvers used by the NumPy backend of the linear learners."""
+import numpy as np
+
+__all__ = ["SGDNumpy", "AdamNumpy", "get_solver_np"]
+
+
+class SGDNumpy(object):
+    """Plain stochastic gradient descent, the update used by `tf.train.GradientDescentOptimizer`."""
+
+    def update(self, params, grads, learning_rate):
+        for param, grad in zip(params, grads):
+            param -= learning_rate * grad
+
+
+class AdamNumpy(object):
+    """Adam solver with the same defaults as `tf.train.AdamOptimizer`."""
+
+    def __init__(self, beta_1=0.9, beta_2=0.999, epsilon=1e-8):
+        self.beta_1 = beta_1
+        self.beta_2 = beta_2
+        self.epsilon = epsilon
+        self.iterations = 0
+        self.ms = None
+        self.vs = None
+
+    def update(self, params, grads, learning_rate):
+        if self.ms is None:
+            self.ms = [np.zeros_like(param) for param in params]
+            self.vs = [np.zeros_like(param) for param in params]
+        self.iterations += 1
+        t = self.iterations
+        lr_t = learning_rate * np.sqrt(1 - self.beta_2 ** t) / (1 - self.beta_1 ** t)
+        for param, grad, m, v in zip(params, grads, self.ms, self.vs):
+            m *= self.beta_1
+            m += (1 - self.beta_1) * grad
+            v *= self.beta_2
+            v += (1 - self.beta_2) * np.square(grad)
+            param -= lr_t * m / (np.sqrt(v) + self.epsilon)
+
+
+def get_solver_np(solver):
+    """
+        Create a fresh NumPy solver.
+
+        Parameters
+        ----------
+        solver : {'sgd', 'adam'}
+            Name of the solver
+
+        Returns
+        -------
+        solver : object
+            Solver providing an in-place ``update(params, grads, learning_rate)`` method
+    """
+    solvers = {"sgd": SGDNumpy, "adam": AdamNumpy}
+    if solver not in solvers:
+        raise ValueError(
+            "Unknown solver {}, expected one of {}".format(solver, list(solvers))
+        )
+    return solvers[solver]()
@@ -0,0 +1,294 @@
+import logging
+
+from keras.utils import Sequence
+import numpy as np
+from sklearn.utils import check_random_state
+
+from csrank.numpy_util import pad_query_sets
+
+__all__ = [
+    "PairwiseRankingSequence",
+    "make_pairwise_sequences",
+    "PaddedBatchSequence",
+    "make_padded_sequences",
+]
+
+
+class PairwiseRankingSequence(Sequence):
+    def __init__(
+        self,
+        X,
+        Y,
+        batch_size=256,
+        n_pairs=None,
+        sampling="uniform",
+        output="single",
+        random_state=None,
+    ):
+        """
+            Keras :class:`Sequence` which samples pairwise preferences from rankings lazily, one batch at a time.
+
+            In contrast to :func:`csrank.dataset_reader.objectranking.util.generate_complete_pairwise_dataset`, the
+            pairs of objects are never materialized for all instances. Only the orderings of the objects are stored,
+            so the memory stays linear in the number of objects per query set. Each batch consists of randomly chosen
+            instances together with a randomly chosen pair of distinct objects of the instance. The first object of
+            the pair is preferred (label 1) or not preferred (label 0) with equal probability.
+
+            Every batch is sampled using a seed derived from the batch index and the epoch, which makes the sequence
+            safe to be used with multiple workers (``workers`` and ``use_multiprocessing`` of ``fit_generator``).
+
+            Parameters
+            ----------
+            X : numpy array (n_instances, n_objects, n_features)
+                Feature vectors of the objects
+            Y : numpy array (n_instances, n_objects)
+                Rankings of the given objects
+            batch_size : int
+                Number of pairs in one batch
+            n_pairs : int
+                Number of pairs sampled in one epoch, defaults to the number of all pairs
+                :math:`n_{instances} \\cdot {n_{objects} \\choose 2}`
+            sampling : {'uniform', 'rank_distance'}
+                How the pair of objects of an instance is chosen:
+
+                    * **uniform** : All pairs of objects are equally likely
+                    * **rank_distance** : The probability of a pair is proportional to the distance of the ranks of
+                      the two objects, which emphasizes pairs that are easy to distinguish
+            output : {'single', 'double'}
+                Whether to produce the labels as a vector (as used by :class:`RankNet`) or as a matrix of the two
+                complementary preferences (as used by :class:`CmpNet`)
+            random_state : int, RandomState instance or None
+                Seed of the pseudorandom generator or a RandomState instance
+        """
+        self.logger = logging.getLogger(PairwiseRankingSequence.__name__)
+        if sampling not in {"uniform", "rank_distance"}:
+            raise ValueError(
+                "Unknown sampling {}, expected 'uniform' or 'rank_distance'".format(
+                    sampling
+                )
+            )
+        if output not in {"single", "double"}:
+            raise ValueError(
+                "Unknown output {}, expected 'single' or 'double'".format(output)
+            )
+        self.X = X
+        n_instances, self.n_objects, _ = X.shape
+        # orderings[n, r] is the object at rank r of instance n
+        self.orderings = np.argsort(Y, axis=1)
+        if n_pairs is None:
+            n_pairs = n_instances * self.n_objects * (self.n_objects - 1) // 2
+        self.n_pairs = n_pairs
+        self.batch_size = batch_size
+        self.sampling = sampling
+        self.output = output
+        self.seed = check_random_state(random_state).randint(2 ** 31)
+        self.epoch = 0
+        distances = np.arange(1, self.n_objects)
+        # There are n_objects - d pairs with a rank distance of d
+        weights = distances * (self.n_objects - distances)
+        self.distance_probabilities = weights / np.sum(weights)
+
+    def __len__(self):
+        return int(np.ceil(self.n_pairs / self.batch_size))
+
+    def _sample_ranks(self, random_state, size):
+        if self.sampling == "uniform":
+            better = random_state.randint(self.n_objects, size=size)
+            worse = random_state.randint(self.n_objects - 1, size=size)
+            worse += worse >= better
+            return np.minimum(better, worse), np.maximum(better, worse)
+        distance = 1 + random_state.choice(
+            self.n_objects - 1, size=size, p=self.distance_probabilities
+        )
+        better = (random_state.uniform(size=size) * (self.n_objects - distance)).astype(
+            int
+        )
+        return better, better + distance
+
+    def __getitem__(self, index):
+        size = min(self.batch_size, self.n_pairs - index * self.batch_size)
+        random_state = np.random.RandomState([self.seed, self.epoch, index])
+        instances = random_state.randint(len(self.X), size=size)
+        better, worse = self._sample_ranks(random_state, size)
+        better = self.orderings[instances, better]
+        worse = self.orderings[instances, worse]
+        y_single = random_state.randint(2, size=size)
+        first = np.where(y_single == 1, better, worse)
+        second = np.where(y_single == 1, worse, better)
+        x1, x2 = self.X[instances, first], self.X[instances, second]
+        if self.output == "double":
+            return [x1, x2], np.column_stack((y_single, 1 - y_single)).astype(float)
+        return [x1, x2], y_single
+
+    def on_epoch_end(self):
+        self.epoch += 1
+
+
+def make_pairwise_sequences(
+    X, Y, validation_split=0.0, n_pairs=None, random_state=None, **kwargs
+):
+    """
+        Split the query sets into a training and a validation part and create a :class:`PairwiseRankingSequence`
+        for each of them.
+
+        Parameters
+        ----------
+        X : numpy array (n_instances, n_objects, n_features)
+            Feature vectors of the objects
+        Y : numpy array (n_instances, n_objects)
+            Rankings of the given objects
+        validation_split : float (range : [0,1])
+            Percentage of instances to split off to validate on
+        n_pairs : int
+            Maximum number of pairs per epoch of the training sequence
+        random_state : RandomState instance
+            Random state used to split the instances and to seed the sequences
+        **kwargs
+            Keyword arguments for the :class:`PairwiseRankingSequence`
+
+        Returns
+        -------
+        train : :class:`PairwiseRankingSequence`
+            Sequence of the training instances
+        validation : :class:`PairwiseRankingSequence` or None
+            Sequence of the validation instances, None if ``validation_split`` is 0
+    """
+    random_state = check_random_state(random_state)
+    n_instances, n_objects, _ = X.shape
+    n_validation = int(np.round(validation_split * n_instances))
+    indices = random_state.permutation(n_instances)
+    validation_idx, train_idx = indices[:n_validation], indices[n_validation:]
+
+    def n_all_pairs(n):
+        return n * n_objects * (n_objects - 1) // 2
+
+    n_train_pairs = n_all_pairs(len(train_idx))
+    if n_pairs is not None:
+        n_train_pairs = min(n_train_pairs, int(n_pairs))
+    train = PairwiseRankingSequence(
+        X[train_idx],
+        Y[train_idx],
+        n_pairs=n_train_pairs,
+        random_state=random_state,
+        **kwargs,
+    )
+    validation = None
+    if n_validation > 0:
+        validation = PairwiseRankingSequence(
+            X[validation_idx],
+            Y[validation_idx],
+            n_pairs=n_all_pairs(n_validation),
+            random_state=random_state,
+            **kwargs,
+        )
+    return train, validation
+
+
+class PaddedBatchSequence(Sequence):
+    def __init__(self, X, Y, mask, batch_size=256, random_state=None):
+        """
+            Keras :class:`Sequence` over padded query sets of varying sizes, which yields the inputs of a masked model
+            ``[X, mask]`` together with the preferences.
+
+            The batches are bucketed by the query sizes to minimize the padding: In every epoch the instances are
+            sorted by their number of objects (ties are broken randomly), split into consecutive batches and each batch
+            is only padded to the largest query set it contains. The order of the batches is shuffled every epoch.
+
+            Parameters
+            ----------
+            X : numpy array (n_instances, max_objects, n_features)
+                Padded feature vectors of the objects
+            Y : numpy array (n_instances, max_objects)
+                Padded preferences of the objects
+            mask : numpy array (n_instances, max_objects)
+                True for the objects of the query sets and False for the padding
+            batch_size : int
+                Number of query sets in one batch
+            random_state : int, RandomState instance or None
+                Seed of the pseudorandom generator or a RandomState instance
+        """
+        self.X = X
+        self.Y = Y
+        self.mask = mask
+        self.lengths = np.sum(mask, axis=1)
+        self.batch_size = batch_size
+        self.seed = check_random_state(random_state).randint(2 ** 31)
+        self.epoch = 0
+        self._batches = None
+
+    def __len__(self):
+        return int(np.ceil(len(self.X) / self.batch_size))
+
+    @property
+    def batches(self):
+        """Indices of the instances of each batch in the current epoch"""
+        if self._batches is None:
+            random_state = np.random.RandomState([self.seed, self.epoch])
+            ties = random_state.permutation(len(self.X))
+            order = np.lexsort((ties, self.lengths))
+            batches = [
+                order[start : start + self.batch_size]
+                for start in range(0, len(order), self.batch_size)
+            ]
+            self._batches = [batches[i] for i in random_state.permutation(len(batches))]
+        return self._batches
+
+    def __getitem__(self, index):
+        indices = self.batches[index]
+        n_objects = np.max(self.lengths[indices])
+        x = self.X[indices, :n_objects]
+        mask = self.mask[indices, :n_objects].astype(float)
+        return [x, mask], self.Y[indices, :n_objects]
+
+    def on_epoch_end(self):
+        self.epoch += 1
+        self._batches = None
+
+
+def make_padded_sequences(X, Y, validation_split=0.0, random_state=None, **kwargs):
+    """
+        Pad the query sets of varying sizes, split them into a training and a validation part and create a
+        :class:`PaddedBatchSequence` for each of them.
+
+        Parameters
+        ----------
+        X : dict
+            Map from the number of objects to the feature vectors of the objects (n_instances, n_objects, n_features)
+        Y : dict
+            Map from the number of objects to the preferences of the objects (n_instances, n_objects)
+        validation_split : float (range : [0,1])
+            Percentage of instances to split off to validate on
+        random_state : RandomState instance
+            Random state used to split the instances and to seed the sequences
+        **kwargs
+            Keyword arguments for the :class:`PaddedBatchSequence`
+
+        Returns
+        -------
+        train : :class:`PaddedBatchSequence`
+            Sequence of the training instances
+        validation : :class:`PaddedBatchSequence` or None
+            Sequence of the validation instances, None if ``validation_split`` is 0
+    """
+    random_state = check_random_state(random_state)
+    X, Y, mask = pad_query_sets(X, Y)
+    n_validation = int(np.round(validation_split * len(X)))
+    indices = random_state.permutation(len(X))
+    validation_idx, train_idx = indices[:n_validation], indices[n_validation:]
+    train = PaddedBatchSequence(
+        X[train_idx],
+        Y[train_idx],
+        mask[train_idx],
+        random_state=random_state,
+        **kwargs,
+    )
+    validation = None
+    if n_validation > 0:
+        validation = PaddedBatchSequence(
+            X[validation_idx],
+            Y[validation_idx],
+            mask[validation_idx],
+            random_state=random_state,
+            **kwargs,
+        )
+    return train, validation
@@ -7,6 +7,8 @@ import numpy as np
 import tensorflow as tf
 from tensorflow.python.client import device_lib
 
+from csrank.metric_registry import get_metric_np
+
 
 def scores_to_rankings(n_objects, y_pred):
     # indices = orderings
@@ -68,6 +70,16 @@ def configure_numpy_keras(seed=42):
 
 
 def get_mean_loss(metric, y_true, y_pred):
+    """
+        Evaluate a metric on the predictions, which can be a dictionary mapping the number of objects to the
+        predictions. For NumPy inputs the NumPy counterpart of the metric is used (if available), so the evaluation
+        does not add operations to the TensorFlow graph.
+    """
+    if not _is_tensor(y_true) and not _is_tensor(y_pred):
+        try:
+            metric = get_metric_np(metric)
+        except ValueError:
+            pass
     if isinstance(y_pred, dict) and isinstance(y_true, dict):
         losses = []
         total_instances = 0
@@ -84,6 +96,12 @@ def get_mean_loss(metric, y_true, y_pred):
     return mean_loss
 
 
+def _is_tensor(x):
+    if isinstance(x, dict):
+        return any(_is_tensor(value) for value in x.values())
+    return isinstance(x, (tf.Tensor, tf.Variable))
+
+
 def eval_loss(metric, y_true, y_pred):
     x = metric(y_true, y_pred)
     x = get_tensor_value(x)
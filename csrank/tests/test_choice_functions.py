@@ -1,3 +1,4 @@
+import logging
 import os
 
 from keras.optimizers import SGD
@@ -7,6 +8,7 @@ import pytest
 import tensorflow as tf
 
 from csrank.choicefunction import *
+from csrank.choicefunction.choice_functions import ChoiceFunctions
 from csrank.constants import CMPNET_CHOICE
 from csrank.constants import FATE_CHOICE
 from csrank.constants import FATELINEAR_CHOICE
@@ -142,3 +144,21 @@ def test_choice_function_fixed(trivial_choice_problem, name):
     }
     learner.set_tunable_parameters(**params)
     check_params_tunable(learner, params, rtol, atol)
+
+
+class FixedScoresChoiceFunction(ChoiceFunctions):
+    threshold_metric = "informedness"
+
+    def __init__(self, scores):
+        self.scores = scores
+        self.logger = logging.getLogger(FixedScoresChoiceFunction.__name__)
+
+    def predict_scores(self, X, **kwargs):
+        return self.scores
+
+
+def test_tune_threshold_undefined_informedness():
+    # The informedness is undefined if every instance is all-positive or all-negative
+    Y_val = np.array([[1, 1, 1], [0, 0, 0]])
+    learner = FixedScoresChoiceFunction(np.array([[0.2, 0.5, 0.9], [0.1, 0.4, 0.7]]))
+    assert learner._tune_threshold(None, Y_val, verbose=1) == 0.0
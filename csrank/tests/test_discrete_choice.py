@@ -2,6 +2,7 @@ import os
 
 from keras.optimizers import SGD
 import numpy as np
+import pymc3 as pm
 from pymc3.variational.callbacks import CheckParametersConvergence
 import pytest
 import tensorflow as tf
@@ -20,6 +21,7 @@ from csrank.constants import RANKNET_DC
 from csrank.constants import RANKSVM_DC
 from csrank.dataset_reader.discretechoice.util import convert_to_label_encoding
 from csrank.discretechoice import *
+from csrank.discretechoice.likelihoods import posterior_means
 from csrank.metrics_np import categorical_accuracy_np
 from csrank.metrics_np import subset_01_loss
 from csrank.metrics_np import topk_categorical_accuracy_np
@@ -151,3 +153,27 @@ def test_discrete_choice_function_fixed(trivial_discrete_choice_problem, name):
     }
     learner.set_tunable_parameters(**params)
     check_params_tunable(learner, params, rtol, atol)
+
+
+def test_posterior_means_cache(trivial_discrete_choice_problem):
+    x, y = trivial_discrete_choice_problem
+    learner = MultinomialLogitModel()
+    learner.fit(
+        x,
+        y,
+        vi_params={
+            "n": 100,
+            "method": "advi",
+            "callbacks": [CheckParametersConvergence()],
+        },
+    )
+    means = posterior_means(learner)
+    assert learner.posterior_means_ is means
+    summary = pm.summary(learner.trace)["mean"]
+    for i, weight in enumerate(means["weights"]):
+        assert np.isclose(summary["weights[{}]".format(i)], weight, atol=1e-2)
+    assert np.isclose(summary["intercept"], means["intercept"], atol=1e-2)
+    s_pred = learner.predict_scores(x)
+    assert np.allclose(s_pred, np.dot(x, means["weights"]) + means["intercept"])
+    learner.set_tunable_parameters()
+    assert learner.posterior_means_ is None
@@ -4,8 +4,11 @@ from keras import Input
 from keras import Model
 from keras.regularizers import l2
 import numpy as np
+import pytest
 
 from csrank import FATENetworkCore
+from csrank import FATEChoiceFunction
+from csrank import FATEDiscreteChoiceFunction
 from csrank import FATEObjectRanker
 from csrank.tests.test_ranking import optimizer
 
@@ -97,3 +100,172 @@ def test_fate_object_ranker_fixed_generator():
         verbose=False,
         steps_per_epoch=10,
     )
+
+
+def test_fate_object_ranker_shape_polymorphic():
+    random_state = np.random.RandomState(42)
+    X = random_state.randn(20, 5, 2)
+    Y = X.sum(axis=2).argsort(axis=1).argsort(axis=1)
+    fate = FATEObjectRanker(
+        n_hidden_joint_layers=1,
+        n_hidden_set_layers=1,
+        n_hidden_joint_units=5,
+        n_hidden_set_units=5,
+        kernel_regularizer=l2(1e-4),
+        optimizer=optimizer,
+        shape_polymorphic=True,
+    )
+    fate.fit(X, Y, epochs=1, validation_split=0, verbose=False)
+    model = fate.model
+    assert model.input_shape == [(None, None, 2), (None, None)]
+
+    # The same graph predicts query sets of a size unseen during training
+    X_test = random_state.randn(4, 7, 2)
+    scores = fate.predict_scores(X_test)
+    assert scores.shape == (4, 7)
+    assert fate.model is model
+
+    # The shared layers yield the same scores as the unrolled network
+    fate.shape_polymorphic = False
+    assert np.allclose(fate.predict_scores(X_test), scores, atol=1e-5)
+
+
+def test_fate_object_ranker_padded_variadic():
+    random_state = np.random.RandomState(42)
+    X = {n_objects: random_state.randn(20, n_objects, 2) for n_objects in (3, 4, 6)}
+    Y = {
+        n_objects: x.sum(axis=2).argsort(axis=1).argsort(axis=1)
+        for n_objects, x in X.items()
+    }
+    fate = FATEObjectRanker(
+        n_hidden_joint_layers=1,
+        n_hidden_set_layers=1,
+        n_hidden_joint_units=5,
+        n_hidden_set_units=5,
+        kernel_regularizer=l2(1e-4),
+        optimizer=optimizer,
+        batch_size=8,
+        shape_polymorphic=True,
+    )
+    fate.fit(X, Y, epochs=2, validation_split=0.1, verbose=False)
+    assert not hasattr(fate, "models_")
+    scores = fate.predict_scores(X)
+    assert {n_objects: s.shape for n_objects, s in scores.items()} == {
+        n_objects: x.shape[:2] for n_objects, x in X.items()
+    }
+
+
+@pytest.mark.parametrize(
+    "learner, fit_kwargs",
+    [(FATEChoiceFunction, {"tune_size": 0}), (FATEDiscreteChoiceFunction, {})],
+)
+def test_fate_padded_variadic_requires_padding_aware_loss(learner, fit_kwargs):
+    # Binary cross entropy and the categorical hinge loss would fit the padding objects
+    random_state = np.random.RandomState(42)
+    X = {n_objects: random_state.randn(20, n_objects, 2) for n_objects in (3, 4)}
+    Y = {n_objects: np.eye(n_objects)[np.zeros(20, dtype=int)] for n_objects in X}
+    fate = learner(
+        n_hidden_joint_layers=1,
+        n_hidden_set_layers=1,
+        n_hidden_joint_units=5,
+        n_hidden_set_units=5,
+        optimizer=optimizer,
+        shape_polymorphic=True,
+    )
+    with pytest.raises(ValueError):
+        fate.fit(X, Y, epochs=1, validation_split=0, verbose=False, **fit_kwargs)
+
+
+def test_fate_object_ranker_meta_gradient():
+    random_state = np.random.RandomState(42)
+    X = {n_objects: random_state.randn(20, n_objects, 2) for n_objects in (3, 4, 6)}
+    Y = {
+        n_objects: x.sum(axis=2).argsort(axis=1).argsort(axis=1)
+        for n_objects, x in X.items()
+    }
+    fate = FATEObjectRanker(
+        n_hidden_joint_layers=1,
+        n_hidden_set_layers=1,
+        n_hidden_joint_units=5,
+        n_hidden_set_units=5,
+        kernel_regularizer=l2(1e-4),
+        optimizer=optimizer,
+        batch_size=8,
+    )
+    fate.fit(X, Y, epochs=1, validation_split=0, min_bucket_size=10, verbose=False)
+    weights = fate.get_weights()
+    # A step size of zero and no momentum restores the weights before the bucket
+    fate.fit(
+        X,
+        Y,
+        epochs=1,
+        validation_split=0,
+        min_bucket_size=10,
+        global_lr=0.0,
+        global_momentum=0.0,
+        verbose=False,
+    )
+    for before, after in zip(weights, fate.get_weights()):
+        assert np.allclose(before, after)
+    # Weights are shared by the models of all query sizes
+    for n_objects in X:
+        for w_1, w_2 in zip(weights, fate.get_weights(n_objects)):
+            assert np.allclose(w_1, w_2)
+
+
+def test_fate_object_ranker_meta_gradient_momentum():
+    random_state = np.random.RandomState(42)
+    X = {n_objects: random_state.randn(20, n_objects, 2) for n_objects in (3, 4)}
+    Y = {
+        n_objects: x.sum(axis=2).argsort(axis=1).argsort(axis=1)
+        for n_objects, x in X.items()
+    }
+    fate = FATEObjectRanker(
+        n_hidden_joint_layers=1,
+        n_hidden_set_layers=1,
+        n_hidden_joint_units=5,
+        n_hidden_set_units=5,
+        kernel_regularizer=l2(1e-4),
+        optimizer=optimizer,
+        batch_size=8,
+    )
+    fate.fit(X, Y, epochs=1, validation_split=0, min_bucket_size=10, verbose=False)
+    # Record the weights before and after training on each bucket
+    records = []
+    for model in fate.models_.values():
+
+        def recording_fit(*args, _model=model, _fit=model.fit, **kwargs):
+            before = _model.get_weights()
+            history = _fit(*args, **kwargs)
+            records.append((kwargs["x"].shape[1], before, _model.get_weights()))
+            return history
+
+        model.fit = recording_fit
+    global_lr, global_momentum = 0.5, 0.9
+    fate.fit(
+        X,
+        Y,
+        epochs=1,
+        validation_split=0,
+        min_bucket_size=10,
+        global_lr=global_lr,
+        global_momentum=global_momentum,
+        verbose=False,
+    )
+    assert sorted(n_objects for n_objects, _, _ in records) == [3, 4]
+    # Both buckets have the frequency 1 / 2, the first one has no momentum
+    expected, w_old = None, records[0][1]
+    for _, w_before, w_after in records:
+        if expected is not None:
+            # The next bucket starts from the meta-updated weights
+            for actual, desired in zip(w_before, expected):
+                np.testing.assert_allclose(actual, desired, rtol=1e-5, atol=1e-6)
+        expected = [
+            before
+            + global_lr * 0.5 * (after - before)
+            + global_momentum * (before - old)
+            for before, after, old in zip(w_before, w_after, w_old)
+        ]
+        w_old = w_before
+    for actual, desired in zip(fate.get_weights(), expected):
+        np.testing.assert_allclose(actual, desired, rtol=1e-5, atol=1e-6)
@@ -1,10 +1,17 @@
 from keras import backend as K
+from keras.losses import binary_crossentropy
+from keras.losses import categorical_hinge
 import numpy as np
 from numpy.testing import assert_almost_equal
+import pytest
 
 from csrank.losses import hinged_rank_loss
+from csrank.losses import make_lambda_rank_loss
+from csrank.losses import make_plackett_luce_loss
+from csrank.losses import make_sampled_rank_loss
 from csrank.losses import plackett_luce_loss
 from csrank.losses import smooth_rank_loss
+from csrank.losses_np import get_loss_np
 
 decimal = 3
 
@@ -51,6 +58,45 @@ def test_plackett_luce_loss():
     )
 
 
+@pytest.mark.parametrize("k", [None, 1, 3])
+def test_plackett_luce_loss_against_all_subsets(k):
+    rs = np.random.RandomState(42)
+    y_true = np.array([rs.permutation(6) for _ in range(4)])
+    y_pred = rs.randn(4, 6)
+    # Choose the object of rank r from the objects with the ranks r, ..., 5
+    expected = 1e-4 * np.sum(np.square(y_pred), axis=1)
+    expected_gradient = 2e-4 * y_pred
+    for r in range(6 if k is None else k):
+        remaining = np.exp(y_pred) * (y_true >= r)
+        normalizer = np.sum(remaining, axis=1, keepdims=True)
+        expected += np.log(normalizer[:, 0])
+        expected -= np.sum(y_pred * (y_true == r), axis=1)
+        expected_gradient += remaining / normalizer - (y_true == r)
+    y_pred_tensor = K.constant(y_pred)
+    loss = make_plackett_luce_loss(k=k)(K.constant(y_true), y_pred_tensor)
+    gradient = K.gradients(K.sum(loss), [y_pred_tensor])[0]
+    assert_almost_equal(actual=K.eval(loss), desired=expected, decimal=decimal)
+    assert_almost_equal(
+        actual=K.eval(gradient), desired=expected_gradient, decimal=decimal
+    )
+
+
+def test_plackett_luce_loss_large_score_range():
+    # The normalizers of the last ranks underflow if all scores are shifted by the maximum
+    y_true = np.array([[0, 1, 2, 3], [3, 2, 1, 0]])
+    y_pred = np.array([[100.0, 0.0, -100.0, -200.0]] * 2)
+    expected = 1e-4 * np.sum(np.square(y_pred), axis=1)
+    for r in range(4):
+        remaining = np.where(y_true >= r, y_pred, -np.inf)
+        expected += np.logaddexp.reduce(remaining, axis=1)
+        expected -= np.sum(y_pred * (y_true == r), axis=1)
+    y_pred_tensor = K.constant(y_pred)
+    loss = plackett_luce_loss(K.constant(y_true), y_pred_tensor)
+    gradient = K.gradients(K.sum(loss), [y_pred_tensor])[0]
+    assert_almost_equal(actual=K.eval(loss), desired=expected, decimal=decimal)
+    assert np.all(np.isfinite(K.eval(gradient)))
+
+
 def test_smooth_rank_loss():
     y_true = np.arange(5)[None, :]
     y_true_tensor = K.constant(y_true)
@@ -76,3 +122,107 @@ def test_smooth_rank_loss():
         ),
         desired=np.array([0.82275984]),
     )
+
+
+@pytest.mark.parametrize(
+    "loss_function, target",
+    [
+        (hinged_rank_loss, "ranking"),
+        (smooth_rank_loss, "ranking"),
+        (binary_crossentropy, "choice"),
+        (categorical_hinge, "discrete_choice"),
+    ],
+)
+def test_numpy_losses(loss_function, target):
+    rs = np.random.RandomState(42)
+    n_instances, n_objects = 4, 5
+    y_pred = rs.uniform(size=(n_instances, n_objects))
+    if target == "ranking":
+        y_true = np.array([rs.permutation(n_objects) for _ in range(n_instances)])
+    elif target == "choice":
+        y_true = rs.randint(2, size=(n_instances, n_objects)).astype(float)
+    else:
+        y_true = np.eye(n_objects)[rs.randint(n_objects, size=n_instances)]
+    y_true_tensor = K.constant(y_true)
+    y_pred_tensor = K.constant(y_pred)
+    loss_tensor = loss_function(y_true_tensor, y_pred_tensor)
+    gradient_tensor = K.gradients(K.sum(loss_tensor), [y_pred_tensor])[0]
+    loss, gradient = get_loss_np(loss_function)(y_true, y_pred)
+    assert_almost_equal(actual=loss, desired=K.eval(loss_tensor), decimal=decimal)
+    assert_almost_equal(
+        actual=gradient, desired=K.eval(gradient_tensor), decimal=decimal
+    )
+
+
+@pytest.mark.parametrize("loss_function", [hinged_rank_loss, smooth_rank_loss])
+def test_rank_losses_ignore_padding(loss_function):
+    rs = np.random.RandomState(42)
+    y_true = np.array([rs.permutation(4) for _ in range(3)])
+    y_pred = rs.randn(3, 4)
+    y_true_padded = np.hstack((y_true, -np.ones((3, 2))))
+    y_pred_padded = np.hstack((y_pred, rs.randn(3, 2)))
+    assert_almost_equal(
+        actual=K.eval(
+            loss_function(K.constant(y_true_padded), K.constant(y_pred_padded))
+        ),
+        desired=K.eval(loss_function(K.constant(y_true), K.constant(y_pred))),
+        decimal=decimal,
+    )
+
+
+@pytest.mark.parametrize("sampling", ["uniform", "rank_distance"])
+@pytest.mark.parametrize("loss_function", [hinged_rank_loss, smooth_rank_loss])
+def test_sampled_rank_losses(loss_function, sampling):
+    rs = np.random.RandomState(42)
+    y_true = np.array([rs.permutation(6) for _ in range(3)])
+    # The last instance has two padding objects
+    y_true[2] = [1, -1, 3, 0, -1, 2]
+    y_pred = 0.5 * rs.randn(3, 6)
+    sampled_loss = make_sampled_rank_loss(
+        loss_function, n_pairs=100000, sampling=sampling
+    )
+    assert_almost_equal(
+        actual=K.eval(sampled_loss(K.constant(y_true), K.constant(y_pred))),
+        desired=K.eval(loss_function(K.constant(y_true), K.constant(y_pred))),
+        decimal=2,
+    )
+    with pytest.raises(ValueError):
+        make_sampled_rank_loss(plackett_luce_loss)
+
+
+def ndcg_at_k(y_true, y_pred, k):
+    valid = y_true >= 0
+    max_rank = max(np.max(y_true), 1)
+    gains = (2 ** ((max_rank - y_true) / max_rank) - 1) * valid
+    positions = np.arange(len(y_true))
+    discounts = (positions < (len(y_true) if k is None else k)) / np.log2(positions + 2)
+    ordering = np.argsort(-np.where(valid, y_pred, -np.inf), kind="stable")
+    return np.sum(gains[ordering] * discounts) / np.sum(
+        np.sort(gains)[::-1] * discounts
+    )
+
+
+@pytest.mark.parametrize("k", [None, 1, 3])
+def test_lambda_rank_loss_against_swapped_rankings(k):
+    rs = np.random.RandomState(42)
+    y_true = np.array([rs.permutation(6) for _ in range(3)])
+    y_true[2] = [1, -1, 3, 0, -1, 2]
+    y_pred = rs.randn(3, 6)
+    sigma = 1.5
+    # The lambdas are the RankNet gradients of the pairs weighted by the change of the nDCG@k, when swapping the two
+    # objects in the predicted ranking
+    expected_gradient = np.zeros_like(y_pred)
+    for n, (y, s) in enumerate(zip(y_true, y_pred)):
+        for i, j in zip(*np.nonzero((y[:, None] < y[None]) & (y[:, None] >= 0))):
+            swapped = s.copy()
+            swapped[[i, j]] = s[[j, i]]
+            delta = abs(ndcg_at_k(y, swapped, k) - ndcg_at_k(y, s, k))
+            lambda_ij = sigma * delta / (1 + np.exp(sigma * (s[i] - s[j])))
+            expected_gradient[n, i] -= lambda_ij
+            expected_gradient[n, j] += lambda_ij
+    y_pred_tensor = K.constant(y_pred)
+    loss = make_lambda_rank_loss(k=k, sigma=sigma)(K.constant(y_true), y_pred_tensor)
+    gradient = K.gradients(K.sum(loss), [y_pred_tensor])[0]
+    assert_almost_equal(
+        actual=K.eval(gradient), desired=expected_gradient, decimal=decimal
+    )
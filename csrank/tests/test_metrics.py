@@ -1,28 +1,51 @@
 import itertools
 
 from keras import backend as K
+from keras.metrics import categorical_accuracy
 import numpy as np
 from numpy.testing import assert_almost_equal
 import pytest
 from pytest import approx
 
+from csrank import metrics_np
 from csrank.metrics import err
 from csrank.metrics import kendalls_tau_for_scores
 from csrank.metrics import make_ndcg_at_k_loss
 from csrank.metrics import spearman_correlation_for_scores
+from csrank.metrics import topk_categorical_accuracy
 from csrank.metrics import zero_one_accuracy
 from csrank.metrics import zero_one_accuracy_for_scores
 from csrank.metrics import zero_one_rank_loss
 from csrank.metrics import zero_one_rank_loss_for_scores
 from csrank.metrics import zero_one_rank_loss_for_scores_ties
+from csrank.metric_registry import get_metric_np
+from csrank.metrics_np import auc_score
+from csrank.metrics_np import average_precision
+from csrank.metrics_np import categorical_accuracy_np
 from csrank.metrics_np import err_np
+from csrank.metrics_np import f1_measure
+from csrank.metrics_np import f1_measure_for_thresholds
+from csrank.metrics_np import hamming
+from csrank.metrics_np import instance_informedness
+from csrank.metrics_np import instance_informedness_for_thresholds
 from csrank.metrics_np import kendalls_tau_for_scores_np
+from csrank.metrics_np import make_ndcg_at_k_loss_np
+from csrank.metrics_np import MetricAccumulator
+from csrank.metrics_np import precision
+from csrank.metrics_np import recall
 from csrank.metrics_np import spearman_correlation_for_scores_np
 from csrank.metrics_np import spearman_correlation_for_scores_scipy
+from csrank.metrics_np import subset_01_loss
+from csrank.metrics_np import topk_categorical_accuracy_np
 from csrank.metrics_np import zero_one_accuracy_for_scores_np
+from csrank.metrics_np import zero_one_accuracy_np
 from csrank.metrics_np import zero_one_rank_loss_for_scores_np
 from csrank.metrics_np import zero_one_rank_loss_for_scores_ties_np
+from csrank.metrics_np import zero_one_rank_loss_np
 from csrank.numpy_util import ranking_ordering_conversion
+from csrank.numpy_util import scores_to_rankings
+from csrank.tensorflow_util import get_mean_loss
+from csrank.util import convert_to_loss
 
 
 @pytest.fixture(scope="module", params=[(False), (True)], ids=["NoTies", "Ties"])
@@ -89,6 +112,46 @@ def test_zero_one_rank_loss_for_scores(problem_for_scores):
         assert_almost_equal(actual=real_score, desired=np.array([0.1]))
 
 
+def test_zero_one_rank_loss_for_scores_ignores_padding():
+    rs = np.random.RandomState(42)
+    y_true = np.array([rs.permutation(6) for _ in range(2)])
+    y_scores = np.round(rs.rand(2, 6), 1)
+    # The first query set has two padding objects
+    y_true[0] = [1, -1, 3, 0, -1, 2]
+    valid = y_true[0] >= 0
+    expected = np.mean(
+        [
+            zero_one_rank_loss_for_scores_ties_np(
+                y_true[:1, valid], y_scores[:1, valid]
+            ),
+            zero_one_rank_loss_for_scores_ties_np(y_true[1:], y_scores[1:]),
+        ]
+    )
+    score = zero_one_rank_loss_for_scores_ties(y_true, y_scores)
+    assert_almost_equal(actual=K.eval(score), desired=expected)
+
+
+@pytest.mark.parametrize("n_objects", [6, 40])
+def test_zero_one_rank_loss_for_scores_np_matches_tensorflow_on_padding(n_objects):
+    rs = np.random.RandomState(42)
+    y_true = np.array([rs.permutation(n_objects) for _ in range(5)])
+    y_scores = np.round(rs.rand(5, n_objects), 1)
+    # Pad the query sets with a different number of padding objects
+    for i, n_padding in enumerate([0, 1, 2, 3, n_objects // 2]):
+        padding = np.isin(np.arange(n_objects), rs.choice(n_objects, n_padding, False))
+        y_true[i, ~padding] = np.argsort(np.argsort(y_true[i, ~padding]))
+        y_true[i, padding] = -1
+        y_scores[i, padding] = 0.0
+    for metric in [
+        zero_one_rank_loss_for_scores,
+        zero_one_rank_loss_for_scores_ties,
+        kendalls_tau_for_scores,
+    ]:
+        expected = K.eval(metric(y_true, y_scores))
+        actual = get_metric_np(metric)(y_true, y_scores)
+        assert_almost_equal(actual=actual, desired=expected, decimal=5)
+
+
 def test_zero_one_accuracy(problem_for_pred):
     y_true, y_pred, ties = problem_for_pred
 
@@ -263,3 +326,201 @@ def test_err_implementations_equivalent():
     for perm in list(itertools.permutations(elems))[::20]:
         perm = np.reshape(perm, (1, -1))
         assert K.eval(err(y_true, perm)) == approx(err_np(y_true, perm))
+
+
+@pytest.mark.parametrize(
+    "metric_for_thresholds, metric",
+    [
+        (f1_measure_for_thresholds, f1_measure),
+        (instance_informedness_for_thresholds, instance_informedness),
+    ],
+)
+def test_metrics_for_thresholds(metric_for_thresholds, metric):
+    random_state = np.random.RandomState(42)
+    y_true = random_state.randint(2, size=(20, 6))
+    # Coarse scores to include ties within and across instances
+    scores = np.round(random_state.rand(20, 6), 1)
+    thresholds = np.append(0.0, np.unique(scores))
+    expected = [metric(y_true, scores > t) for t in thresholds]
+    actual = metric_for_thresholds(y_true, scores, thresholds)
+    assert_almost_equal(actual=actual, desired=expected)
+
+
+@pytest.mark.parametrize(
+    "metric, for_scores",
+    [
+        (zero_one_rank_loss, False),
+        (zero_one_accuracy, False),
+        (make_ndcg_at_k_loss(k=3), False),
+        (err, False),
+        (zero_one_rank_loss_for_scores, True),
+        (zero_one_rank_loss_for_scores_ties, True),
+        (zero_one_accuracy_for_scores, True),
+        (kendalls_tau_for_scores, True),
+        (convert_to_loss(kendalls_tau_for_scores), True),
+    ],
+)
+def test_metrics_np_match_tensorflow(metric, for_scores):
+    random_state = np.random.RandomState(42)
+    y_true = np.argsort(random_state.rand(10, 6), axis=1)
+    y_pred = random_state.rand(10, 6)
+    if not for_scores:
+        # Keep some instances predicted correctly
+        y_pred[:3] = -y_true[:3]
+        y_pred = np.argsort(np.argsort(-y_pred, axis=1), axis=1)
+    # Like their TensorFlow versions, some metrics return the values of all instances
+    expected = np.mean(K.eval(metric(y_true, y_pred)))
+    actual = np.mean(get_metric_np(metric)(y_true, y_pred))
+    assert_almost_equal(actual=actual, desired=expected, decimal=5)
+
+
+def test_get_mean_loss_without_graph():
+    random_state = np.random.RandomState(42)
+    y_true = {n: np.argsort(random_state.rand(10, n), axis=1) for n in (4, 6)}
+    y_pred = {n: random_state.rand(10, n) for n in (4, 6)}
+    graph = K.get_session().graph
+    n_operations = len(graph.get_operations())
+    loss = get_mean_loss(zero_one_rank_loss_for_scores, y_true, y_pred)
+    assert len(graph.get_operations()) == n_operations
+    expected = np.mean(
+        [zero_one_rank_loss_for_scores_np(y_true[n], y_pred[n]) for n in (4, 6)]
+    )
+    assert loss == approx(expected)
+    with pytest.raises(ValueError):
+        get_metric_np(np.mean)
+    # The NumPy Spearman correlation is undefined for ties, the TensorFlow one is not
+    with pytest.raises(ValueError):
+        get_metric_np(spearman_correlation_for_scores)
+
+
+@pytest.mark.parametrize("n_objects", [2, 5, 13, 40])
+def test_discordant_pairs_sorted(n_objects, monkeypatch):
+    random_state = np.random.RandomState(42)
+    y_true = np.argsort(random_state.rand(20, n_objects), axis=1)
+    # Coarse scores to include ties
+    scores = np.round(random_state.rand(20, n_objects), 1)
+    y_pred = scores_to_rankings(scores)
+    expected = [
+        metric(y_true, y_pred if metric is zero_one_rank_loss_np else scores)
+        for metric in (
+            zero_one_rank_loss_np,
+            zero_one_rank_loss_for_scores_ties_np,
+            kendalls_tau_for_scores_np,
+        )
+    ]
+    monkeypatch.setattr(metrics_np, "SORTED_PAIRS_MIN_OBJECTS", 0)
+    assert_almost_equal(
+        actual=zero_one_rank_loss_np(y_true, y_pred), desired=expected[0]
+    )
+    assert_almost_equal(
+        actual=zero_one_rank_loss_for_scores_ties_np(y_true, scores),
+        desired=expected[1],
+    )
+    assert_almost_equal(
+        actual=kendalls_tau_for_scores_np(y_true, scores), desired=expected[2]
+    )
+
+
+def test_metrics_np_chunked():
+    random_state = np.random.RandomState(42)
+    y_true = np.argsort(random_state.rand(25, 8), axis=1)
+    y_pred = np.argsort(random_state.rand(25, 8), axis=1)
+    scores = np.round(random_state.rand(25, 8), 2)
+    one_hot = np.eye(8)[random_state.randint(8, size=25)]
+    for chunk_size in [1, 7]:
+        assert err_np(y_true, y_pred, chunk_size=chunk_size) == approx(
+            err_np(y_true, y_pred)
+        )
+        assert spearman_correlation_for_scores_np(
+            y_true, scores, chunk_size=chunk_size
+        ) == approx(spearman_correlation_for_scores_np(y_true, scores))
+        topk_acc = topk_categorical_accuracy_np(k=3)
+        topk_acc_chunked = topk_categorical_accuracy_np(k=3, chunk_size=chunk_size)
+        assert topk_acc_chunked(one_hot, scores) == approx(topk_acc(one_hot, scores))
+
+
+@pytest.fixture(scope="module")
+def accumulator_problems():
+    random_state = np.random.RandomState(42)
+    sizes = (3, 5, 8)
+    rankings = {n: np.argsort(random_state.rand(30, n), axis=1) for n in sizes}
+    predicted_rankings = {
+        n: np.argsort(random_state.rand(30, n), axis=1) for n in sizes
+    }
+    # Coarse scores make the Spearman correlation undefined for some instances
+    scores = {n: np.round(random_state.rand(30, n), 1) for n in sizes}
+    # Some choices are all or none of the objects, for which the informedness is undefined
+    choices = {n: random_state.randint(2, size=(30, n)) for n in sizes}
+    predicted_choices = {n: (s > 0.5).astype(int) for n, s in scores.items()}
+    discrete_choices = {n: np.eye(n)[random_state.randint(n, size=30)] for n in sizes}
+    return {
+        "rankings": (rankings, predicted_rankings),
+        "ranking_scores": (rankings, scores),
+        "choices": (choices, predicted_choices),
+        "choice_scores": (choices, scores),
+        "discrete_choice_scores": (discrete_choices, scores),
+    }
+
+
+@pytest.mark.parametrize(
+    "metric, problem",
+    [
+        (zero_one_rank_loss, "rankings"),
+        (zero_one_rank_loss_np, "rankings"),
+        (zero_one_accuracy, "rankings"),
+        (zero_one_accuracy_np, "rankings"),
+        (make_ndcg_at_k_loss(k=3), "rankings"),
+        (make_ndcg_at_k_loss_np(k=3), "rankings"),
+        (err, "rankings"),
+        (err_np, "rankings"),
+        (zero_one_rank_loss_for_scores, "ranking_scores"),
+        (zero_one_rank_loss_for_scores_np, "ranking_scores"),
+        (zero_one_rank_loss_for_scores_ties, "ranking_scores"),
+        (zero_one_rank_loss_for_scores_ties_np, "ranking_scores"),
+        (zero_one_accuracy_for_scores, "ranking_scores"),
+        (zero_one_accuracy_for_scores_np, "ranking_scores"),
+        (kendalls_tau_for_scores, "ranking_scores"),
+        (kendalls_tau_for_scores_np, "ranking_scores"),
+        (spearman_correlation_for_scores_np, "ranking_scores"),
+        (instance_informedness, "choices"),
+        (f1_measure, "choices"),
+        (precision, "choices"),
+        (recall, "choices"),
+        (hamming, "choices"),
+        (subset_01_loss, "choices"),
+        (auc_score, "choice_scores"),
+        (average_precision, "choice_scores"),
+        (categorical_accuracy, "discrete_choice_scores"),
+        (categorical_accuracy_np, "discrete_choice_scores"),
+        (topk_categorical_accuracy(k=2), "discrete_choice_scores"),
+        (topk_categorical_accuracy_np(k=2), "discrete_choice_scores"),
+    ],
+)
+def test_metric_accumulator(accumulator_problems, metric, problem):
+    y_true, y_pred = accumulator_problems[problem]
+    expected = get_mean_loss(metric, y_true, y_pred)
+    accumulator = MetricAccumulator(metric)
+    for start in range(0, 30, 7):
+        chunk = slice(start, start + 7)
+        accumulator.update(
+            {n: y[chunk] for n, y in y_true.items()},
+            {n: y[chunk] for n, y in y_pred.items()},
+        )
+    assert accumulator.result() == approx(expected)
+
+    accumulator.reset()
+    for start in range(0, 30, 4):
+        accumulator.update(y_true[5][start : start + 4], y_pred[5][start : start + 4])
+    assert accumulator.result() == approx(get_mean_loss(metric, y_true[5], y_pred[5]))
+
+
+def test_metric_accumulator_requires_instance_values():
+    with pytest.raises(ValueError):
+        MetricAccumulator(convert_to_loss(kendalls_tau_for_scores))
+    with pytest.raises(ValueError):
+        MetricAccumulator(spearman_correlation_for_scores)
+    accumulator = MetricAccumulator(zero_one_rank_loss_np)
+    accumulator.update(np.array([[0, 1, 2]]), np.array([[0, 1, 2]]))
+    # The loss of rankings with ties depends on the highest rank of all instances
+    with pytest.raises(ValueError):
+        accumulator.update(np.array([[0, 1, 1]]), np.array([[0, 1, 2]]))
@@ -12,11 +12,13 @@ from csrank.constants import FATE_RANKER
 from csrank.constants import FATELINEAR_RANKER
 from csrank.constants import FETA_RANKER
 from csrank.constants import FETALINEAR_RANKER
+from csrank.constants import LAMBDARANK
 from csrank.constants import LISTNET
 from csrank.constants import RANKNET
 from csrank.constants import RANKSVM
 from csrank.metrics_np import zero_one_accuracy_np
 from csrank.metrics_np import zero_one_rank_loss_for_scores_ties_np
+from csrank.numpy_util import PAIR_BATCH_MEMORY
 from csrank.objectranking import *
 from csrank.objectranking.fate_object_ranker import FATEObjectRanker
 
@@ -36,6 +38,11 @@ object_rankers = {
     ),
     RANKNET: (RankNet, {"optimizer": optimizer}, (0.0, 1.0)),
     CMPNET: (CmpNet, {"optimizer": optimizer}, (0.0, 1.0)),
+    LAMBDARANK: (
+        LambdaRank,
+        {"batch_normalization": True, "optimizer": optimizer},
+        (0.0, 1.0),
+    ),
     LISTNET: (ListNet, {"n_top": 3, "optimizer": optimizer}, (0.0, 1.0)),
     ERR: (ExpectedRankRegression, {}, (0.0, 1.0)),
     RANKSVM: (RankSVM, {}, (0.0, 1.0)),
@@ -143,3 +150,72 @@ def test_object_ranker_fixed(trivial_ranking_problem, ranker_name):
     }
     ranker.set_tunable_parameters(**params)
     check_params_tunable(ranker, params, rtol, atol)
+
+
+def test_cmpnet_pair_batch_memory(trivial_ranking_problem):
+    x, y = trivial_ranking_problem
+    # A tiny memory budget evaluates the pairs of one instance at a time
+    ranker = CmpNet(optimizer=optimizer, pair_batch_memory=1)
+    assert ranker.pair_batch_memory == 1
+    ranker.fit(x, y, epochs=1, validation_split=0, verbose=False)
+    scores = ranker.predict_scores(x)
+    ranker.pair_batch_memory = PAIR_BATCH_MEMORY
+    np.testing.assert_allclose(ranker.predict_scores(x), scores, rtol=1e-5)
+
+
+def test_lambda_rank_padded_variadic():
+    random_state = np.random.RandomState(42)
+    X = {n_objects: random_state.randn(20, n_objects, 2) for n_objects in (3, 4, 6)}
+    Y = {
+        n_objects: x.sum(axis=2).argsort(axis=1).argsort(axis=1)
+        for n_objects, x in X.items()
+    }
+    ranker = LambdaRank(optimizer=optimizer, batch_size=8, random_state=42)
+    ranker.fit(X, Y, epochs=2, validation_split=0.1, verbose=False)
+    scores = ranker.predict_scores(X)
+    assert {n_objects: s.shape for n_objects, s in scores.items()} == {
+        n_objects: x.shape[:2] for n_objects, x in X.items()
+    }
+    assert all(np.all(np.isfinite(s)) for s in scores.values())
+    rankings = ranker.predict(X)
+    assert {n_objects: r.shape for n_objects, r in rankings.items()} == {
+        n_objects: y.shape for n_objects, y in Y.items()
+    }
+
+    # The batch statistics of padded query sets would include the padding objects
+    ranker = LambdaRank(batch_normalization=True, optimizer=optimizer)
+    with pytest.raises(ValueError):
+        ranker.fit(X, Y, epochs=1, validation_split=0, verbose=False)
+
+
+@pytest.mark.parametrize("ranker", [FATELinearObjectRanker, FETALinearObjectRanker])
+def test_linear_ranker_constant_graph_size(trivial_ranking_problem, ranker):
+    x, y = trivial_ranking_problem
+
+    def n_operations_after_fit(epochs):
+        with tf.Graph().as_default() as graph:
+            learner = ranker(epochs_drop=2, random_state=42)
+            learner.fit(x, y, epochs=epochs, validation_split=0, verbose=False)
+            return len(graph.get_operations())
+
+    # The learning rate schedule must not add operations to the graph
+    assert n_operations_after_fit(1) == n_operations_after_fit(20)
+
+
+@pytest.mark.parametrize("ranker", [FATELinearObjectRanker, FETALinearObjectRanker])
+@pytest.mark.parametrize("solver", ["sgd", "adam"])
+def test_linear_ranker_numpy_backend(trivial_ranking_problem, ranker, solver):
+    x, y = trivial_ranking_problem
+    learner = ranker(backend="numpy", solver=solver, random_state=42)
+    learner.fit(x, y, epochs=10, validation_split=0, verbose=False)
+    pred_scores = learner.predict_scores(x)
+    assert pred_scores.shape == y.shape
+    assert np.all(np.isfinite(pred_scores))
+
+
+@pytest.mark.parametrize("ranker", [FATELinearObjectRanker, FETALinearObjectRanker])
+def test_linear_ranker_tensorflow_backend_solver(trivial_ranking_problem, ranker):
+    x, y = trivial_ranking_problem
+    learner = ranker(solver="adam", random_state=42)
+    with pytest.raises(ValueError):
+        learner.fit(x, y, epochs=1, validation_split=0, verbose=False)
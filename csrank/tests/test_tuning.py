@@ -1,9 +1,11 @@
+import json
 import os
 
 from keras.metrics import binary_accuracy
 import numpy as np
 import pytest
 
+from csrank.tunable import Tunable
 from csrank.tuning import check_learner_class
 from ..tuning import ParameterOptimizer
 
@@ -13,26 +15,26 @@ n_instances = 500
 n_features = 3
 
 
-@pytest.fixture
-def optimizer():
-    from ..tunable import Tunable
+# Defined at module level, so that worker processes of the parallel evaluation can unpickle it
+class RankerStub(Tunable):
+    def fit(self, X, Y, **kwargs):
+        self.seed = int(np.sum(list(self.__dict__.values())))
 
-    class RankerStub(Tunable):
-        def fit(self, X, Y, **kwargs):
-            self.seed = int(np.sum(list(self.__dict__.values())))
+    def predict(self, X, **kwargs):
+        random_state = np.random.RandomState(self.seed)
+        weight = random_state.rand(n_features, 2)
+        scores = np.dot(X, weight) / np.dot(X, weight).sum(axis=1)[:, None]
+        return scores.argmax(axis=1)
 
-        def predict(self, X, **kwargs):
-            random_state = np.random.RandomState(self.seed)
-            weight = random_state.rand(n_features, 2)
-            scores = np.dot(X, weight) / np.dot(X, weight).sum(axis=1)[:, None]
-            return scores.argmax(axis=1)
+    def set_tunable_parameters(self, **point):
+        self.__dict__.update(point)
 
-        def set_tunable_parameters(self, **point):
-            self.__dict__.update(point)
+    def __call__(self, X, *args, **kwargs):
+        return self.predict(X, **kwargs)
 
-        def __call__(self, X, *args, **kwargs):
-            return self.predict(X, **kwargs)
 
+@pytest.fixture
+def optimizer():
     ranker = RankerStub()
 
     rankers = [RankerStub() for _ in range(2)]
@@ -60,6 +62,11 @@ def trivial_ranking_problem():
     return x, y_true
 
 
+def remove_optimizer_files():
+    os.remove(OPTIMIZER_PATH)
+    os.remove(OPTIMIZER_PATH + ".evaluations.jsonl")
+
+
 def check(value, bound):
     if bound[0] <= value <= bound[1]:
         return True
@@ -70,7 +77,7 @@ def test_parameter_optimizer(trivial_ranking_problem, optimizer):
     x, y = trivial_ranking_problem
     opt, rankers, test_params = optimizer
     opt.fit(x, y, n_iter=10)
-    os.remove(OPTIMIZER_PATH)
+    remove_optimizer_files()
     for point in opt.opt.Xi:
         i = 0
         for param_ranges in test_params.values():
@@ -79,6 +86,181 @@ def test_parameter_optimizer(trivial_ranking_problem, optimizer):
                 i += 1
 
 
+def test_parameter_optimizer_parallel(trivial_ranking_problem, optimizer):
+    x, y = trivial_ranking_problem
+    opt, rankers, test_params = optimizer
+    opt.n_jobs = 2
+    opt.n_points = 3
+    opt.fit(x, y, n_iter=7)
+    remove_optimizer_files()
+    assert len(opt.opt.Xi) == 7
+    assert np.all(np.array(opt.opt.yi) <= 1.0)
+    # The final model is fitted in the main process with the best parameters
+    best_point = opt.opt.Xi[np.argmin(opt.opt.yi)]
+    assert opt.learner.b == best_point[1]
+
+
+def test_parameter_optimizer_successive_halving(trivial_ranking_problem, optimizer):
+    x, y = trivial_ranking_problem
+    opt, rankers, test_params = optimizer
+    opt._fit_params = dict(epochs=9)
+    opt.min_epochs = 1
+    assert opt.epoch_budgets == [1, 3, 9]
+    opt.fit(x, y, n_iter=9)
+    remove_optimizer_files()
+    # 9 points for 1 epoch, the best 3 for 3 epochs and the best one for 9 epochs
+    assert len(opt.opt.Xi) == 9 + 3 + 1
+    assert len({tuple(point) for point in opt.opt.Xi}) == 9
+    losses = np.array(opt.opt.yi)
+    promoted = opt.opt.Xi[9:12]
+    assert set(map(tuple, promoted)) == {
+        tuple(opt.opt.Xi[i]) for i in np.argsort(losses[:9], kind="stable")[:3]
+    }
+    assert opt.learner.b == opt.opt.Xi[-1][1]
+
+
+def test_parameter_optimizer_resume_successive_halving(
+    trivial_ranking_problem, optimizer, monkeypatch
+):
+    x, y = trivial_ranking_problem
+    opt, rankers, test_params = optimizer
+    fit = RankerStub.fit
+
+    def fit_with_epochs(self, X, Y, epochs=1, **kwargs):
+        # The validation loss depends on the epoch budget
+        fit(self, X, Y, **kwargs)
+        self.seed += epochs
+
+    monkeypatch.setattr(RankerStub, "fit", fit_with_epochs)
+    opt._fit_params = dict(epochs=9)
+    opt.min_epochs = 1
+    opt.fit(x, y, n_iter=9)
+    os.remove(OPTIMIZER_PATH)
+    full_budget_point = list(opt.opt.Xi[-1])
+    # All 9 candidates were evaluated, only the final model is fitted with the point of the full budget
+    opt.fit(x, y, n_iter=9)
+    assert len(opt.opt.Xi) == 9 + 3 + 1
+    assert [point for _, point in opt._full_budget_results] == [full_budget_point]
+    assert opt.learner.b == full_budget_point[1]
+    opt.fit(x, y, n_iter=18)
+    remove_optimizer_files()
+    assert len(opt.opt.Xi) == 2 * (9 + 3 + 1)
+    assert len({tuple(point) for point in opt.opt.Xi}) == 18
+
+
+def test_parameter_optimizer_resume(trivial_ranking_problem, optimizer):
+    x, y = trivial_ranking_problem
+    opt, rankers, test_params = optimizer
+    opt.fit(x, y, n_iter=4)
+    # Preempted before the optimizer was pickled, the evaluation log remains
+    os.remove(OPTIMIZER_PATH)
+    points = [list(point) for point in opt.opt.Xi]
+    losses = list(opt.opt.yi)
+    opt.fit(x, y, n_iter=6)
+    remove_optimizer_files()
+    assert len(opt.opt.Xi) == 6
+    assert [list(point) for point in opt.opt.Xi[:4]] == points
+    np.testing.assert_allclose(opt.opt.yi[:4], losses)
+
+
+def test_parameter_optimizer_resume_truncated_log(trivial_ranking_problem, optimizer):
+    x, y = trivial_ranking_problem
+    opt, rankers, test_params = optimizer
+    opt.fit(x, y, n_iter=4)
+    os.remove(OPTIMIZER_PATH)
+    points = [list(point) for point in opt.opt.Xi]
+    # Killed while writing the record of the fifth point
+    with open(OPTIMIZER_PATH + ".evaluations.jsonl", "a") as log:
+        log.write('{"point": [2.0, 5.0, 8.0, 11.0], "epochs": null, "losses": [0.')
+    opt.fit(x, y, n_iter=6)
+    with open(OPTIMIZER_PATH + ".evaluations.jsonl") as log:
+        records = [json.loads(line) for line in log]
+    remove_optimizer_files()
+    assert len(opt.opt.Xi) == 6
+    assert [list(point) for point in opt.opt.Xi[:4]] == points
+    assert [record["point"] for record in records] == [
+        list(point) for point in opt.opt.Xi
+    ]
+
+
+def test_parameter_optimizer_resume_skipped_line(trivial_ranking_problem, optimizer):
+    x, y = trivial_ranking_problem
+    opt, rankers, test_params = optimizer
+    opt.fit(x, y, n_iter=4)
+    with open(OPTIMIZER_PATH, "rb") as pickled:
+        pickled_optimizer = pickled.read()
+    opt.fit(x, y, n_iter=5)
+    points = [list(point) for point in opt.opt.Xi]
+    # Preempted after the fifth evaluation was logged, the optimizer was pickled after the fourth one
+    with open(OPTIMIZER_PATH, "wb") as pickled:
+        pickled.write(pickled_optimizer)
+    # The second record is skipped, as its number of losses does not match the splits
+    with open(OPTIMIZER_PATH + ".evaluations.jsonl") as log:
+        records = [json.loads(line) for line in log]
+    records[1]["losses"] = records[1]["losses"][:1]
+    with open(OPTIMIZER_PATH + ".evaluations.jsonl", "w") as log:
+        log.writelines(json.dumps(record) + "\n" for record in records)
+    opt.fit(x, y, n_iter=6)
+    remove_optimizer_files()
+    assert len(opt.opt.Xi) == 6
+    assert [list(point) for point in opt.opt.Xi[:5]] == points
+
+
+def test_evaluation_cache_other_data(trivial_ranking_problem, optimizer):
+    x, y = trivial_ranking_problem
+    opt, rankers, test_params = optimizer
+    opt.random_state = 42
+    fit_ranker = opt._fit_ranker
+    fitted_points = []
+
+    def counting_fit_ranker(*args, **kwargs):
+        fitted_points.append(args[-1])
+        return fit_ranker(*args, **kwargs)
+
+    opt._fit_ranker = counting_fit_ranker
+    opt.fit(x, y, n_iter=2)
+    n_fitted = len(fitted_points)
+    losses = list(opt.opt.yi)
+    os.remove(OPTIMIZER_PATH)
+    # The same dataset and splits are taken from the cache
+    opt.fit(x, y, n_iter=2)
+    assert len(fitted_points) == n_fitted
+    np.testing.assert_allclose(opt.opt.yi, losses)
+    remove_optimizer_files()
+    # The same points are evaluated again on another dataset
+    opt.fit(x, 1 - y, n_iter=2)
+    remove_optimizer_files()
+    assert len(fitted_points) == 2 * n_fitted
+
+
+def test_evaluation_cache(trivial_ranking_problem, optimizer):
+    x, y = trivial_ranking_problem
+    opt, rankers, test_params = optimizer
+    fit_ranker = opt._fit_ranker
+    fitted_points = []
+
+    def counting_fit_ranker(*args, **kwargs):
+        fitted_points.append(args[-1])
+        return fit_ranker(*args, **kwargs)
+
+    opt._fit_ranker = counting_fit_ranker
+    splits = [
+        (np.arange(400), np.arange(400, 500)),
+        (np.arange(100), np.arange(100, 500)),
+    ]
+    point = [2.0, 5.0, 8.0, 11.0]
+    losses, _ = opt._evaluate_points(x, y, [point, np.array(point)], splits)
+    assert fitted_points == [point, point]
+    assert losses.shape == (2, 2)
+    np.testing.assert_array_equal(losses[0], losses[1])
+    cached_losses, _ = opt._evaluate_points(x, y, [point], splits)
+    assert len(fitted_points) == 2
+    np.testing.assert_array_equal(cached_losses[0], losses[0])
+    # Another epoch budget is evaluated again
+    opt._evaluate_points(x, y, [point], splits, epochs=3)
+    assert len(fitted_points) == 4
+
+
 def test_set_parameters(optimizer):
     opt, rankers, test_params = optimizer
     point = list(range(4))
@@ -1,9 +1,26 @@
 from keras import backend as K
 import numpy as np
+import pandas as pd
 import pytest
+from scipy.stats import rankdata
 import tensorflow as tf
 
 from csrank import SyntheticIterator
+from csrank.dataset_reader.objectranking.util import generate_complete_pairwise_dataset
+from csrank.dataset_reader.objectranking.util import generate_pairwise_dataset_batches
+from csrank.dataset_reader.dataset_store import BucketStore
+from csrank.dataset_reader.dataset_store import concatenate_buckets
+from csrank.dataset_reader.dataset_store import write_buckets
+from csrank.dataset_reader.tag_genome_reader import weighted_cosine_similarity
+from csrank.dataset_reader.tag_genome_reader import weighted_cosine_similarity_matrix
+from csrank.dataset_reader.util import CondensedSimilarityMatrix
+from csrank.dataset_reader.util import get_key_for_indices
+from csrank.dataset_reader.util import get_similarity_matrix
+from csrank.dataset_reader.util import read_letor_files
+from csrank.numpy_util import pairwise_borda_scores
+from csrank.numpy_util import scores_to_rankings
+from csrank.sequences import make_padded_sequences
+from csrank.sequences import make_pairwise_sequences
 from csrank.tensorflow_util import tensorify
 from csrank.tuning import check_learner_class
 
@@ -38,3 +55,223 @@ def test_check_ranker_class():
     ranker = MockClass()
     with pytest.raises(AttributeError):
         check_learner_class(ranker)
+
+
+def test_pairwise_borda_scores():
+    def predict_pair(a, b):
+        u = 1.0 / (1.0 + np.exp(b.sum(axis=1) - a.sum(axis=1)))
+        return np.stack([u, 1.0 - u], axis=1)
+
+    rs = np.random.RandomState(42)
+    X = rs.randn(7, 4, 3)
+    expected = np.empty((7, 4))
+    for n in range(7):
+        for i in range(4):
+            others = [j for j in range(4) if j != i]
+            u = predict_pair(X[n, [i] * 3], X[n, others])[:, 0]
+            expected[n, i] = u.mean()
+    # A tiny memory budget forces one instance per chunk
+    for max_memory in [1, X.nbytes * 100]:
+        scores = pairwise_borda_scores(predict_pair, X, max_memory=max_memory)
+        assert np.allclose(scores, expected)
+
+
+@pytest.mark.parametrize("decimals", [0, 1, 8])
+def test_scores_to_rankings(decimals):
+    rs = np.random.RandomState(42)
+    # Fewer decimals lead to more ties
+    scores = np.round(rs.rand(50, 12), decimals)
+    expected = np.array([len(s) - rankdata(s) for s in scores])
+    rankings = scores_to_rankings(scores)
+    assert np.array_equal(rankings, expected)
+
+
+def test_generate_complete_pairwise_dataset():
+    X = np.arange(12.0).reshape(2, 3, 2)
+    Y = np.array([[2, 0, 1], [0, 1, 2]])
+    x_train, x1, x2, y_double, y_single = generate_complete_pairwise_dataset(X, Y)
+    # The objects of the first instance ordered by preference are 1, 2, 0
+    assert np.array_equal(x1[:3], X[0, [2, 1, 0]])
+    assert np.array_equal(x2[:3], X[0, [1, 0, 2]])
+    assert np.array_equal(y_single, [0, 1, 0, 0, 1, 0])
+    assert np.array_equal(y_double[:, 0], y_single)
+    assert np.array_equal(x_train, x1 - x2)
+
+    batches = list(generate_pairwise_dataset_batches(X, Y, max_memory=1))
+    assert len(batches) == 2
+    for i, expected in enumerate([x_train, x1, x2, y_double, y_single]):
+        assert np.array_equal(np.concatenate([b[i] for b in batches]), expected)
+
+    x_train_only = generate_complete_pairwise_dataset(X, Y, pairs=False)
+    assert x_train_only[1] is None and x_train_only[2] is None
+    assert np.array_equal(x_train_only[0], x_train)
+
+
+@pytest.mark.parametrize("sampling", ["uniform", "rank_distance"])
+def test_pairwise_ranking_sequence(sampling):
+    random_state = np.random.RandomState(42)
+    n_instances, n_objects, n_features = 20, 5, 3
+    X = random_state.randn(n_instances, n_objects, n_features)
+    Y = np.array([random_state.permutation(n_objects) for _ in range(n_instances)])
+    train, validation = make_pairwise_sequences(
+        X,
+        Y,
+        validation_split=0.25,
+        random_state=random_state,
+        batch_size=16,
+        sampling=sampling,
+        output="double",
+    )
+    assert train.n_pairs == 15 * 10
+    assert validation.n_pairs == 5 * 10
+    assert len(train) == 10
+    (x1, x2), y = train[len(train) - 1]
+    assert x1.shape == x2.shape == (6, n_features)
+    assert y.shape == (6, 2)
+
+    (x1, x2), y = train[0]
+    (x1_again, _), _ = train[0]
+    assert np.array_equal(x1, x1_again)
+    for a, b, label in zip(x1, x2, y[:, 0]):
+        instance, object_a = np.argwhere(np.all(train.X == a, axis=2))[0]
+        object_b = np.argwhere(np.all(train.X[instance] == b, axis=1))[0, 0]
+        assert object_a != object_b
+        rankings = np.argsort(train.orderings[instance])
+        assert (rankings[object_a] < rankings[object_b]) == (label == 1)
+
+
+def test_padded_batch_sequence():
+    random_state = np.random.RandomState(42)
+    X = {
+        n_objects: random_state.randn(n_instances, n_objects, 2)
+        for n_objects, n_instances in [(3, 20), (4, 6), (7, 10)]
+    }
+    Y = {
+        n_objects: np.array([random_state.permutation(n_objects) for _ in x])
+        for n_objects, x in X.items()
+    }
+    train, validation = make_padded_sequences(
+        X, Y, validation_split=0.0, random_state=random_state, batch_size=8
+    )
+    assert validation is None
+    assert len(train) == 5
+    n_padding = 0
+    for epoch in range(2):
+        instances = []
+        for i in range(len(train)):
+            (x, mask), y = train[i]
+            assert x.shape[:2] == mask.shape == y.shape
+            assert np.array_equal(mask == 1, y >= 0)
+            # Each batch is only padded to its largest query set
+            assert np.any(mask[:, -1])
+            instances.extend(train.batches[i])
+            n_padding += np.sum(mask == 0)
+        assert sorted(instances) == list(range(36))
+        train.on_epoch_end()
+    # Sorting by size pads at most one batch per boundary between two sizes
+    assert n_padding <= 2 * 2 * 8 * (7 - 3)
+
+
+def test_condensed_similarity_matrix_from_csv(tmpdir):
+    random_state = np.random.RandomState(42)
+    n_objects = 6
+    similarities = random_state.rand(n_objects, n_objects)
+    similarities = (similarities + similarities.T) / 2
+    np.fill_diagonal(similarities, 1.0)
+    keys, values = [], []
+    for i in range(n_objects):
+        for j in range(i, n_objects):
+            keys.append(get_key_for_indices(i, j))
+            values.append(similarities[i, j])
+    pd.DataFrame({"col_major_index": keys, "similarity": values}).to_csv(
+        str(tmpdir.join("similarity_matrix.csv")), index=False
+    )
+
+    file_path = str(tmpdir.join("similarity_matrix.npy"))
+    matrix = get_similarity_matrix(file_path)
+    assert tmpdir.join("similarity_matrix.npy").check()
+    assert isinstance(matrix.condensed, np.memmap)
+    indices = np.arange(n_objects)
+    np.testing.assert_allclose(
+        matrix[indices[:, None], indices], similarities, rtol=1e-6
+    )
+    expected = CondensedSimilarityMatrix.from_pairs(
+        lambda i, j: similarities[i, j], n_objects
+    )
+    np.testing.assert_array_equal(matrix.condensed, expected.condensed)
+
+
+@pytest.mark.parametrize("max_memory", [8 * 17 * 3, 2 ** 20])
+def test_weighted_cosine_similarity_matrix(max_memory):
+    random_state = np.random.RandomState(42)
+    features = random_state.rand(17, 4)
+    weights = random_state.rand(4)
+    matrix = weighted_cosine_similarity_matrix(features, weights, max_memory=max_memory)
+    similarity = weighted_cosine_similarity(weights)
+    expected = CondensedSimilarityMatrix.from_pairs(
+        lambda i, j: similarity(features[i], features[j]), 17
+    )
+    np.testing.assert_allclose(matrix.condensed, expected.condensed, rtol=1e-6)
+
+
+@pytest.mark.parametrize("block_size", [64, 2 ** 20])
+def test_read_letor_files(tmpdir, block_size):
+    random_state = np.random.RandomState(42)
+    query_ids = random_state.choice([10, 42, 7], size=30)
+    features = np.round(random_state.rand(30, 5), 6)
+    relevance = random_state.randint(3, size=30)
+    files = []
+    for name, comment in [("S1.txt", " #docid = GX0-01:2 inc = 1"), ("S2.txt", "")]:
+        lines = [
+            "{} qid:{} ".format(r, qid)
+            + " ".join("{}:{:f}".format(i + 1, v) for i, v in enumerate(x))
+            + comment
+            + "\n"
+            for r, qid, x in zip(relevance, query_ids, features)
+        ]
+        tmpdir.join(name).write("".join(lines))
+        files.append(str(tmpdir.join(name)))
+
+    datasets = read_letor_files(files, block_size=block_size)
+    assert set(datasets.keys()) == {"S1", "S2"}
+    for dataset in datasets.values():
+        # The queries keep the order of their first occurrence
+        assert list(dataset.keys()) == list(pd.unique(query_ids))
+        for qid, documents in dataset.items():
+            assert documents.dtype == np.float32
+            expected = np.column_stack(
+                (features[query_ids == qid], relevance[query_ids == qid])
+            )
+            np.testing.assert_allclose(documents, expected, rtol=1e-6)
+
+
+@pytest.mark.parametrize("compression", ["lzf", "gzip", None])
+def test_bucket_store(tmpdir, compression):
+    random_state = np.random.RandomState(42)
+    folds = [
+        {n: (random_state.rand(7 * n, n, 4), random_state.rand(7 * n, n)) for n in ns}
+        for ns in [(3, 5), (5, 6)]
+    ]
+    file_paths = [str(tmpdir.join("S{}.h5".format(i))) for i in range(2)]
+    for file_path, buckets in zip(file_paths, folds):
+        write_buckets(
+            file_path,
+            buckets,
+            names=("X", "Y"),
+            compression=compression,
+            chunk_bytes=3 * 5 * 4 * 8,
+        )
+
+    stores = [BucketStore(file_path) for file_path in file_paths]
+    np.testing.assert_array_equal(stores[1].lengths, [5, 6])
+    view = stores[0].view("X", 5, columns=np.array([0, 2]))
+    assert view.shape == (35, 5, 2)
+    # Chunks contain complete instances
+    assert view.dataset.chunks == (3, 5, 4)
+    np.testing.assert_array_equal(view[4:9], folds[0][5][0][4:9, :, [0, 2]])
+
+    merged = concatenate_buckets([store.view("X", 5) for store in stores])
+    expected = np.concatenate([folds[0][5][0], folds[1][5][0]])
+    np.testing.assert_array_equal(merged, expected)
+    for store in stores:
+        store.close()
@@ -1,8 +1,18 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 import copy
 from datetime import datetime
+import hashlib
+import json
 import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
 import traceback
 
+import joblib
+from joblib import effective_n_jobs
 from keras import backend as K
 from keras.metrics import categorical_accuracy
 import numpy as np
@@ -86,6 +96,10 @@ class ParameterOptimizer(Learner):
         tuning_callbacks=None,
         validation_loss=None,
         learning_problem=OBJECT_RANKING,
+        n_jobs=None,
+        n_points=1,
+        min_epochs=None,
+        reduction_factor=3,
         **kwd,
     ):
         """
@@ -95,7 +109,11 @@ class ParameterOptimizer(Learner):
         learner : object
             The ranker object for which the hyper parameters needs to optimized.
         optimizer_path : string
-            The path where the complete optimizer pickle object can be stored.
+            The path where the complete optimizer pickle object can be stored. The losses of all evaluations are
+            appended to the log ``optimizer_path + ".evaluations.jsonl"`` after every iteration, the optimizer is
+            pickled once at the end of :meth:`fit`. A restarted optimization tells the logged evaluations which are
+            missing in the pickled optimizer to it again and does not retrain the learner for points and epoch
+            budgets which are already logged.
         tunable_parameter_ranges : dict
             Dictionary with keys as the object needs to be tuned. Values is the dictionary of tunable parameters with ranges in which they should be tuned.
         fit_params : dict
@@ -108,6 +126,23 @@ class ParameterOptimizer(Learner):
             Differentiable loss function for the ranker
         learning_problem : string
             The learning problem under which the ranker comes
+        n_jobs : int or None
+            Number of worker processes which train the learner on the cross validation splits and candidate points
+            concurrently. Every worker holds its own TensorFlow session limited to its share of the CPU cores. None
+            or 1 trains in the current process, -1 uses all CPU cores (see :func:`joblib.effective_n_jobs`). The
+            learner, the tunable objects and the validation loss need to be picklable for ``n_jobs > 1``.
+        n_points : int
+            Number of candidate points requested from the optimizer (``opt.ask(n_points=n_points)``) and evaluated
+            in one iteration
+        min_epochs : int or None
+            If given, the candidate points are scheduled by successive halving: All points of an iteration are
+            trained for ``min_epochs`` epochs, the best ``1 / reduction_factor`` of them are promoted to
+            ``reduction_factor`` times as many epochs and so on up to the epochs in ``fit_params``. The validation
+            losses of all budgets are told to the optimizer. An iteration evaluates at least
+            ``reduction_factor ** (n_budgets - 1)`` points. The learner needs to accept ``epochs`` in ``fit``.
+        reduction_factor : int
+            Factor by which the number of points is reduced and the number of epochs is increased from one budget
+            of the successive halving to the next
         **kwd :
             Keyword arguments for the hidden units
         """
@@ -115,6 +150,7 @@ class ParameterOptimizer(Learner):
 
         create_dir_recursively(optimizer_path, True)
         self.optimizer_path = optimizer_path
+        self.evaluation_log_path = optimizer_path + ".evaluations.jsonl"
 
         self._tunable_parameter_ranges = tunable_parameter_ranges
 
@@ -161,8 +197,17 @@ class ParameterOptimizer(Learner):
             self._fit_params = fit_params
 
         self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.n_points = n_points
+        self.min_epochs = min_epochs
+        self.reduction_factor = reduction_factor
         self.model = None
         self.opt = None
+        self._evaluation_cache = dict()
+        # Content hash of the dataset and the cross validation splits of the current fit, part of the cache keys
+        self._data_fingerprint = None
+        # Mean validation losses and points of the evaluations with the complete fit_params
+        self._full_budget_results = []
 
     def _callbacks_set_optimizer(self, opt):
         for cb in self.tuning_callbacks:
@@ -199,35 +244,190 @@ class ParameterOptimizer(Learner):
         return result
 
     def _set_new_parameters(self, point):
-        i = 0
-        # We are iterating over all elements of the dictionary in order.
-        # This works because dicts are order-preserving.
-        for obj, ranges in self._tunable_parameter_ranges.items():
-            param_dict = dict()
-            for j, p in enumerate(ranges.keys()):
-                param_dict[p] = point[i + j]
-            self.logger.info(
-                "obj: {}, current parameters {}".format(type(obj).__name__, param_dict)
+        _set_tunable_parameters(self._tunable_parameter_ranges, point, self.logger)
+
+    def _fit_ranker(self, xtrain, ytrain, xtest, ytest, next_point, fit_params=None):
+        self._set_new_parameters(next_point)
+        if fit_params is None:
+            fit_params = self._fit_params
+        return _fit_and_evaluate(
+            self.learner,
+            fit_params,
+            self.validation_loss,
+            xtrain,
+            ytrain,
+            xtest,
+            ytest,
+            self.logger,
+        )
+
+    def _evaluate_points(self, X, Y, points, splits, executor=None, epochs=None):
+        """
+            Validation losses and fitting durations (n_points, n_splits) of the points on all splits. Points which
+            were already evaluated with the same epochs on the same dataset and splits are taken from the cache
+            instead of training the learner.
+        """
+        fit_params = self._fit_params
+        if epochs is not None:
+            fit_params = dict(self._fit_params, epochs=epochs)
+        keys = [
+            _evaluation_key(point, epochs, self._data_fingerprint) for point in points
+        ]
+        new_points = dict()
+        for key, point in zip(keys, points):
+            if key in self._evaluation_cache:
+                self.logger.info("Using the cached evaluation of {}".format(point))
+            else:
+                new_points.setdefault(key, point)
+        if executor is None:
+            results = [
+                [
+                    self._fit_ranker(
+                        *_split_instances(X, Y, split), point, fit_params=fit_params
+                    )
+                    for split in splits
+                ]
+                for point in new_points.values()
+            ]
+        else:
+            futures = [
+                [
+                    executor.submit(
+                        _evaluate_in_worker,
+                        self._tunable_parameter_ranges,
+                        self.learner,
+                        fit_params,
+                        self.validation_loss,
+                        point,
+                        split,
+                    )
+                    for split in splits
+                ]
+                for point in new_points.values()
+            ]
+            results = [[future.result() for future in row] for row in futures]
+        for key, result in zip(new_points.keys(), results):
+            result = np.array(result, dtype=float)
+            self._evaluation_cache[key] = (result[:, 0], result[:, 1])
+        results = np.array([self._evaluation_cache[key] for key in keys])
+        return results[:, 0], results[:, 1]
+
+    def _tell(self, points, epochs, results, running_times):
+        """Append the evaluations to the evaluation log and tell the mean losses to the optimizer"""
+        mean_results = np.mean(results, axis=1)
+        mean_fitting_durations = np.mean(running_times, axis=1)
+        records = [
+            dict(
+                point=_to_builtin(point),
+                epochs=epochs,
+                data=self._data_fingerprint,
+                losses=[float(loss) for loss in losses],
+                times=[float(time_taken) for time_taken in times],
+            )
+            for point, losses, times in zip(points, results, running_times)
+        ]
+        with open(self.evaluation_log_path, "a") as log:
+            log.writelines(json.dumps(record) + "\n" for record in records)
+            # The records need to be on the disk before the optimizer can be preempted
+            log.flush()
+            os.fsync(log.fileno())
+        if "ps" in self.opt.acq_func:
+            self.opt.tell(
+                points,
+                [
+                    [float(result), float(duration)]
+                    for result, duration in zip(mean_results, mean_fitting_durations)
+                ],
             )
-            obj.set_tunable_parameters(**param_dict)
-            i += len(ranges)
+        else:
+            self.opt.tell(points, [float(r) for r in mean_results])
 
-    def _fit_ranker(self, xtrain, ytrain, xtest, ytest, next_point):
+    def _replay_evaluations(self, n_splits=None):
+        """
+            Fill the cache with the evaluations of the evaluation log on the current dataset and splits and tell the
+            evaluations which are missing in the optimizer, i.e. which were logged after it was pickled. Returns the
+            logged evaluations as (point, epochs, losses, times).
+        """
+        if not os.path.isfile(self.evaluation_log_path):
+            return []
+        _drop_incomplete_line(self.evaluation_log_path)
+        evaluations = _read_evaluation_log(
+            self.evaluation_log_path, n_splits=n_splits, logger=self.logger
+        )
+        # The evaluations of a point are told in the order in which they were logged, so the first ones of every
+        # point are the ones which are already in the optimizer. Skipped lines do not shift the others.
+        n_told = Counter(_evaluation_key(point, None) for point in self.opt.Xi)
+        missing = []
+        for point, epochs, losses, times, data in evaluations:
+            if data == self._data_fingerprint:
+                key = _evaluation_key(point, epochs, data)
+                self._evaluation_cache[key] = (losses, times)
+            point_key = _evaluation_key(point, None)
+            if n_told[point_key] > 0:
+                n_told[point_key] -= 1
+            else:
+                missing.append((point, losses, times))
+        evaluations = [evaluation[:4] for evaluation in evaluations]
+        if len(missing) == 0:
+            return evaluations
+        self.logger.info(
+            "Telling {} evaluations from {} to the optimizer".format(
+                len(missing), self.evaluation_log_path
+            )
+        )
+        points = [point for point, _, _ in missing]
+        if "ps" in self.opt.acq_func:
+            self.opt.tell(
+                points,
+                [[np.mean(losses), np.mean(times)] for _, losses, times in missing],
+            )
+        else:
+            self.opt.tell(points, [np.mean(losses) for _, losses, _ in missing])
+        return evaluations
+
+    @property
+    def epoch_budgets(self):
+        """Numbers of epochs of the successive halving, ``[None]`` (the ``fit_params``) if it is disabled"""
+        if self.min_epochs is None:
+            return [None]
+        if "epochs" not in self._fit_params:
+            raise ValueError(
+                "Successive halving needs the maximum number of epochs in fit_params"
+            )
+        max_epochs = self._fit_params["epochs"]
+        budgets = []
+        epochs = self.min_epochs
+        while epochs < max_epochs:
+            budgets.append(int(epochs))
+            epochs *= self.reduction_factor
+        budgets.append(max_epochs)
+        return budgets
+
+    def _evaluate_budgets(self, X, Y, points, splits, executor, time_left):
+        """
+            Evaluate the points with increasing epoch budgets, only the best points of a budget are promoted to the
+            next one. Yields the evaluated points, the budget, the validation losses and the fitting durations.
+        """
         start = datetime.now()
-        self._set_new_parameters(next_point)
-        try:
-            self.learner.fit(xtrain, ytrain, **self._fit_params)
-            ypred = self.learner(xtest)
-            loss = get_mean_loss(self.validation_loss, ytest, ypred)
-            time_taken = duration_till_now(start)
-        except Exception:
-            self.logger.error(traceback.format_exc())
-            self.logger.info(
-                "For current parameter error occurred so taking loss as maximum value"
+        for i, epochs in enumerate(self.epoch_budgets):
+            if i > 0 and duration_till_now(start) >= time_left:
+                self.logger.info(
+                    "Successive halving stops before {} epochs, due to time deficiency".format(
+                        epochs
+                    )
+                )
+                return
+            if epochs is not None:
+                self.logger.info(
+                    "Evaluating {} points for {} epochs".format(len(points), epochs)
+                )
+            results, running_times = self._evaluate_points(
+                X, Y, points, splits, executor, epochs
             )
-            loss = 1.00
-            time_taken = duration_till_now(start)
-        return loss, time_taken
+            yield points, epochs, results, running_times
+            n_promoted = max(1, len(points) // self.reduction_factor)
+            promoted = np.argsort(np.mean(results, axis=1), kind="stable")[:n_promoted]
+            points = [points[j] for j in promoted]
 
     def fit(
         self,
@@ -242,26 +442,6 @@ class ParameterOptimizer(Learner):
         start = datetime.now()
         self.random_state_ = check_random_state(self.random_state)
 
-        def splitter(itr):
-            for train_idx, test_idx in itr:
-                yield X[train_idx], Y[train_idx], X[test_idx], Y[test_idx]
-
-        def splitter_dict(itr_dict):
-            n_splits = len(list(itr_dict.values())[0])
-            for i in range(n_splits):
-                X_train = dict()
-                Y_train = dict()
-                X_test = dict()
-                Y_test = dict()
-                for n_obj, itr in itr_dict.items():
-                    train_idx = itr[i][0]
-                    test_idx = itr[i][1]
-                    X_train[n_obj] = np.copy(X[n_obj][train_idx])
-                    X_test[n_obj] = np.copy(X[n_obj][test_idx])
-                    Y_train[n_obj] = np.copy(Y[n_obj][train_idx])
-                    Y_test[n_obj] = np.copy(Y[n_obj][test_idx])
-                yield X_train, Y_train, X_test, Y_test
-
         if cv_iter is None:
             cv_iter = ShuffleSplit(
                 n_splits=3, test_size=0.1, random_state=self.random_state_,
@@ -273,8 +453,14 @@ class ParameterOptimizer(Learner):
                     splits[n_obj] = [([0], [0]) for i in range(cv_iter.n_splits)]
                 else:
                     splits[n_obj] = list(cv_iter.split(arr))
+            splits = [
+                {n_obj: itr[i] for n_obj, itr in splits.items()}
+                for i in range(cv_iter.n_splits)
+            ]
         else:
             splits = list(cv_iter.split(X))
+        # Cached evaluations of another dataset or other splits are not reused
+        self._data_fingerprint = _data_fingerprint(X, Y, splits)
         # Pre-compute splits for reuse
         # Here we fix a random seed for all simulations to correlate the random
         # streams:
@@ -285,7 +471,9 @@ class ParameterOptimizer(Learner):
         self.logger.debug("Random seed for the optimizer: {}".format(opt_seed))
         gp_seed = self.random_state_.randint(2 ** 32, dtype="uint32")
         self.logger.debug("Random seed for the GP surrogate: {}".format(gp_seed))
-        n_iter = self.set_optimizer(n_iter, opt_seed, acq_func, gp_seed, **kwargs)
+        n_iter = self.set_optimizer(
+            n_iter, opt_seed, acq_func, gp_seed, n_splits=len(splits), **kwargs
+        )
 
         self._callbacks_set_optimizer(self.opt)
         self._callbacks_on_optimization_begin()
@@ -298,8 +486,34 @@ class ParameterOptimizer(Learner):
             )
         )
 
+        executor = None
+        data_folder = None
+        n_jobs = effective_n_jobs(self.n_jobs)
+        if n_jobs > 1:
+            n_threads = max(1, multiprocessing.cpu_count() // n_jobs)
+            # The workers share the dataset as memory-mapped arrays
+            data_folder = tempfile.mkdtemp(prefix="csrank_tuning_")
+            data_path = os.path.join(data_folder, "dataset.joblib")
+            joblib.dump((X, Y), data_path)
+            executor = ProcessPoolExecutor(
+                max_workers=n_jobs,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_initialize_worker,
+                initargs=(data_path, n_threads),
+            )
+            self.logger.info(
+                "Evaluating in {} processes with {} threads each".format(
+                    n_jobs, n_threads
+                )
+            )
+
+        budgets = self.epoch_budgets
+        n_points = max(self.n_points, self.reduction_factor ** (len(budgets) - 1))
+        # Validation losses and points evaluated with the complete fit_params
+        full_budget_results = list(self._full_budget_results)
+
         try:
-            for t in range(n_iter):
+            for t in range(int(np.ceil(n_iter / n_points))):
                 if total_duration <= 0:
                     break
                 start = datetime.now()
@@ -307,54 +521,44 @@ class ParameterOptimizer(Learner):
                 self.logger.info("Starting optimization iteration: {}".format(t))
                 if t > 0:
                     self.log_best_params()
-                next_point = self.opt.ask()
-                self.logger.info("Next parameters:\n{}".format(next_point))
-                results = []
-                running_times = []
-                if isinstance(X, dict):
-                    for X_train, Y_train, X_test, Y_test in splitter_dict(splits):
-                        result, time_taken = self._fit_ranker(
-                            X_train, Y_train, X_test, Y_test, next_point
-                        )
-                        running_times.append(time_taken)
-                        results.append(result)
+                n_next = min(n_points, n_iter - t * n_points)
+                if n_next == 1:
+                    next_points = [self.opt.ask()]
                 else:
-                    for X_train, Y_train, X_test, Y_test in splitter(splits):
-                        result, time_taken = self._fit_ranker(
-                            X_train, Y_train, X_test, Y_test, next_point
+                    next_points = self.opt.ask(n_points=n_next)
+                self.logger.info("Next parameters:\n{}".format(next_points))
+                for points, epochs, results, running_times in self._evaluate_budgets(
+                    X, Y, next_points, splits, executor, total_duration
+                ):
+                    mean_results = np.mean(results, axis=1)
+                    for next_point, mean_result, fitting_duration in zip(
+                        points, mean_results, np.sum(running_times, axis=1)
+                    ):
+                        self.logger.info(
+                            "Validation error for the parameters {} is {:.4f}".format(
+                                next_point, mean_result
+                            )
                         )
-                        running_times.append(time_taken)
-                        results.append(result)
-
-                results = np.array(results)
-                running_times = np.array(running_times)
-                mean_result = np.mean(results)
-                mean_fitting_duration = np.mean(running_times)
-
-                # Storing the maximum time to run the splitting model and adding the time for out of sample evaluation
-                if max_fit_duration < np.sum(running_times):
-                    max_fit_duration = np.sum(running_times)
-
-                self.logger.info(
-                    "Validation error for the parameters is {:.4f}".format(mean_result)
-                )
-                self.logger.info(
-                    "Time taken for the parameters is {}".format(
-                        seconds_to_time(np.sum(running_times))
-                    )
-                )
-                if "ps" in self.opt.acq_func:
-                    self.opt.tell(next_point, [mean_result, mean_fitting_duration])
-                else:
-                    self.opt.tell(next_point, mean_result)
+                        self.logger.info(
+                            "Time taken for the parameters is {}".format(
+                                seconds_to_time(fitting_duration)
+                            )
+                        )
+                    if epochs == budgets[-1]:
+                        full_budget_results.extend(zip(mean_results, points))
+                    self._tell(points, epochs, results, running_times)
+
+                # Storing the maximum time to evaluate the points and adding the time for out of sample evaluation
+                fit_duration = duration_till_now(start)
+                if max_fit_duration < fit_duration:
+                    max_fit_duration = fit_duration
                 self._callbacks_on_iteration_end(t)
 
                 self.logger.info(
-                    "Main optimizer iterations done {} and saving the model".format(
-                        np.array(self.opt.yi).shape[0]
+                    "Main optimizer iterations done {} and logged in {}".format(
+                        np.array(self.opt.yi).shape[0], self.evaluation_log_path
                     )
                 )
-                dump(self.opt, self.optimizer_path)
 
                 time_taken = duration_till_now(start)
                 total_duration -= time_taken
@@ -396,12 +600,18 @@ class ParameterOptimizer(Learner):
             )
 
         finally:
+            if executor is not None:
+                executor.shutdown()
+                shutil.rmtree(data_folder, ignore_errors=True)
             K.clear_session()
             sess = tf.Session()
             K.set_session(sess)
             self._callbacks_on_optimization_end()
             # self._fit_params["epochs"] = np.min([self._fit_params.get("epochs", 500) * 2, 1000])
-            if "ps" in self.opt.acq_func:
+            if self.min_epochs is not None and len(full_budget_results) > 0:
+                # Losses of smaller budgets are not comparable
+                best_point = min(full_budget_results, key=lambda result: result[0])[1]
+            elif "ps" in self.opt.acq_func:
                 best_point = self.opt.Xi[np.argmin(np.array(self.opt.yi)[:, 0])]
             else:
                 best_point = self.opt.Xi[np.argmin(self.opt.yi)]
@@ -431,7 +641,9 @@ class ParameterOptimizer(Learner):
                 )
             )
 
-    def set_optimizer(self, n_iter, opt_seed, acq_func, gp_seed, **kwargs):
+    def set_optimizer(
+        self, n_iter, opt_seed, acq_func, gp_seed, n_splits=None, **kwargs
+    ):
         self.logger.info("Retrieving model stored at: {}".format(self.optimizer_path))
         try:
             optimizer = load(self.optimizer_path)
@@ -456,14 +668,6 @@ class ParameterOptimizer(Learner):
             optimizer = None
 
         if optimizer is not None:
-            n_iter = n_iter - finished_iter
-            if n_iter < 0:
-                n_iter = 0
-            self.logger.info(
-                "Iterations already done: {} and running iterations {}".format(
-                    finished_iter, n_iter
-                )
-            )
             self.opt = optimizer
             self.logger.debug("Setting the provided optimizer")
             self.log_best_params()
@@ -500,6 +704,27 @@ class ParameterOptimizer(Learner):
                 **kwargs,
             )
 
+        evaluations = self._replay_evaluations(n_splits)
+        budgets = self.epoch_budgets
+        if len(budgets) == 1:
+            # Every told point is an iteration, including those of skipped lines of the evaluation log
+            finished_iter = len(self.opt.yi)
+        elif len(evaluations) > 0:
+            # The iterations are counted in candidate points, which are all evaluated with the smallest budget
+            finished_iter = sum(epochs == budgets[0] for _, epochs, _, _ in evaluations)
+        elif optimizer is None:
+            finished_iter = 0
+        self._full_budget_results = [
+            (np.mean(losses), point)
+            for point, epochs, losses, _ in evaluations
+            if epochs == budgets[-1]
+        ]
+        n_iter = max(n_iter - finished_iter, 0)
+        self.logger.info(
+            "Iterations already done: {} and running iterations {}".format(
+                finished_iter, n_iter
+            )
+        )
         return n_iter
 
     def predict_pair(self, a, b, **kwargs):
@@ -541,6 +766,168 @@ class ParameterOptimizer(Learner):
         self.model.set_tunable_parameters(**point)
 
 
+def _set_tunable_parameters(tunable_parameter_ranges, point, logger):
+    i = 0
+    # We are iterating over all elements of the dictionary in order.
+    # This works because dicts are order-preserving.
+    for obj, ranges in tunable_parameter_ranges.items():
+        param_dict = dict()
+        for j, p in enumerate(ranges.keys()):
+            param_dict[p] = point[i + j]
+        logger.info(
+            "obj: {}, current parameters {}".format(type(obj).__name__, param_dict)
+        )
+        obj.set_tunable_parameters(**param_dict)
+        i += len(ranges)
+
+
+def _take(array, indices):
+    """The instances of the array, a view if the indices are a contiguous range"""
+    indices = np.asarray(indices)
+    if len(indices) > 0 and np.all(np.diff(indices) == 1):
+        return array[indices[0] : indices[-1] + 1]
+    return array[indices]
+
+
+def _split_instances(X, Y, split):
+    """Training and test instances of one cross validation split of an array or of a dictionary of buckets"""
+    if isinstance(X, dict):
+        X_train = dict()
+        Y_train = dict()
+        X_test = dict()
+        Y_test = dict()
+        for n_obj, (train_idx, test_idx) in split.items():
+            X_train[n_obj] = _take(X[n_obj], train_idx)
+            X_test[n_obj] = _take(X[n_obj], test_idx)
+            Y_train[n_obj] = _take(Y[n_obj], train_idx)
+            Y_test[n_obj] = _take(Y[n_obj], test_idx)
+        return X_train, Y_train, X_test, Y_test
+    train_idx, test_idx = split
+    return (
+        _take(X, train_idx),
+        _take(Y, train_idx),
+        _take(X, test_idx),
+        _take(Y, test_idx),
+    )
+
+
+def _to_builtin(point):
+    return [value.item() if isinstance(value, np.generic) else value for value in point]
+
+
+def _evaluation_key(point, epochs, data=None):
+    """Content hash of a point, its epoch budget and the fingerprint of the dataset and splits"""
+    content = json.dumps([_to_builtin(point), epochs, data], sort_keys=True)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def _data_fingerprint(X, Y, splits):
+    """Content hash of the dataset (arrays or dictionaries of buckets) and the cross validation splits"""
+    digest = hashlib.sha1()
+    arrays = []
+    for data in (X, Y):
+        if isinstance(data, dict):
+            arrays.extend(data[key] for key in sorted(data))
+        else:
+            arrays.append(data)
+    for split in splits:
+        if isinstance(split, dict):
+            split = [indices for key in sorted(split) for indices in split[key]]
+        arrays.extend(split)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update("{}{}".format(array.dtype.str, array.shape).encode("utf-8"))
+        digest.update(array.view(np.uint8))
+    return digest.hexdigest()
+
+
+def _drop_incomplete_line(file_path):
+    """
+        Remove the last line of a log if it is not terminated by a newline, i.e. if the process was killed while
+        writing it. Otherwise, the next record would be appended to the incomplete line.
+    """
+    with open(file_path, "rb+") as log:
+        content = log.read()
+        if len(content) > 0 and not content.endswith(b"\n"):
+            log.truncate(content.rfind(b"\n") + 1)
+
+
+def _read_evaluation_log(file_path, n_splits=None, logger=None):
+    """
+        Read an evaluation log as a list of (point, epochs, losses, times, data) in the order in which the evaluations
+        were told to the optimizer, where data is the fingerprint of the dataset and splits (None if not logged). Lines which cannot be decoded and evaluations with another number of folds than
+        ``n_splits`` are skipped, since telling their mean loss would be misleading.
+    """
+    logger = logger or logging.getLogger(PARAMETER_OPTIMIZER)
+    evaluations = []
+    with open(file_path) as log:
+        for i, line in enumerate(log):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                losses, times = record["losses"], record["times"]
+                point, epochs = record["point"], record["epochs"]
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Skipping line {} of {}".format(i + 1, file_path))
+                continue
+            if n_splits is not None and len(losses) != n_splits:
+                logger.warning(
+                    "Skipping the evaluation of {} with {} instead of {} folds".format(
+                        point, len(losses), n_splits
+                    )
+                )
+                continue
+            evaluations.append(
+                (point, epochs, np.array(losses), np.array(times), record.get("data"))
+            )
+    return evaluations
+
+
+def _fit_and_evaluate(
+    learner, fit_params, validation_loss, xtrain, ytrain, xtest, ytest, logger
+):
+    start = datetime.now()
+    try:
+        learner.fit(xtrain, ytrain, **fit_params)
+        ypred = learner(xtest)
+        loss = get_mean_loss(validation_loss, ytest, ypred)
+        time_taken = duration_till_now(start)
+    except Exception:
+        logger.error(traceback.format_exc())
+        logger.info(
+            "For current parameter error occurred so taking loss as maximum value"
+        )
+        loss = 1.00
+        time_taken = duration_till_now(start)
+    return loss, time_taken
+
+
+# Dataset and session configuration of a worker process of the parallel evaluation
+_worker_state = dict()
+
+
+def _initialize_worker(data_path, n_threads):
+    _worker_state["X"], _worker_state["Y"] = joblib.load(data_path, mmap_mode="r")
+    _worker_state["config"] = tf.ConfigProto(
+        intra_op_parallelism_threads=n_threads, inter_op_parallelism_threads=n_threads
+    )
+    K.set_session(tf.Session(config=_worker_state["config"]))
+
+
+def _evaluate_in_worker(
+    tunable_parameter_ranges, learner, fit_params, validation_loss, point, split
+):
+    logger = logging.getLogger(PARAMETER_OPTIMIZER)
+    _set_tunable_parameters(tunable_parameter_ranges, point, logger)
+    data = _split_instances(_worker_state["X"], _worker_state["Y"], split)
+    result = _fit_and_evaluate(learner, fit_params, validation_loss, *data, logger)
+    # Delete Tensorflow graph, to prevent memory leaks:
+    K.clear_session()
+    K.set_session(tf.Session(config=_worker_state["config"]))
+    return result
+
+
 def check_learner_class(ranker):
     """ Function which checks if the ranker is an instance of the :class:`csrank.tunning.Tunable` class
 
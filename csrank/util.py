@@ -1,5 +1,6 @@
 from datetime import datetime
 from datetime import timedelta
+import functools
 import inspect
 import logging
 import os
@@ -116,10 +117,14 @@ def seconds_to_time(target_time_sec):
     return str(timedelta(seconds=target_time_sec))
 
 
-def convert_to_loss(loss_function):
-    def loss(y_true, y_pred):
-        return 1.0 - loss_function(y_true, y_pred)
+def _one_minus(loss_function, y_true, y_pred):
+    return 1.0 - loss_function(y_true, y_pred)
+
 
+def convert_to_loss(loss_function):
+    # A partial instead of a closure keeps the loss picklable for worker processes
+    loss = functools.partial(_one_minus, loss_function)
+    loss.__name__ = "loss"
     return loss
 
 
@@ -0,0 +1,113 @@
+"""Benchmark the overhead of the meta gradient descent of the variadic FATE network.
+
+The data resembles a LETOR dataset: 46 features per document and queries of
+24 different sizes. For one outer epoch the script times the meta-update of
+the weights as it is done in ``FATENetwork._fit`` against the previous
+implementation, which copied all weights to the host three times per bucket.
+It also reports the duration of a complete outer epoch.
+
+Usage::
+
+    python scripts/benchmark_fate_meta_gradient.py [--repeat 5]
+"""
+import argparse
+from timeit import default_timer
+
+from keras import backend as K
+from keras.optimizers import SGD
+import numpy as np
+
+from csrank import FATEObjectRanker
+
+
+def letor_like_dataset(random_state, sizes, n_instances=64, n_features=46):
+    X, Y = dict(), dict()
+    for n_objects in sizes:
+        X[n_objects] = random_state.rand(n_instances, n_objects, n_features)
+        relevance = X[n_objects] @ random_state.randn(n_features)
+        Y[n_objects] = relevance.argsort(axis=1)[:, ::-1].argsort(axis=1)
+    return X, Y
+
+
+def host_copy_update(fate, bucket_ids, learning_rate=0.5, momentum=0.9):
+    # The update before the meta gradient descent was moved into the graph
+    w_before = np.array(fate.get_weights(), dtype=object)
+    for _ in bucket_ids:
+        w_old = w_before
+        w_before = np.array(fate.get_weights(), dtype=object)
+        w_after = np.array(fate.get_weights(), dtype=object)
+        fate.set_weights(
+            list(
+                w_before
+                + learning_rate * (w_after - w_before)
+                + momentum * (w_before - w_old)
+            )
+        )
+
+
+def in_graph_update(fate, bucket_ids, learning_rate=0.5, momentum=0.9):
+    session = K.get_session()
+    session.run(fate._meta_start)
+    for _ in bucket_ids:
+        session.run(fate._meta_save)
+        session.run(
+            fate._meta_update,
+            feed_dict={
+                fate._meta_step_size: learning_rate,
+                fate._meta_momentum: momentum,
+            },
+        )
+
+
+def best_of(repeat, function, *args):
+    durations = []
+    for _ in range(repeat):
+        start = default_timer()
+        function(*args)
+        durations.append(default_timer() - start)
+    return min(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--buckets", type=int, default=24)
+    args = parser.parse_args()
+
+    random_state = np.random.RandomState(42)
+    sizes = list(range(5, 5 + args.buckets))
+    X, Y = letor_like_dataset(random_state, sizes)
+    fate = FATEObjectRanker(
+        n_hidden_set_layers=2,
+        n_hidden_set_units=64,
+        n_hidden_joint_layers=4,
+        n_hidden_joint_units=64,
+        optimizer=SGD(lr=1e-3, nesterov=True, momentum=0.9),
+        random_state=random_state,
+    )
+    start = default_timer()
+    fate.fit(X, Y, epochs=1, validation_split=0, min_bucket_size=32)
+    print(
+        "First outer epoch (includes graph construction): {:.3f}s".format(
+            default_timer() - start
+        )
+    )
+    start = default_timer()
+    fate.fit(X, Y, epochs=1, validation_split=0, min_bucket_size=32)
+    print(
+        "Outer epoch over {} buckets: {:.3f}s".format(
+            len(sizes), default_timer() - start
+        )
+    )
+
+    n_parameters = sum(w.size for w in fate.get_weights())
+    print("Parameters: {}".format(n_parameters))
+    host = best_of(args.repeat, host_copy_update, fate, sizes)
+    graph = best_of(args.repeat, in_graph_update, fate, sizes)
+    print("Meta-update overhead per outer epoch, host copies: {:.4f}s".format(host))
+    print("Meta-update overhead per outer epoch, in graph:    {:.4f}s".format(graph))
+    print("Speedup: {:.1f}x".format(host / graph))
+
+
+if __name__ == "__main__":
+    main()